@@ -1,97 +1,34 @@
 #!/usr/bin/env python3
 
-import requests
-import json
+import asyncio
 import sys
-import time
 from datetime import datetime, timedelta
-import jwt
-
-# Configuration
-BASE_URL = "https://cf85198e-f07a-4af1-b7e1-9c9ff2fb1e3a.preview.emergentagent.com"
-API_BASE = f"{BASE_URL}/api"
-
-class AdditionalBackendTests:
-    def __init__(self):
-        self.session = requests.Session()
-        self.test_results = []
-        
-    def log_test(self, test_name, success, message="", details=None):
-        """Log test results"""
-        status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status}: {test_name}")
-        if message:
-            print(f"   {message}")
-        if details:
-            print(f"   Details: {details}")
-        
-        self.test_results.append({
-            'test': test_name,
-            'success': success,
-            'message': message,
-            'details': details
-        })
-        print()
-    
-    def setup_authenticated_session(self):
-        """Setup an authenticated session for testing"""
-        try:
-            # Create a mock JWT token for testing
-            test_payload = {
-                'email': 'test.user@university.edu',
-                'name': 'Test User',
-                'iat': int(time.time()),
-                'exp': int(time.time()) + 3600
-            }
-            
-            mock_token = jwt.encode(test_payload, 'test_secret', algorithm='HS256')
-            
-            response = self.session.post(
-                f"{API_BASE}/auth/session",
-                json={'token': mock_token},
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code == 200:
-                # Complete user setup
-                setup_data = {
-                    'semester': 'Spring 2024',
-                    'subjects': ['Math', 'Science', 'History'],
-                    'startDate': '2024-01-01',
-                    'endDate': '2024-06-01',
-                    'timetable': {
-                        'Monday': ['Math', 'Science'],
-                        'Tuesday': ['History', 'Math'],
-                        'Wednesday': ['Science'],
-                        'Thursday': ['Math', 'History'],
-                        'Friday': ['Science', 'Math'],
-                        'Saturday': [],
-                        'Sunday': []
-                    }
-                }
-                
-                setup_response = self.session.post(
-                    f"{API_BASE}/user/setup",
-                    json=setup_data,
-                    headers={'Content-Type': 'application/json'}
-                )
-                
-                return setup_response.status_code == 200
-            return False
-        except Exception as e:
-            print(f"Setup failed: {str(e)}")
-            return False
-    
-    def test_invalid_jwt_token(self):
+
+from api_test_support import AsyncApiTestRunner, make_mock_token
+
+SETUP_DATA = {
+    'semester': 'Spring 2024',
+    'subjects': ['Math', 'Science', 'History'],
+    'startDate': '2024-01-01',
+    'endDate': '2024-06-01',
+    'timetable': {
+        'Monday': ['Math', 'Science'],
+        'Tuesday': ['History', 'Math'],
+        'Wednesday': ['Science'],
+        'Thursday': ['Math', 'History'],
+        'Friday': ['Science', 'Math'],
+        'Saturday': [],
+        'Sunday': []
+    }
+}
+
+class AdditionalBackendTests(AsyncApiTestRunner):
+    async def test_invalid_jwt_token(self):
         """Test authentication with invalid JWT token"""
         try:
             # Test with completely invalid token
-            response = self.session.post(
-                f"{API_BASE}/auth/session",
-                json={'token': 'invalid_token_here'},
-                headers={'Content-Type': 'application/json'}
-            )
-            
+            response = await self.client().post("/auth/session", json={'token': 'invalid_token_here'})
+
             if response.status_code == 401:
                 self.log_test("Invalid JWT Token", True, "Invalid token correctly rejected")
                 return True
@@ -101,26 +38,15 @@ class AdditionalBackendTests:
         except Exception as e:
             self.log_test("Invalid JWT Token", False, f"Exception: {str(e)}")
             return False
-    
-    def test_expired_jwt_token(self):
+
+    async def test_expired_jwt_token(self):
         """Test authentication with expired JWT token"""
         try:
-            # Create expired token
-            expired_payload = {
-                'email': 'expired@university.edu',
-                'name': 'Expired User',
-                'iat': int(time.time()) - 7200,  # 2 hours ago
-                'exp': int(time.time()) - 3600   # 1 hour ago (expired)
-            }
-            
-            expired_token = jwt.encode(expired_payload, 'test_secret', algorithm='HS256')
-            
-            response = self.session.post(
-                f"{API_BASE}/auth/session",
-                json={'token': expired_token},
-                headers={'Content-Type': 'application/json'}
-            )
-            
+            # Expired an hour ago
+            expired_token = make_mock_token(f'expired.{self.run_id}@university.edu', 'Expired User', expires_in=-3600)
+
+            response = await self.client().post("/auth/session", json={'token': expired_token})
+
             # Note: The current implementation doesn't verify token expiration
             # This test documents the current behavior
             if response.status_code in [200, 401]:
@@ -132,14 +58,12 @@ class AdditionalBackendTests:
         except Exception as e:
             self.log_test("Expired JWT Token", False, f"Exception: {str(e)}")
             return False
-    
-    def test_missing_required_fields_setup(self):
+
+    async def test_missing_required_fields_setup(self):
         """Test user setup with missing required fields"""
-        if not self.setup_authenticated_session():
-            self.log_test("Missing Fields Setup", False, "Could not setup authenticated session")
-            return False
-        
         try:
+            user = await self.sign_in('missing-fields')
+
             # Test with missing semester
             incomplete_data = {
                 'subjects': ['Math', 'Science'],
@@ -147,13 +71,9 @@ class AdditionalBackendTests:
                 'endDate': '2024-06-01',
                 'timetable': {'Monday': ['Math']}
             }
-            
-            response = self.session.post(
-                f"{API_BASE}/user/setup",
-                json=incomplete_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
+
+            response = await user.post("/user/setup", json=incomplete_data)
+
             if response.status_code == 400:
                 self.log_test("Missing Fields Setup", True, "Missing required fields correctly rejected")
                 return True
@@ -163,14 +83,12 @@ class AdditionalBackendTests:
         except Exception as e:
             self.log_test("Missing Fields Setup", False, f"Exception: {str(e)}")
             return False
-    
-    def test_malformed_attendance_data(self):
+
+    async def test_malformed_attendance_data(self):
         """Test attendance entry with malformed data"""
-        if not self.setup_authenticated_session():
-            self.log_test("Malformed Attendance Data", False, "Could not setup authenticated session")
-            return False
-        
         try:
+            user = await self.sign_in('malformed-attendance', SETUP_DATA)
+
             # Test with invalid date format
             malformed_data = {
                 'date': 'invalid-date-format',
@@ -179,13 +97,9 @@ class AdditionalBackendTests:
                     {'subject': 'Math', 'status': 'attended'}
                 ]
             }
-            
-            response = self.session.post(
-                f"{API_BASE}/attendance/enter",
-                json=malformed_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
+
+            response = await user.post("/attendance/enter", json=malformed_data)
+
             # The API should handle this gracefully
             if response.status_code in [400, 500]:
                 self.log_test("Malformed Attendance Data", True, f"Malformed data handled (status: {response.status_code})")
@@ -196,45 +110,57 @@ class AdditionalBackendTests:
         except Exception as e:
             self.log_test("Malformed Attendance Data", False, f"Exception: {str(e)}")
             return False
-    
-    def test_unauthorized_access_patterns(self):
+
+    async def test_unauthorized_access_patterns(self):
         """Test various unauthorized access patterns"""
         try:
-            # Create a new session without authentication
-            unauth_session = requests.Session()
-            
+            # A client without a session cookie
+            unauth_client = self.client()
+
             # Test GET endpoints
             get_endpoints = [
                 '/attendance/status',
                 '/attendance/records',
+                '/attendance/summary',
                 '/attendance/today-schedule',
-                '/attendance/subject/Math'
+                '/attendance/subject/Math',
+                '/attendance/projection',
+                '/attendance/export',
+                '/dashboard'
             ]
-            
+
             # Test POST endpoints
             post_endpoints = [
                 ('/user/setup', {'semester': 'test'}),
-                ('/attendance/enter', {'date': '2024-01-01'})
+                ('/attendance/enter', {'date': '2024-01-01'}),
+                ('/attendance/bulk', {'entries': [{'date': '2024-01-01'}]})
             ]
-            
+
+            get_responses, post_responses, admin_response = await asyncio.gather(
+                asyncio.gather(*(unauth_client.get(endpoint) for endpoint in get_endpoints)),
+                asyncio.gather(*(unauth_client.post(endpoint, json=data) for endpoint, data in post_endpoints)),
+                # Admin routes require ADMIN_TOKEN, not a user session
+                unauth_client.get("/admin/export", params={'semester': 'Spring 2024'})
+            )
+
             all_passed = True
-            
-            # Test GET endpoints
-            for endpoint in get_endpoints:
-                response = unauth_session.get(f"{API_BASE}{endpoint}")
+
+            for endpoint, response in zip(get_endpoints, get_responses):
                 if response.status_code != 401:
                     self.log_test(f"Unauthorized Access - GET {endpoint}", False, f"Expected 401, got {response.status_code}")
                     all_passed = False
-            
-            # Test POST endpoints
-            for endpoint, data in post_endpoints:
-                response = unauth_session.post(f"{API_BASE}{endpoint}", json=data)
+
+            for (endpoint, _), response in zip(post_endpoints, post_responses):
                 if response.status_code != 401:
                     self.log_test(f"Unauthorized Access - POST {endpoint}", False, f"Expected 401, got {response.status_code}")
                     all_passed = False
-            
+
+            if admin_response.status_code != 403:
+                self.log_test("Unauthorized Access - GET /admin/export", False, f"Expected 403, got {admin_response.status_code}")
+                all_passed = False
+
             if all_passed:
-                total_endpoints = len(get_endpoints) + len(post_endpoints)
+                total_endpoints = len(get_endpoints) + len(post_endpoints) + 1
                 self.log_test("Unauthorized Access Patterns", True, f"All {total_endpoints} protected endpoints properly secured")
                 return True
             else:
@@ -242,23 +168,23 @@ class AdditionalBackendTests:
         except Exception as e:
             self.log_test("Unauthorized Access Patterns", False, f"Exception: {str(e)}")
             return False
-    
-    def test_cors_headers(self):
+
+    async def test_cors_headers(self):
         """Test CORS headers are properly set"""
         try:
-            response = self.session.options(f"{API_BASE}/")
-            
+            response = await self.client().options("/")
+
             expected_headers = [
                 'Access-Control-Allow-Origin',
                 'Access-Control-Allow-Methods',
                 'Access-Control-Allow-Headers'
             ]
-            
+
             missing_headers = []
             for header in expected_headers:
                 if header not in response.headers:
                     missing_headers.append(header)
-            
+
             if not missing_headers:
                 self.log_test("CORS Headers", True, "All required CORS headers present")
                 return True
@@ -268,19 +194,17 @@ class AdditionalBackendTests:
         except Exception as e:
             self.log_test("CORS Headers", False, f"Exception: {str(e)}")
             return False
-    
-    def test_large_payload_handling(self):
+
+    async def test_large_payload_handling(self):
         """Test handling of large payloads"""
-        if not self.setup_authenticated_session():
-            self.log_test("Large Payload Handling", False, "Could not setup authenticated session")
-            return False
-        
         try:
+            user = await self.sign_in('large-payload')
+
             # Create a large timetable
             large_timetable = {}
             for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']:
                 large_timetable[day] = ['Subject' + str(i) for i in range(100)]  # 100 subjects per day
-            
+
             large_setup_data = {
                 'semester': 'Test Semester',
                 'subjects': ['Subject' + str(i) for i in range(100)],  # 100 subjects
@@ -288,15 +212,12 @@ class AdditionalBackendTests:
                 'endDate': '2024-06-01',
                 'timetable': large_timetable
             }
-            
-            response = self.session.post(
-                f"{API_BASE}/user/setup",
-                json=large_setup_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code in [200, 413, 400]:  # 413 = Payload Too Large
-                self.log_test("Large Payload Handling", True, f"Large payload handled (status: {response.status_code})")
+
+            response = await user.post("/user/setup", json=large_setup_data)
+
+            # 100 subjects is over the setup schema's limits
+            if response.status_code in [413, 400]:  # 413 = Payload Too Large
+                self.log_test("Large Payload Handling", True, f"Large payload rejected (status: {response.status_code})")
                 return True
             else:
                 self.log_test("Large Payload Handling", False, f"Unexpected status: {response.status_code}")
@@ -304,14 +225,11 @@ class AdditionalBackendTests:
         except Exception as e:
             self.log_test("Large Payload Handling", False, f"Exception: {str(e)}")
             return False
-    
-    def test_concurrent_attendance_entries(self):
+
+    async def test_concurrent_attendance_entries(self):
         """Test concurrent attendance entries for same date"""
-        if not self.setup_authenticated_session():
-            self.log_test("Concurrent Attendance Entries", False, "Could not setup authenticated session")
-            return False
-        
         try:
+            user = await self.sign_in('concurrent-entries', SETUP_DATA)
             test_date = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
             attendance_data = {
                 'date': test_date,
@@ -320,38 +238,27 @@ class AdditionalBackendTests:
                     {'subject': 'Math', 'status': 'attended'}
                 ]
             }
-            
-            # First entry should succeed
-            response1 = self.session.post(
-                f"{API_BASE}/attendance/enter",
-                json=attendance_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            # Second entry should fail (duplicate)
-            response2 = self.session.post(
-                f"{API_BASE}/attendance/enter",
-                json=attendance_data,
-                headers={'Content-Type': 'application/json'}
+
+            # Both entries race; exactly one should succeed and the other be rejected as a duplicate
+            responses = await asyncio.gather(
+                user.post("/attendance/enter", json=attendance_data),
+                user.post("/attendance/enter", json=attendance_data)
             )
-            
-            if response1.status_code == 200 and response2.status_code == 400:
+            status_codes = sorted(response.status_code for response in responses)
+
+            if status_codes == [200, 400]:
                 self.log_test("Concurrent Attendance Entries", True, "Duplicate prevention working correctly")
                 return True
             else:
-                self.log_test("Concurrent Attendance Entries", False, f"Status codes: {response1.status_code}, {response2.status_code}")
+                self.log_test("Concurrent Attendance Entries", False, f"Status codes: {status_codes[0]}, {status_codes[1]}")
                 return False
         except Exception as e:
             self.log_test("Concurrent Attendance Entries", False, f"Exception: {str(e)}")
             return False
-    
+
     def run_additional_tests(self):
         """Run all additional backend tests"""
-        print("=" * 60)
-        print("ADDITIONAL BACKEND API TESTS - EDGE CASES")
-        print("=" * 60)
-        print()
-        
+        # Every test uses its own user or an anonymous client, so all run at once
         tests = [
             self.test_invalid_jwt_token,
             self.test_expired_jwt_token,
@@ -362,26 +269,12 @@ class AdditionalBackendTests:
             self.test_large_payload_handling,
             self.test_concurrent_attendance_entries
         ]
-        
-        passed = 0
-        total = len(tests)
-        
-        for test in tests:
-            try:
-                if test():
-                    passed += 1
-            except Exception as e:
-                print(f"❌ FAIL: {test.__name__} - Unexpected error: {str(e)}")
-        
-        print("=" * 60)
-        print(f"ADDITIONAL TESTS SUMMARY: {passed}/{total} tests passed")
-        print("=" * 60)
-        
-        return passed, total, self.test_results
+
+        return self.run("ADDITIONAL BACKEND API TESTS - EDGE CASES", "ADDITIONAL TESTS SUMMARY", [tests])
 
 if __name__ == "__main__":
     tester = AdditionalBackendTests()
     passed, total, results = tester.run_additional_tests()
-    
+
     # Exit with appropriate code
-    sys.exit(0 if passed == total else 1)
\ No newline at end of file
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Shared async client, fixtures and runner for the backend API test suites"""
+
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
+import jwt
+
+# Configuration
+BASE_URL = os.environ.get('API_TEST_BASE_URL', "https://cf85198e-f07a-4af1-b7e1-9c9ff2fb1e3a.preview.emergentagent.com")
+API_BASE = f"{BASE_URL}/api"
+REQUEST_TIMEOUT = float(os.environ.get('API_TEST_TIMEOUT', '30'))
+# Connections shared by every test client
+MAX_CONNECTIONS = int(os.environ.get('API_TEST_MAX_CONNECTIONS', '50'))
+
+def make_mock_token(email, name, expires_in=3600):
+    """Create a mock sign-in token (the backend doesn't verify signature in test mode)"""
+    payload = {
+        'email': email,
+        'name': name,
+        'iat': int(time.time()),
+        'exp': int(time.time()) + expires_in
+    }
+    return jwt.encode(payload, 'test_secret', algorithm='HS256')
+
+class FixtureError(Exception):
+    """A fixture could not be prepared, so the tests using it cannot run"""
+
+class ApiUser:
+    """A signed-in test user: an httpx client with its own cookie jar"""
+
+    def __init__(self, client, email, name):
+        self.client = client
+        self.email = email
+        self.name = name
+
+    def __getattr__(self, attr):
+        # get/post/delete/options/request go straight to the client
+        return getattr(self.client, attr)
+
+class AsyncApiTestRunner:
+    """Runs async API tests in parallel phases over one shared connection pool.
+
+    Every client made by client() has its own cookie jar but borrows connections
+    from the same transport, so isolated users don't pay for new TLS handshakes.
+    fixture() starts a shared setup once; all tests awaiting it get its result.
+    Clients are closed together with the transport when the phases end; closing
+    one earlier would close the shared transport under the other tests.
+    """
+
+    def __init__(self):
+        self.test_results = []
+        self.run_id = uuid.uuid4().hex[:8]
+        self.transport = None
+        self.clients = []
+        self.fixtures = {}
+
+    def log_test(self, test_name, success, message="", details=None):
+        """Log test results"""
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status}: {test_name}")
+        if message:
+            print(f"   {message}")
+        if details:
+            print(f"   Details: {details}")
+
+        self.test_results.append({
+            'test': test_name,
+            'success': success,
+            'message': message,
+            'details': details
+        })
+        print()
+
+    def event_hooks(self):
+        """httpx event hooks added to every client; suites override to inspect responses"""
+        return {}
+
+    def client(self):
+        """New client with an empty cookie jar on the shared connection pool"""
+        client = httpx.AsyncClient(
+            base_url=API_BASE,
+            transport=self.transport,
+            timeout=REQUEST_TIMEOUT,
+            event_hooks=self.event_hooks()
+        )
+        self.clients.append(client)
+        return client
+
+    async def sign_in(self, label, setup=None):
+        """Sign in a new user unique to this run, optionally completing setup"""
+        email = f"{label}.{self.run_id}@university.edu"
+        user = ApiUser(self.client(), email, f"Test {label.replace('-', ' ').title()}")
+
+        response = await user.post('/auth/session', json={'token': make_mock_token(email, user.name)})
+        if response.status_code != 200:
+            raise FixtureError(f"Sign-in for {label} failed with status {response.status_code}")
+        if setup is not None:
+            response = await user.post('/user/setup', json=setup)
+            if response.status_code != 200:
+                raise FixtureError(f"Setup for {label} failed with status {response.status_code}: {response.text}")
+        return user
+
+    def fixture(self, name, factory):
+        """Awaitable result of factory(), started on first use and shared afterwards"""
+        if name not in self.fixtures:
+            self.fixtures[name] = asyncio.ensure_future(factory())
+        return self.fixtures[name]
+
+    async def run_test(self, test):
+        """Run one test; unexpected errors count as a failure"""
+        try:
+            return bool(await test())
+        except Exception as e:
+            print(f"❌ FAIL: {test.__name__} - Unexpected error: {str(e)}")
+            return False
+
+    async def run_phases(self, phases):
+        """Run each phase's tests concurrently, one phase after another; returns (passed, total)"""
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        self.transport = httpx.AsyncHTTPTransport(limits=limits)
+        passed = 0
+        total = sum(len(phase) for phase in phases)
+        try:
+            for phase in phases:
+                results = await asyncio.gather(*(self.run_test(test) for test in phase))
+                passed += sum(results)
+        finally:
+            for task in self.fixtures.values():
+                task.cancel()
+            await asyncio.gather(*(client.aclose() for client in self.clients), return_exceptions=True)
+            self.clients = []
+            await self.transport.aclose()
+        return passed, total
+
+    def run(self, title, summary_label, phases):
+        """Print the banner, run the phases and print the summary; returns (passed, total, results)"""
+        print("=" * 60)
+        print(title)
+        print("=" * 60)
+        print()
+
+        started = time.perf_counter()
+        passed, total = asyncio.run(self.run_phases(phases))
+        elapsed = time.perf_counter() - started
+
+        print("=" * 60)
+        print(f"{summary_label}: {passed}/{total} tests passed in {elapsed:.1f}s")
+        print("=" * 60)
+
+        return passed, total, self.test_results
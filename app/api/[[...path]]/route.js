@@ -1,31 +1,94 @@
-import { MongoClient } from 'mongodb'
 import { v4 as uuidv4 } from 'uuid'
 import { NextResponse } from 'next/server'
 import jwt from 'jsonwebtoken'
 import { cookies } from 'next/headers'
+import { createHash } from 'crypto'
+import {
+  recordUserStats,
+  getUserStats,
+  getUserCounters,
+  getSubjectStats,
+  getStatsVersion
+} from '@/lib/user-stats'
+import {
+  ensureLeaderboardSnapshot,
+  getLeaderboardPage,
+  getLeaderboardEntry,
+  updateLeaderboardEntry
+} from '@/lib/leaderboard'
+import { statsFromCounters, projectAttendance } from '@/lib/attendance-stats'
+import {
+  insertAttendanceRecords,
+  listAttendanceRecords,
+  findRecordedDates,
+  findSubjectRecords,
+  hasAttendanceOn
+} from '@/lib/attendance-store'
+import { isDuplicateKeyError } from '@/lib/indexes'
+import { connectToMongo, getPoolMetrics } from '@/lib/mongo'
+import {
+  getMissedDates,
+  loadCalendarConfig,
+  normalizeDate,
+  countRemainingSessions,
+  toDayNumber,
+  fromDayNumber
+} from '@/lib/calendar'
+import { LruCache } from '@/lib/lru-cache'
+import { readJsonBody } from '@/lib/validation'
+import {
+  validateSession,
+  validateSetup,
+  validateAttendanceEntry,
+  validateBulkAttendance
+} from '@/lib/schemas'
+import { EXPORT_FORMATS, userExportLines, semesterExportLines, toByteStream } from '@/lib/export'
+import { createRouter, runRoute } from '@/lib/router'
+import {
+  withRequestTiming,
+  timed,
+  timedSync,
+  formatServerTiming,
+  recordRequest,
+  renderPrometheus
+} from '@/lib/metrics'
 
-// MongoDB connection
-let client
-let db
+// Institution weekly-off days and holidays
+const calendarConfig = loadCalendarConfig()
 
-async function connectToMongo() {
-  if (!client) {
-    client = new MongoClient(process.env.MONGO_URL)
-    await client.connect()
-    db = client.db(process.env.DB_NAME)
-  }
-  return db
+// Helper function to build a JSON response, timing the serialization
+function jsonResponse(body, init) {
+  return timedSync('serialize', () => NextResponse.json(body, init))
 }
 
 // Helper function to handle CORS
 function handleCORS(response) {
   response.headers.set('Access-Control-Allow-Origin', '*')
   response.headers.set('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-  response.headers.set('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+  response.headers.set('Access-Control-Allow-Headers', 'Content-Type, Authorization, If-None-Match')
+  response.headers.set('Access-Control-Expose-Headers', 'ETag, Server-Timing')
   response.headers.set('Access-Control-Allow-Credentials', 'true')
   return response
 }
 
+// Per-process caches for verified tokens and user documents.
+// Users are cached briefly because /user/setup on another instance only
+// becomes visible here once the entry expires.
+const tokenCache = new LruCache({
+  max: parseInt(process.env.TOKEN_CACHE_MAX || '5000', 10),
+  ttlMs: parseInt(process.env.TOKEN_CACHE_TTL_MS || '300000', 10)
+})
+const userCache = new LruCache({
+  max: parseInt(process.env.USER_CACHE_MAX || '5000', 10),
+  ttlMs: parseInt(process.env.USER_CACHE_TTL_MS || '5000', 10)
+})
+// Keyed by the projection's ETag, so an attendance entry or setup change
+// (a new stats version or user.updatedAt) never hits a stale projection
+const projectionCache = new LruCache({
+  max: parseInt(process.env.PROJECTION_CACHE_MAX || '5000', 10),
+  ttlMs: parseInt(process.env.PROJECTION_CACHE_TTL_MS || '86400000', 10)
+})
+
 // Helper function to verify JWT token
 async function verifyToken(request) {
   try {
@@ -34,458 +97,866 @@ async function verifyToken(request) {
       return null
     }
     
+    const cached = tokenCache.get(token)
+    if (cached) return cached
+    
     const decoded = jwt.verify(token, process.env.JWT_SECRET)
+    // Never serve a cached decode past the token's own expiry
+    const ttlMs = decoded.exp ? Math.min(tokenCache.ttlMs, decoded.exp * 1000 - Date.now()) : tokenCache.ttlMs
+    tokenCache.set(token, decoded, ttlMs)
     return decoded
   } catch (error) {
     return null
   }
 }
 
+// Helper function to load a user by id through the user cache
+async function findUserById(db, userId) {
+  const cached = userCache.get(userId)
+  if (cached) return cached
+  
+  const user = await db.collection('users').findOne({ userId })
+  if (user) userCache.set(userId, user)
+  return user
+}
+
 // Helper function to get user from token
 async function getUserFromToken(request) {
-  const decoded = await verifyToken(request)
+  const decoded = await timed('auth', () => verifyToken(request))
   if (!decoded) return null
   
   const db = await connectToMongo()
-  const user = await db.collection('users').findOne({ userId: decoded.userId })
-  return user
+  return timed('user', () => findUserById(db, decoded.userId))
 }
 
-// Helper function to calculate attendance statistics
-function calculateAttendanceStats(attendanceRecords, subjects) {
-  let totalClasses = 0
-  let attendedClasses = 0
-  const subjectStats = {}
-  
-  // Initialize subject stats
-  subjects.forEach(subject => {
-    subjectStats[subject] = {
-      total: 0,
-      attended: 0,
-      percentage: 0
-    }
-  })
-  
-  // Calculate stats from attendance records
-  attendanceRecords.forEach(record => {
-    if (!record.isHoliday) {
-      record.subjectAttendance.forEach(sa => {
-        if (subjectStats[sa.subject]) {
-          subjectStats[sa.subject].total += 1
-          if (sa.status === 'attended') {
-            subjectStats[sa.subject].attended += 1
-          }
-        }
-      })
-    }
-  })
-  
-  // Calculate percentages and totals
-  Object.keys(subjectStats).forEach(subject => {
-    const stats = subjectStats[subject]
-    stats.percentage = stats.total > 0 ? Math.round((stats.attended / stats.total) * 100) : 0
-    totalClasses += stats.total
-    attendedClasses += stats.attended
+// Helper function to build a weak ETag from the values a response depends on
+function buildETag(parts) {
+  return `W/"${createHash('sha1').update(parts.join('|')).digest('base64url')}"`
+}
+
+// Helper function to build the ETag of a per-user response.
+// Covers attendance writes (stats version) and setup changes (user.updatedAt).
+async function buildUserETag(db, user, ...parts) {
+  const version = await getStatsVersion(db, user.userId)
+  return buildETag([user.userId, version, user.updatedAt?.getTime?.() ?? 0, ...parts])
+}
+
+// Helper function to check If-None-Match against the current ETag
+function isNotModified(request, etag) {
+  const header = request.headers.get('if-none-match')
+  if (!header) return false
+  return header === '*' || header.split(',').some(tag => tag.trim() === etag)
+}
+
+// Helper function to mark a response as revalidate-on-every-use with its ETag
+function withETag(response, etag) {
+  response.headers.set('ETag', etag)
+  response.headers.set('Cache-Control', 'private, no-cache')
+  response.headers.set('Vary', 'Cookie')
+  return response
+}
+
+// Helper function to answer a matching conditional GET
+function notModified(etag) {
+  return withETag(new NextResponse(null, { status: 304 }), etag)
+}
+
+// Helper function to refresh a user's leaderboard entry after a write, without
+// holding up the response; the next snapshot rebuild repairs a missed update
+function refreshLeaderboardEntry(db, user) {
+  updateLeaderboardEntry(db, user).catch(error => {
+    console.error('Leaderboard update failed:', error)
   })
-  
-  const overallPercentage = totalClasses > 0 ? Math.round((attendedClasses / totalClasses) * 100) : 0
-  
+}
+
+// Helper function to shape the public user profile
+function toUserProfile(user) {
   return {
-    totalClasses,
-    attendedClasses,
-    overallPercentage,
-    subjectStats
+    id: user.userId,
+    email: user.email,
+    name: user.name,
+    isSetupComplete: user.isSetupComplete
   }
 }
 
-// Helper function to get missed dates
-function getMissedDates(startDate, endDate, attendanceRecords) {
-  const start = new Date(startDate)
-  const end = new Date()
-  const recordedDates = new Set(attendanceRecords.map(r => r.date))
-  const missedDates = []
+// Helper function to get the user's timetable entry for today
+function buildTodaySchedule(user) {
+  const today = new Date()
+  const dayName = today.toLocaleDateString('en-US', { weekday: 'long' })
   
-  for (let date = new Date(start); date <= end; date.setDate(date.getDate() + 1)) {
-    const dateStr = date.toISOString().split('T')[0]
-    const dayOfWeek = date.getDay()
-    
-    // Skip Sundays (0 = Sunday)
-    if (dayOfWeek === 0) continue
-    
-    if (!recordedDates.has(dateStr)) {
-      missedDates.push(dateStr)
-    }
+  return {
+    date: today.toISOString().split('T')[0],
+    day: dayName,
+    schedule: user.timetable?.[dayName] || [],
+    subjects: user.subjects || []
   }
-  
-  return missedDates
 }
 
-// OPTIONS handler for CORS
-export async function OPTIONS() {
-  return handleCORS(new NextResponse(null, { status: 200 }))
+// Helper function to check access to diagnostics routes.
+// Requires DIAGNOSTICS_TOKEN as a bearer token when it is set. Without it the
+// routes are open in development and closed in production.
+function isDiagnosticsAuthorized(request) {
+  const expected = process.env.DIAGNOSTICS_TOKEN
+  if (!expected) return process.env.NODE_ENV !== 'production'
+  return request.headers.get('authorization') === `Bearer ${expected}`
 }
 
-// Route handler function
-async function handleRoute(request, { params }) {
-  const { path = [] } = params
-  const route = `/${path.join('/')}`
-  const method = request.method
+// Helper function to check access to admin routes.
+// Admin routes export personal data, so they stay closed until ADMIN_TOKEN is set.
+function isAdminAuthorized(request) {
+  const expected = process.env.ADMIN_TOKEN
+  if (!expected) return false
+  return request.headers.get('authorization') === `Bearer ${expected}`
+}
+
+// Pagination defaults
+const LEADERBOARD_DEFAULT_LIMIT = 100
+const LEADERBOARD_MAX_LIMIT = 500
+const RECORDS_DEFAULT_LIMIT = 30
+const RECORDS_MAX_LIMIT = 200
+
+// Oldest full leaderboard rebuild served before a background rebuild starts
+const LEADERBOARD_MAX_AGE_MS = parseInt(process.env.LEADERBOARD_MAX_AGE_MS || '600000', 10)
+
+// Secure session cookie; SESSION_COOKIE_SECURE=false allows plain-HTTP production
+// servers such as the local stack (local_stack.py)
+const SESSION_COOKIE_SECURE = process.env.SESSION_COOKIE_SECURE
+  ? process.env.SESSION_COOKIE_SECURE === 'true'
+  : process.env.NODE_ENV === 'production'
 
+// Default attendance target of /attendance/projection, in percent
+const PROJECTION_DEFAULT_TARGET = parseInt(process.env.ATTENDANCE_TARGET || '75', 10)
+
+// Largest JSON request bodies read, in bytes; bulk attendance gets its own limit
+const BODY_MAX_BYTES = parseInt(process.env.API_BODY_MAX_BYTES || '32768', 10)
+const BULK_BODY_MAX_BYTES = parseInt(process.env.API_BULK_BODY_MAX_BYTES || '524288', 10)
+
+// Helper function to parse a page size query parameter
+function parseLimit(value, defaultLimit, maxLimit) {
+  const limit = parseInt(value, 10)
+  if (!Number.isFinite(limit) || limit <= 0) return defaultLimit
+  return Math.min(limit, maxLimit)
+}
+
+// Helper function to parse an optional date query parameter into YYYY-MM-DD
+function parseDateParam(value) {
+  if (value === null || value === '') return { value: null }
+  const date = normalizeDate(value)
+  if (!date) return { error: true }
+  return { value: date }
+}
+
+// Helper function to encode the position after a leaderboard entry
+function encodeLeaderboardCursor(entry) {
+  return Buffer.from(JSON.stringify([entry.percentage, entry.userId])).toString('base64url')
+}
+
+// Helper function to decode a leaderboard cursor (invalid cursors start from the top)
+function decodeLeaderboardCursor(cursor) {
+  if (!cursor) return null
   try {
-    const db = await connectToMongo()
+    const [percentage, userId] = JSON.parse(Buffer.from(cursor, 'base64url').toString())
+    if (typeof percentage !== 'number' || typeof userId !== 'string') return null
+    return { percentage, userId }
+  } catch (error) {
+    return null
+  }
+}
 
-    // Root endpoint
-    if (route === '/' && method === 'GET') {
-      return handleCORS(NextResponse.json({ message: "Attendance Tracker API" }))
-    }
+// Helper function to build the 401 returned to unauthenticated callers
+function notAuthenticated() {
+  return jsonResponse(
+    { error: 'Not authenticated' },
+    { status: 401 }
+  )
+}
 
-    // AUTH ROUTES
-    
-    // Create session - POST /api/auth/session
-    if (route === '/auth/session' && method === 'POST') {
-      const { token } = await request.json()
-      
-      try {
-        // First try to decode as Firebase token
-        let userInfo = {}
-        try {
-          const decoded = jwt.decode(token, { complete: true })
-          userInfo = decoded?.payload || {}
-        } catch (firebaseError) {
-          // If Firebase decode fails, try fallback token
-          try {
-            const fallbackPayload = JSON.parse(atob(token))
-            userInfo = fallbackPayload
-          } catch (fallbackError) {
-            throw new Error('Invalid token format')
-          }
-        }
-        
-        // Create or find user
-        let user = await db.collection('users').findOne({ 
-          email: userInfo.email || 'test@example.com' 
-        })
-        
-        let isNewUser = false
-        if (!user) {
-          user = {
-            userId: uuidv4(),
-            email: userInfo.email || 'test@example.com',
-            name: userInfo.name || 'Test User',
-            createdAt: new Date(),
-            isSetupComplete: false
-          }
-          await db.collection('users').insertOne(user)
-          isNewUser = true
-        }
-        
-        // Generate JWT
-        const jwtToken = jwt.sign(
-          { 
-            userId: user.userId,
-            email: user.email
-          },
-          process.env.JWT_SECRET,
-          { expiresIn: '7d' }
-        )
-        
-        // Set JWT in HTTP-only cookie
-        const response = NextResponse.json({ 
-          success: true, 
-          isNewUser: isNewUser || !user.isSetupComplete 
-        })
-        response.cookies.set({
-          name: 'token',
-          value: jwtToken,
-          httpOnly: true,
-          secure: process.env.NODE_ENV === 'production',
-          sameSite: 'lax', // Changed from 'strict' to 'lax' for better compatibility
-          path: '/',
-          maxAge: 7 * 24 * 60 * 60, // 7 days
-        })
-        
-        return handleCORS(response)
-      } catch (error) {
-        console.error('Session creation error:', error)
-        return handleCORS(NextResponse.json(
-          { error: 'Authentication failed' },
-          { status: 401 }
-        ))
-      }
-    }
+// ROUTE MIDDLEWARE
+// Each middleware adds to the request context or returns a response that ends the request.
 
-    // Get current user - GET /api/auth/user
-    if (route === '/auth/user' && method === 'GET') {
-      const decoded = await verifyToken(request)
-      if (!decoded) {
-        return handleCORS(NextResponse.json(
-          { error: 'Not authenticated' },
-          { status: 401 }
-        ))
-      }
-      
-      const user = await db.collection('users').findOne({ userId: decoded.userId })
-      if (!user) {
-        return handleCORS(NextResponse.json(
-          { error: 'User not found' },
-          { status: 404 }
-        ))
-      }
-      
-      return handleCORS(NextResponse.json({
-        user: {
-          id: user.userId,
-          email: user.email,
-          name: user.name,
-          isSetupComplete: user.isSetupComplete
-        }
-      }))
-    }
+// Requires a valid session token; adds context.decoded
+async function requireToken(context) {
+  context.decoded = await timed('auth', () => verifyToken(context.request))
+  if (!context.decoded) return notAuthenticated()
+}
 
-    // Logout - POST /api/auth/logout
-    if (route === '/auth/logout' && method === 'POST') {
-      const response = NextResponse.json({ success: true })
-      response.cookies.set({
-        name: 'token',
-        value: '',
-        expires: new Date(0),
-        path: '/',
-      })
-      return handleCORS(response)
-    }
+// Requires a signed-in user; adds context.user
+async function requireUser(context) {
+  context.user = await getUserFromToken(context.request)
+  if (!context.user) return notAuthenticated()
+}
 
-    // USER ROUTES
-    
-    // Complete setup - POST /api/user/setup
-    if (route === '/user/setup' && method === 'POST') {
-      const user = await getUserFromToken(request)
-      if (!user) {
-        return handleCORS(NextResponse.json(
-          { error: 'Not authenticated' },
-          { status: 401 }
-        ))
-      }
-      
-      const { semester, subjects, startDate, endDate, timetable } = await request.json()
-      
-      // Validate input
-      if (!semester || !subjects || !startDate || !endDate || !timetable) {
-        return handleCORS(NextResponse.json(
-          { error: 'Missing required fields' },
-          { status: 400 }
-        ))
-      }
-      
-      // Update user with setup data
-      await db.collection('users').updateOne(
-        { userId: user.userId },
-        {
-          $set: {
-            semester,
-            subjects,
-            startDate,
-            endDate,
-            timetable,
-            isSetupComplete: true,
-            updatedAt: new Date()
-          }
-        }
+// Adds context.decoded when the caller has a valid session token
+async function optionalToken(context) {
+  context.decoded = await timed('auth', () => verifyToken(context.request))
+}
+
+// Reads a JSON body of at most maxBytes, validates it and adds the normalized context.body
+function jsonBody(validate, maxBytes = BODY_MAX_BYTES) {
+  return async function parseJsonBody(context) {
+    const body = await timed('body', () => readJsonBody(context.request, maxBytes))
+    if (body.error) {
+      return jsonResponse(
+        { error: body.error },
+        { status: body.status }
       )
-      
-      return handleCORS(NextResponse.json({ success: true }))
     }
-
-    // ATTENDANCE ROUTES
     
-    // Get attendance status - GET /api/attendance/status
-    if (route === '/attendance/status' && method === 'GET') {
-      const user = await getUserFromToken(request)
-      if (!user) {
-        return handleCORS(NextResponse.json(
-          { error: 'Not authenticated' },
-          { status: 401 }
-        ))
-      }
-      
-      const today = new Date().toISOString().split('T')[0]
-      const attendanceRecords = await db.collection('attendance')
-        .find({ userId: user.userId })
-        .toArray()
-      
-      const todayRecord = attendanceRecords.find(r => r.date === today)
-      const stats = calculateAttendanceStats(attendanceRecords, user.subjects || [])
-      
-      return handleCORS(NextResponse.json({
-        todayAttendanceEntered: !!todayRecord,
-        ...stats
-      }))
+    const result = timedSync('validate', () => validate(body.value))
+    if (result.error) {
+      return jsonResponse(
+        { error: result.error },
+        { status: 400 }
+      )
     }
+    context.body = result.value
+  }
+}
+
+// Requires the diagnostics token (see isDiagnosticsAuthorized)
+async function requireDiagnostics(context) {
+  if (!isDiagnosticsAuthorized(context.request)) {
+    return jsonResponse(
+      { error: 'Not authorized' },
+      { status: 403 }
+    )
+  }
+}
+
+// Requires the admin token (see isAdminAuthorized)
+async function requireAdmin(context) {
+  if (!isAdminAuthorized(context.request)) {
+    return jsonResponse(
+      { error: 'Not authorized' },
+      { status: 403 }
+    )
+  }
+}
+
+// ROOT ROUTES
+
+// Root endpoint - GET /api
+async function getRoot() {
+  return jsonResponse({ message: "Attendance Tracker API" })
+}
 
-    // Enter attendance - POST /api/attendance/enter
-    if (route === '/attendance/enter' && method === 'POST') {
-      const user = await getUserFromToken(request)
-      if (!user) {
-        return handleCORS(NextResponse.json(
-          { error: 'Not authenticated' },
-          { status: 401 }
-        ))
+// Diagnostics - GET /api/diagnostics
+async function getDiagnostics() {
+  return jsonResponse({
+    caches: {
+      tokens: tokenCache.stats(),
+      users: userCache.stats(),
+      projections: projectionCache.stats()
+    },
+    mongoPool: getPoolMetrics()
+  })
+}
+
+// Metrics - GET /api/metrics (Prometheus text format)
+async function getMetrics() {
+  return new NextResponse(renderPrometheus(), {
+    headers: { 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8' }
+  })
+}
+
+// AUTH ROUTES
+
+// Create session - POST /api/auth/session
+async function createSession({ db, body }) {
+  const { token } = body
+  
+  try {
+    // First try to decode as Firebase token
+    let userInfo = {}
+    try {
+      const decoded = jwt.decode(token, { complete: true })
+      userInfo = decoded?.payload || {}
+    } catch (firebaseError) {
+      // If Firebase decode fails, try fallback token
+      try {
+        const fallbackPayload = JSON.parse(atob(token))
+        userInfo = fallbackPayload
+      } catch (fallbackError) {
+        throw new Error('Invalid token format')
       }
-      
-      const { date, isHoliday, subjectAttendance } = await request.json()
-      
-      // Check if attendance already exists for this date
-      const existingRecord = await db.collection('attendance')
-        .findOne({ userId: user.userId, date })
-      
-      if (existingRecord) {
-        return handleCORS(NextResponse.json(
-          { error: 'Attendance already entered for this date' },
-          { status: 400 }
-        ))
+    }
+    
+    // Create or find user
+    let user = await db.collection('users').findOne({ 
+      email: userInfo.email || 'test@example.com' 
+    })
+    
+    let isNewUser = false
+    if (!user) {
+      user = {
+        userId: uuidv4(),
+        email: userInfo.email || 'test@example.com',
+        name: userInfo.name || 'Test User',
+        createdAt: new Date(),
+        isSetupComplete: false
       }
-      
-      // Create attendance record
-      const attendanceRecord = {
-        attendanceId: uuidv4(),
-        userId: user.userId,
-        date,
-        isHoliday: isHoliday || false,
-        subjectAttendance: subjectAttendance || [],
-        createdAt: new Date()
+      try {
+        await db.collection('users').insertOne(user)
+        isNewUser = true
+      } catch (insertError) {
+        // A concurrent sign-in created the user first
+        if (!isDuplicateKeyError(insertError)) throw insertError
+        user = await db.collection('users').findOne({ email: user.email })
       }
-      
-      await db.collection('attendance').insertOne(attendanceRecord)
-      
-      return handleCORS(NextResponse.json({ success: true }))
     }
+    
+    // Generate JWT
+    const jwtToken = jwt.sign(
+      { 
+        userId: user.userId,
+        email: user.email
+      },
+      process.env.JWT_SECRET,
+      { expiresIn: '7d' }
+    )
+    
+    // Set JWT in HTTP-only cookie
+    const response = jsonResponse({ 
+      success: true, 
+      isNewUser: isNewUser || !user.isSetupComplete 
+    })
+    response.cookies.set({
+      name: 'token',
+      value: jwtToken,
+      httpOnly: true,
+      secure: SESSION_COOKIE_SECURE,
+      sameSite: 'lax', // Changed from 'strict' to 'lax' for better compatibility
+      path: '/',
+      maxAge: 7 * 24 * 60 * 60, // 7 days
+    })
+    
+    return response
+  } catch (error) {
+    console.error('Session creation error:', error)
+    return jsonResponse(
+      { error: 'Authentication failed' },
+      { status: 401 }
+    )
+  }
+}
 
-    // Get today's schedule - GET /api/attendance/today-schedule
-    if (route === '/attendance/today-schedule' && method === 'GET') {
-      const user = await getUserFromToken(request)
-      if (!user) {
-        return handleCORS(NextResponse.json(
-          { error: 'Not authenticated' },
-          { status: 401 }
-        ))
-      }
-      
-      const today = new Date()
-      const dayName = today.toLocaleDateString('en-US', { weekday: 'long' })
-      const todaySchedule = user.timetable?.[dayName] || []
-      
-      return handleCORS(NextResponse.json({
-        date: today.toISOString().split('T')[0],
-        day: dayName,
-        schedule: todaySchedule,
-        subjects: user.subjects || []
-      }))
+// Get current user - GET /api/auth/user
+async function getCurrentUser({ db, decoded }) {
+  const user = await timed('user', () => findUserById(db, decoded.userId))
+  if (!user) {
+    return jsonResponse(
+      { error: 'User not found' },
+      { status: 404 }
+    )
+  }
+  
+  return jsonResponse({ user: toUserProfile(user) })
+}
+
+// Logout - POST /api/auth/logout
+async function logout() {
+  const response = jsonResponse({ success: true })
+  response.cookies.set({
+    name: 'token',
+    value: '',
+    expires: new Date(0),
+    path: '/',
+  })
+  return response
+}
+
+// DASHBOARD ROUTES
+
+// Get homepage data - GET /api/dashboard
+// Same payloads as /auth/user, /attendance/today-schedule and /attendance/status in one round trip
+async function getDashboard({ db, decoded }) {
+  // Every read only needs the userId from the token, so none waits on another
+  const today = new Date().toISOString().split('T')[0]
+  const [user, enteredToday, counts] = await Promise.all([
+    timed('user', () => findUserById(db, decoded.userId)),
+    timed('query', () => hasAttendanceOn(db, decoded.userId, today)),
+    timed('stats', () => getUserCounters(db, decoded.userId))
+  ])
+  
+  if (!user) {
+    return jsonResponse(
+      { error: 'User not found' },
+      { status: 404 }
+    )
+  }
+  
+  return jsonResponse({
+    user: toUserProfile(user),
+    todaySchedule: buildTodaySchedule(user),
+    status: {
+      todayAttendanceEntered: enteredToday,
+      ...statsFromCounters(counts, user.subjects || [])
     }
+  })
+}
 
-    // Get attendance records - GET /api/attendance/records
-    if (route === '/attendance/records' && method === 'GET') {
-      const user = await getUserFromToken(request)
-      if (!user) {
-        return handleCORS(NextResponse.json(
-          { error: 'Not authenticated' },
-          { status: 401 }
-        ))
+// USER ROUTES
+
+// Complete setup - POST /api/user/setup
+async function completeSetup({ db, user, body }) {
+  const { semester, subjects, startDate, endDate, timetable } = body
+  
+  // Update user with setup data
+  await db.collection('users').updateOne(
+    { userId: user.userId },
+    {
+      $set: {
+        semester,
+        subjects,
+        startDate,
+        endDate,
+        timetable,
+        isSetupComplete: true,
+        updatedAt: new Date()
       }
-      
-      const attendanceRecords = await db.collection('attendance')
-        .find({ userId: user.userId })
-        .sort({ date: -1 })
-        .toArray()
-      
-      const stats = calculateAttendanceStats(attendanceRecords, user.subjects || [])
-      const missedDates = getMissedDates(user.startDate, user.endDate, attendanceRecords)
-      
-      return handleCORS(NextResponse.json({
-        records: attendanceRecords,
-        stats,
-        missedDates,
-        subjects: user.subjects || []
-      }))
     }
+  )
+  userCache.delete(user.userId)
+  // A new subject list changes the user's percentage
+  refreshLeaderboardEntry(db, { ...user, subjects, isSetupComplete: true })
+  
+  return jsonResponse({ success: true })
+}
 
-    // Get subject attendance - GET /api/attendance/subject/:subjectName
-    if (route.startsWith('/attendance/subject/') && method === 'GET') {
-      const user = await getUserFromToken(request)
-      if (!user) {
-        return handleCORS(NextResponse.json(
-          { error: 'Not authenticated' },
-          { status: 401 }
-        ))
-      }
-      
-      const subjectName = decodeURIComponent(route.split('/').pop())
-      const attendanceRecords = await db.collection('attendance')
-        .find({ userId: user.userId })
-        .sort({ date: -1 })
-        .toArray()
-      
-      const subjectRecords = attendanceRecords
-        .filter(record => !record.isHoliday)
-        .map(record => ({
-          date: record.date,
-          attendance: record.subjectAttendance.find(sa => sa.subject === subjectName)
-        }))
-        .filter(record => record.attendance)
-      
-      const stats = calculateAttendanceStats(attendanceRecords, user.subjects || [])
-      const subjectStats = stats.subjectStats[subjectName] || { total: 0, attended: 0, percentage: 0 }
-      
-      return handleCORS(NextResponse.json({
-        subject: subjectName,
-        records: subjectRecords,
-        stats: subjectStats
-      }))
+// ATTENDANCE ROUTES
+
+// Get attendance status - GET /api/attendance/status
+async function getAttendanceStatus({ request, db, user }) {
+  const today = new Date().toISOString().split('T')[0]
+  const etag = await timed('etag', () => buildUserETag(db, user, 'status', today))
+  if (isNotModified(request, etag)) return notModified(etag)
+  
+  const [enteredToday, stats] = await Promise.all([
+    timed('query', () => hasAttendanceOn(db, user.userId, today)),
+    timed('stats', () => getUserStats(db, user))
+  ])
+  
+  return withETag(jsonResponse({
+    todayAttendanceEntered: enteredToday,
+    ...stats
+  }), etag)
+}
+
+// Enter attendance - POST /api/attendance/enter
+async function enterAttendance({ db, user, body }) {
+  const { date, isHoliday, subjectAttendance } = body
+  
+  // Create attendance record
+  const attendanceRecord = {
+    attendanceId: uuidv4(),
+    userId: user.userId,
+    date,
+    isHoliday,
+    subjectAttendance,
+    createdAt: new Date()
+  }
+  
+  // A second entry for the same date is rejected by the store
+  const [status] = await timed('insert', () => insertAttendanceRecords(db, user.userId, [attendanceRecord]))
+  if (status === 'duplicate') {
+    return jsonResponse(
+      { error: 'Attendance already entered for this date' },
+      { status: 400 }
+    )
+  }
+  if (status !== 'created') throw new Error(`Could not save attendance for ${date}`)
+  await timed('stats', () => recordUserStats(db, user.userId, [attendanceRecord]))
+  refreshLeaderboardEntry(db, user)
+  
+  return jsonResponse({ success: true })
+}
+
+// Bulk enter attendance - POST /api/attendance/bulk
+// Body: { entries: [{ date, isHoliday, subjectAttendance }] }; responds with one result per entry
+async function enterAttendanceBulk({ db, user, body }) {
+  const { entries } = body
+  
+  const results = entries.map(entry => ({ date: entry?.date ?? null, status: 'pending' }))
+  const records = []
+  const recordIndexes = []
+  const seenDates = new Set()
+  const createdAt = new Date()
+  
+  entries.forEach((rawEntry, index) => {
+    const { value: entry, error } = validateAttendanceEntry(rawEntry)
+    if (error) {
+      results[index] = { ...results[index], status: 'invalid', error }
+      return
     }
+    results[index].date = entry.date
+    if (seenDates.has(entry.date)) {
+      results[index] = { ...results[index], status: 'duplicate', error: 'Date repeated in this request' }
+      return
+    }
+    seenDates.add(entry.date)
+    records.push({
+      attendanceId: uuidv4(),
+      userId: user.userId,
+      date: entry.date,
+      isHoliday: entry.isHoliday,
+      subjectAttendance: entry.subjectAttendance,
+      createdAt
+    })
+    recordIndexes.push(index)
+  })
+  
+  // Dates that already have a record come back as duplicates without stopping the rest
+  const statuses = records.length > 0
+    ? await timed('insert', () => insertAttendanceRecords(db, user.userId, records))
+    : []
+  
+  const inserted = []
+  records.forEach((record, i) => {
+    const index = recordIndexes[i]
+    if (statuses[i] === 'created') {
+      results[index].status = 'created'
+      inserted.push(record)
+    } else if (statuses[i] === 'duplicate') {
+      results[index] = { ...results[index], status: 'duplicate', error: 'Attendance already entered for this date' }
+    } else {
+      results[index] = { ...results[index], status: 'error', error: 'Could not save this date' }
+    }
+  })
+  
+  if (inserted.length > 0) {
+    await timed('stats', () => recordUserStats(db, user.userId, inserted))
+    refreshLeaderboardEntry(db, user)
+  }
+  
+  const summary = { created: 0, duplicate: 0, invalid: 0, error: 0 }
+  results.forEach(result => { summary[result.status] += 1 })
+  
+  return jsonResponse({ results, summary })
+}
 
-    // LEADERBOARD ROUTES
+// Get today's schedule - GET /api/attendance/today-schedule
+async function getTodaySchedule({ user }) {
+  return jsonResponse(buildTodaySchedule(user))
+}
+
+// Get attendance records - GET /api/attendance/records?limit=&cursor=&from=&to=
+// Newest first; cursor is the date of the last record on the previous page
+async function getAttendanceRecords({ request, db, user, searchParams }) {
+  const limit = parseLimit(searchParams.get('limit'), RECORDS_DEFAULT_LIMIT, RECORDS_MAX_LIMIT)
+  const cursor = parseDateParam(searchParams.get('cursor'))
+  const from = parseDateParam(searchParams.get('from'))
+  const to = parseDateParam(searchParams.get('to'))
+  
+  if (cursor.error || from.error || to.error) {
+    return jsonResponse(
+      { error: 'Dates must use the YYYY-MM-DD format' },
+      { status: 400 }
+    )
+  }
+  
+  const etag = await timed('etag', () => buildUserETag(db, user, 'records', limit, cursor.value, from.value, to.value))
+  if (isNotModified(request, etag)) return notModified(etag)
+  
+  // Fetch one extra record to know whether another page exists
+  const rows = await timed('query', () => listAttendanceRecords(db, user.userId, {
+    from: from.value,
+    to: to.value,
+    before: cursor.value,
+    descending: true,
+    limit: limit + 1
+  }))
+  
+  const hasMore = rows.length > limit
+  const records = hasMore ? rows.slice(0, limit) : rows
+  
+  return withETag(jsonResponse({
+    records,
+    nextCursor: hasMore ? records[records.length - 1].date : null
+  }), etag)
+}
+
+// Get attendance summary - GET /api/attendance/summary
+async function getAttendanceSummary({ request, db, user }) {
+  // Missed dates move with the calendar, so today is part of the tag
+  const etag = await timed('etag', () => buildUserETag(db, user, 'summary', new Date().toISOString().split('T')[0]))
+  if (isNotModified(request, etag)) return notModified(etag)
+  
+  // Only the dates are needed for missed dates
+  const [recordedDates, stats] = await Promise.all([
+    timed('query', () => findRecordedDates(db, user.userId)),
+    timed('stats', () => getUserStats(db, user))
+  ])
+  const missed = timedSync('calendar', () => getMissedDates({
+    startDate: user.startDate,
+    endDate: user.endDate,
+    timetable: user.timetable,
+    recordedDates,
+    ...calendarConfig
+  }))
+  
+  return withETag(jsonResponse({
+    stats,
+    missedDates: missed.dates,
+    missedRanges: missed.ranges,
+    missedCount: missed.count,
+    subjects: user.subjects || []
+  }), etag)
+}
+
+// Get attendance projection - GET /api/attendance/projection?target=75
+// Per subject: classes left until endDate, and how many must be attended or can be skipped
+async function getAttendanceProjection({ request, db, user, searchParams }) {
+  const targetParam = searchParams.get('target')
+  const target = targetParam === null ? PROJECTION_DEFAULT_TARGET : Number(targetParam)
+  
+  if (!Number.isInteger(target) || target < 1 || target > 100) {
+    return jsonResponse(
+      { error: 'target must be a whole percentage between 1 and 100' },
+      { status: 400 }
+    )
+  }
+  
+  const today = new Date().toISOString().split('T')[0]
+  const etag = await timed('etag', () => buildUserETag(db, user, 'projection', target, today))
+  if (isNotModified(request, etag)) return notModified(etag)
+  
+  let projection = projectionCache.get(etag)
+  if (!projection) {
+    const [enteredToday, stats] = await Promise.all([
+      timed('query', () => hasAttendanceOn(db, user.userId, today)),
+      timed('stats', () => getUserStats(db, user))
+    ])
     
-    // Get leaderboard - GET /api/leaderboard
-    if (route === '/leaderboard' && method === 'GET') {
-      const users = await db.collection('users')
-        .find({ isSetupComplete: true })
-        .toArray()
-      
-      const leaderboard = []
-      
-      for (const user of users) {
-        const attendanceRecords = await db.collection('attendance')
-          .find({ userId: user.userId })
-          .toArray()
-        
-        const stats = calculateAttendanceStats(attendanceRecords, user.subjects || [])
-        
-        leaderboard.push({
-          userId: user.userId,
-          name: user.name,
-          email: user.email,
-          percentage: stats.overallPercentage,
-          totalClasses: stats.totalClasses,
-          attendedClasses: stats.attendedClasses
-        })
-      }
-      
-      // Sort by percentage (descending)
-      leaderboard.sort((a, b) => b.percentage - a.percentage)
-      
-      return handleCORS(NextResponse.json({ leaderboard }))
+    // Today still counts as remaining until its attendance is entered
+    const firstDay = enteredToday ? fromDayNumber(toDayNumber(today) + 1) : today
+    const fromDate = user.startDate && user.startDate > firstDay ? user.startDate : firstDay
+    const subjects = user.subjects || []
+    const remaining = timedSync('calendar', () => countRemainingSessions({
+      timetable: user.timetable,
+      subjects,
+      fromDate,
+      endDate: user.endDate,
+      ...calendarConfig
+    }))
+    
+    const totalRemaining = subjects.reduce((sum, subject) => sum + remaining[subject], 0)
+    projection = {
+      target,
+      from: fromDate,
+      to: user.endDate || null,
+      overall: projectAttendance({ attended: stats.attendedClasses, total: stats.totalClasses }, totalRemaining, target),
+      subjects: Object.fromEntries(subjects.map(subject => [
+        subject,
+        projectAttendance(stats.subjectStats[subject], remaining[subject], target)
+      ]))
     }
+    projectionCache.set(etag, projection)
+  }
+  
+  return withETag(jsonResponse(projection), etag)
+}
+
+// Get subject attendance - GET /api/attendance/subject/:subjectName
+async function getSubjectAttendance({ request, db, user, params }) {
+  const { subjectName } = params
+  const etag = await timed('etag', () => buildUserETag(db, user, 'subject', subjectName))
+  if (isNotModified(request, etag)) return notModified(etag)
+  
+  const [subjectRecords, subjectStats] = await Promise.all([
+    timed('query', () => findSubjectRecords(db, user.userId, subjectName)),
+    timed('stats', () => getSubjectStats(db, user, subjectName))
+  ])
+  
+  return withETag(jsonResponse({
+    subject: subjectName,
+    records: subjectRecords,
+    stats: subjectStats
+  }), etag)
+}
+
+// EXPORT ROUTES
+
+// Helper function to read the export format query parameter (csv by default; null when unknown)
+function parseExportFormat(searchParams) {
+  const format = searchParams.get('format') || 'csv'
+  return Object.hasOwn(EXPORT_FORMATS, format) ? format : null
+}
+
+// Helper function to build a streaming file download
+function exportResponse(lines, format, name) {
+  const { contentType, extension } = EXPORT_FORMATS[format]
+  const filename = `${name.replace(/[^A-Za-z0-9_-]+/g, '-')}.${extension}`
+  return new NextResponse(toByteStream(lines), {
+    headers: {
+      'Content-Type': contentType,
+      'Content-Disposition': `attachment; filename="${filename}"`,
+      'Cache-Control': 'no-store',
+      'X-Content-Type-Options': 'nosniff'
+    }
+  })
+}
+
+// Export attendance - GET /api/attendance/export?format=csv|ndjson&from=&to=
+// Streams the caller's records oldest first
+async function exportAttendance({ db, user, searchParams }) {
+  const format = parseExportFormat(searchParams)
+  const from = parseDateParam(searchParams.get('from'))
+  const to = parseDateParam(searchParams.get('to'))
+  
+  if (!format) {
+    return jsonResponse(
+      { error: `format must be one of: ${Object.keys(EXPORT_FORMATS).join(', ')}` },
+      { status: 400 }
+    )
+  }
+  if (from.error || to.error) {
+    return jsonResponse(
+      { error: 'Dates must use the YYYY-MM-DD format' },
+      { status: 400 }
+    )
+  }
+  
+  const lines = userExportLines(db, user.userId, format, { from: from.value, to: to.value })
+  return exportResponse(lines, format, `attendance-${new Date().toISOString().split('T')[0]}`)
+}
+
+// Admin export - GET /api/admin/export?semester=&format=csv|ndjson
+// Streams every user's records for one semester, user by user
+async function exportSemester({ db, searchParams }) {
+  const format = parseExportFormat(searchParams)
+  const semester = searchParams.get('semester')
+  
+  if (!format) {
+    return jsonResponse(
+      { error: `format must be one of: ${Object.keys(EXPORT_FORMATS).join(', ')}` },
+      { status: 400 }
+    )
+  }
+  if (!semester) {
+    return jsonResponse(
+      { error: 'semester is required' },
+      { status: 400 }
+    )
+  }
+  
+  return exportResponse(semesterExportLines(db, semester, format), format, `attendance-${semester}`)
+}
+
+// LEADERBOARD ROUTES
 
-    // Route not found
-    return handleCORS(NextResponse.json(
-      { error: `Route ${route} not found` }, 
+// Get leaderboard - GET /api/leaderboard?limit=&cursor=
+// Served from the precomputed snapshot; signed-in callers also get their own entry
+async function getLeaderboard({ request, db, decoded, searchParams }) {
+  const limit = parseLimit(searchParams.get('limit'), LEADERBOARD_DEFAULT_LIMIT, LEADERBOARD_MAX_LIMIT)
+  const cursor = decodeLeaderboardCursor(searchParams.get('cursor'))
+  const userId = decoded?.userId || ''
+  
+  const { builtAt, updatedAt } = await timed('snapshot', () => ensureLeaderboardSnapshot(db, LEADERBOARD_MAX_AGE_MS))
+  const etag = buildETag(['leaderboard', updatedAt?.getTime() ?? 0, userId, limit, searchParams.get('cursor')])
+  if (isNotModified(request, etag)) return notModified(etag)
+
+  // Fetch one extra row to know whether another page exists
+  const [rows, me] = await Promise.all([
+    timed('query', () => getLeaderboardPage(db, { cursor, limit: limit + 1 })),
+    userId ? timed('query', () => getLeaderboardEntry(db, userId)) : null
+  ])
+
+  const hasMore = rows.length > limit
+  const leaderboard = hasMore ? rows.slice(0, limit) : rows
+  const last = leaderboard[leaderboard.length - 1]
+
+  return withETag(jsonResponse({
+    leaderboard,
+    me,
+    nextCursor: hasMore ? encodeLeaderboardCursor(last) : null,
+    snapshot: {
+      builtAt,
+      updatedAt,
+      // Time since the last change, full rebuild or a single user's update
+      ageSeconds: updatedAt ? Math.max(0, Math.round((Date.now() - updatedAt.getTime()) / 1000)) : null
+    }
+  }), etag)
+}
+
+// Route table, compiled once per process
+const router = createRouter([
+  { method: 'GET', path: '/', handler: getRoot },
+  { method: 'GET', path: '/diagnostics', middleware: [requireDiagnostics], handler: getDiagnostics },
+  { method: 'GET', path: '/metrics', middleware: [requireDiagnostics], handler: getMetrics },
+
+  { method: 'POST', path: '/auth/session', middleware: [jsonBody(validateSession)], handler: createSession },
+  { method: 'GET', path: '/auth/user', middleware: [requireToken], handler: getCurrentUser },
+  { method: 'POST', path: '/auth/logout', handler: logout },
+
+  { method: 'GET', path: '/dashboard', middleware: [requireToken], handler: getDashboard },
+
+  { method: 'POST', path: '/user/setup', middleware: [requireUser, jsonBody(validateSetup)], handler: completeSetup },
+
+  { method: 'GET', path: '/attendance/status', middleware: [requireUser], handler: getAttendanceStatus },
+  { method: 'POST', path: '/attendance/enter', middleware: [requireUser, jsonBody(validateAttendanceEntry)], handler: enterAttendance },
+  { method: 'POST', path: '/attendance/bulk', middleware: [requireUser, jsonBody(validateBulkAttendance, BULK_BODY_MAX_BYTES)], handler: enterAttendanceBulk },
+  { method: 'GET', path: '/attendance/today-schedule', middleware: [requireUser], handler: getTodaySchedule },
+  { method: 'GET', path: '/attendance/records', middleware: [requireUser], handler: getAttendanceRecords },
+  { method: 'GET', path: '/attendance/summary', middleware: [requireUser], handler: getAttendanceSummary },
+  { method: 'GET', path: '/attendance/projection', middleware: [requireUser], handler: getAttendanceProjection },
+  { method: 'GET', path: '/attendance/subject/:subjectName', middleware: [requireUser], handler: getSubjectAttendance },
+  { method: 'GET', path: '/attendance/export', middleware: [requireUser], handler: exportAttendance },
+
+  { method: 'GET', path: '/admin/export', middleware: [requireAdmin], handler: exportSemester },
+
+  { method: 'GET', path: '/leaderboard', middleware: [optionalToken], handler: getLeaderboard }
+])
+
+// OPTIONS handler for CORS
+export async function OPTIONS() {
+  return handleCORS(new NextResponse(null, { status: 200 }))
+}
+
+// Route handler function
+async function handleRoute(request, { params }) {
+  return withRequestTiming(async phases => {
+    const started = performance.now()
+    const { path = [] } = params
+    const matched = router.match(request.method, path)
+    const response = handleCORS(await dispatch(request, path, matched))
+
+    // Unmatched paths share one series so metrics cardinality stays bounded
+    const durationMs = performance.now() - started
+    response.headers.set('Server-Timing', formatServerTiming(phases, durationMs))
+    recordRequest({
+      method: request.method,
+      route: matched ? matched.route.path : 'unmatched',
+      status: response.status,
+      durationMs,
+      phases
+    })
+    return response
+  })
+}
+
+// Helper function to run the matched route, turning failures into JSON errors
+async function dispatch(request, path, matched) {
+  if (!matched) {
+    return jsonResponse(
+      { error: `Route /${path.join('/')} not found` }, 
       { status: 404 }
-    ))
+    )
+  }
 
+  try {
+    const context = {
+      request,
+      db: await timed('db', () => connectToMongo()),
+      params: matched.params,
+      searchParams: new URL(request.url).searchParams
+    }
+    return await runRoute(matched.route, context)
   } catch (error) {
     console.error('API Error:', error)
-    return handleCORS(NextResponse.json(
+    return jsonResponse(
       { error: "Internal server error" }, 
       { status: 500 }
-    ))
+    )
   }
 }
 
@@ -494,4 +965,4 @@ export const GET = handleRoute
 export const POST = handleRoute
 export const PUT = handleRoute
 export const DELETE = handleRoute
-export const PATCH = handleRoute
\ No newline at end of file
+export const PATCH = handleRoute
@@ -7,6 +7,14 @@ import { Button } from "@/components/ui/button"
 import { Alert, AlertDescription } from "@/components/ui/alert"
 import { ArrowLeft, BarChart3, Calendar, CheckCircle, XCircle } from 'lucide-react'
 
+// Format a missed-date range as "Mar 3", "Mar 3–7" or "Mar 28–Apr 2"
+function formatRange({ from, to }) {
+  const format = (date, options) => new Date(`${date}T00:00:00Z`).toLocaleDateString('en-US', { timeZone: 'UTC', ...options })
+  if (from === to) return format(from, { month: 'short', day: 'numeric' })
+  const sameMonth = from.slice(0, 7) === to.slice(0, 7)
+  return `${format(from, { month: 'short', day: 'numeric' })}–${format(to, sameMonth ? { day: 'numeric' } : { month: 'short', day: 'numeric' })}`
+}
+
 export default function CheckAttendancePage() {
   const [data, setData] = useState(null)
   const [loading, setLoading] = useState(true)
@@ -16,7 +24,7 @@ export default function CheckAttendancePage() {
   useEffect(() => {
     const fetchAttendanceData = async () => {
       try {
-        const response = await fetch('/api/attendance/records')
+        const response = await fetch('/api/attendance/summary')
         if (response.ok) {
           const data = await response.json()
           setData(data)
@@ -148,7 +156,7 @@ export default function CheckAttendancePage() {
             </div>
 
             {/* Missed Dates */}
-            {data?.missedDates?.length > 0 && (
+            {data?.missedCount > 0 && (
               <div className="mt-8">
                 <h3 className="text-lg font-semibold text-gray-900 mb-4">
                   Missed Attendance Dates
@@ -156,21 +164,22 @@ export default function CheckAttendancePage() {
                 <Alert className="border-orange-200 bg-orange-50">
                   <Calendar className="h-4 w-4 text-orange-600" />
                   <AlertDescription className="text-orange-800">
-                    You have missed logging attendance for {data.missedDates.length} day(s). 
+                    You have missed logging attendance for {data.missedCount} day(s). 
                     Click on any date below to add retroactive attendance.
                   </AlertDescription>
                 </Alert>
                 
                 <div className="flex flex-wrap gap-2 mt-4">
-                  {data.missedDates.map(date => (
+                  {data.missedRanges.map(range => (
                     <Button
-                      key={date}
+                      key={range.from}
                       variant="outline"
                       size="sm"
                       className="text-orange-600 border-orange-300 hover:bg-orange-50"
-                      onClick={() => router.push(`/attendance/missed/${date}`)}
+                      onClick={() => router.push(`/attendance/missed/${range.from}`)}
                     >
-                      {date}
+                      {formatRange(range)}
+                      {range.count > 1 && ` (${range.count} days)`}
                     </Button>
                   ))}
                 </div>
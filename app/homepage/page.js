@@ -17,18 +17,12 @@ export default function HomePage() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        // Get user data
-        const userResponse = await fetch('/api/auth/user')
-        if (userResponse.ok) {
-          const userData = await userResponse.json()
-          setUser(userData.user)
-        }
-
-        // Get attendance status
-        const statusResponse = await fetch('/api/attendance/status')
-        if (statusResponse.ok) {
-          const statusData = await statusResponse.json()
-          setAttendanceStatus(statusData)
+        // Get user data and attendance status in one request
+        const response = await fetch('/api/dashboard')
+        if (response.ok) {
+          const data = await response.json()
+          setUser(data.user)
+          setAttendanceStatus(data.status)
         }
       } catch (error) {
         console.error('Error fetching data:', error)
@@ -10,6 +10,8 @@ import { ArrowLeft, Trophy, Medal, Award, Crown } from 'lucide-react'
 
 export default function LeaderboardPage() {
   const [leaderboard, setLeaderboard] = useState([])
+  const [me, setMe] = useState(null)
+  const [snapshot, setSnapshot] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const router = useRouter()
@@ -21,6 +23,8 @@ export default function LeaderboardPage() {
         if (response.ok) {
           const data = await response.json()
           setLeaderboard(data.leaderboard || [])
+          setMe(data.me || null)
+          setSnapshot(data.snapshot || null)
         } else {
           setError('Failed to load leaderboard')
         }
@@ -90,6 +94,16 @@ export default function LeaderboardPage() {
             <CardDescription className="text-gray-600">
               Top performers ranked by attendance percentage
             </CardDescription>
+            {me && (
+              <div className="text-sm font-medium text-blue-700 mt-2">
+                Your rank: #{me.rank} ({me.percentage}%)
+              </div>
+            )}
+            {snapshot?.ageSeconds != null && (
+              <div className="text-xs text-gray-500 mt-1">
+                Updated {snapshot.ageSeconds < 60 ? 'just now' : `${Math.floor(snapshot.ageSeconds / 60)} min ago`}
+              </div>
+            )}
           </CardHeader>
           
           <CardContent>
@@ -102,7 +116,7 @@ export default function LeaderboardPage() {
             {leaderboard.length > 0 ? (
               <div className="space-y-4">
                 {leaderboard.map((user, index) => {
-                  const rank = index + 1
+                  const rank = user.rank || index + 1
                   return (
                     <Card key={user.userId} className={`${getRankStyle(rank)} shadow-sm`}>
                       <CardContent className="p-6">
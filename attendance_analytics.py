@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Configuration
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'attendance_tracker')
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+COUNT_COLUMNS = ['userId', 'subject', 'weekday', 'recent', 'total', 'attended']
+DAY_COLUMNS = ['userId', 'weekday', 'days']
+ENTRY_COLUMNS = ['userId', 'date', 'subject', 'attended']
+# Compact month documents pack each class as (subject index * PERIOD_SLOTS + period) * 2 + attended,
+# see lib/attendance-store.js
+PERIOD_SLOTS = 16
+# Users per query when looking for attendance documents also stored as compact months
+OVERLAP_BATCH_USERS = 200
+
+def round_half_up(values):
+    """Math.round semantics, like the percentages computed by the API"""
+    return np.floor(np.asarray(values, dtype=float) + 0.5)
+
+def semester_values(semester):
+    """Stored forms of a semester: setup saves a string, older accounts hold the number the setup page sent"""
+    text = str(semester).strip()
+    return [text, int(text)] if text.isdigit() else [text]
+
+def percentage(attended, total):
+    """Rounded attendance percentage; 0 where no classes were held"""
+    attended = np.asarray(attended, dtype=float)
+    total = np.asarray(total, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, round_half_up(attended / total * 100), 0)
+
+def group_entries(entries, class_days, recent_from):
+    """Counters of (userId, date, subject, attended) rows and class days of (userId, date) rows,
+    with weekday 0 = Monday"""
+    entries = entries.assign(weekday=pd.to_datetime(entries['date'], format='%Y-%m-%d').dt.weekday,
+                             recent=entries['date'] >= recent_from)
+    counts = (entries.groupby(['userId', 'subject', 'weekday', 'recent'], dropna=False)['attended']
+              .agg(total='size', attended='sum')
+              .reset_index())
+    days = (class_days.assign(weekday=pd.to_datetime(class_days['date'], format='%Y-%m-%d').dt.weekday)
+            .groupby(['userId', 'weekday']).size()
+            .rename('days').reset_index())
+    return counts[COUNT_COLUMNS], days[DAY_COLUMNS]
+
+def adjust(frame, added, removed, keys):
+    """frame + added - removed, summed per key; rows left with nothing are dropped"""
+    values = [c for c in frame.columns if c not in keys]
+    removed = removed.copy()
+    removed[values] = -removed[values].astype('int64')
+    combined = (pd.concat([frame, added, removed], ignore_index=True)
+                .groupby(keys, as_index=False, dropna=False)[values].sum()
+                .astype({c: 'int64' for c in values}))
+    return combined[combined[values[0]] > 0].reset_index(drop=True)
+
+class MongoSource:
+    """Reads users and pre-grouped attendance counters straight from MongoDB"""
+
+    def __init__(self, semester=None):
+        from pymongo import MongoClient
+        self.client = MongoClient(MONGO_URL)
+        self.db = self.client[DB_NAME]
+        self.semester = semester
+
+    def load_users(self):
+        query = {'isSetupComplete': True}
+        if self.semester:
+            query['semester'] = {'$in': semester_values(self.semester)}
+        projection = {'_id': 0, 'userId': 1, 'name': 1, 'email': 1, 'semester': 1, 'subjects': 1, 'endDate': 1}
+        users = pd.DataFrame(list(self.db.users.find(query, projection)),
+                             columns=['userId', 'name', 'email', 'semester', 'subjects', 'endDate'])
+        users['endDate'] = pd.to_datetime(users['endDate'], errors='coerce')
+        return users
+
+    def load_counts(self, user_ids, recent_from):
+        """Per (user, subject, weekday, recent) counters and per (user, weekday) class days,
+        grouped on the server so only a few rows per student cross the wire"""
+        match = {'isHoliday': {'$ne': True}}
+        if self.semester:
+            match['userId'] = {'$in': list(user_ids)}
+        weekday = {'$dayOfWeek': {'$dateFromString': {'dateString': '$date', 'format': '%Y-%m-%d'}}}
+        recent = {'$gte': ['$date', recent_from]}
+
+        counts = self.db.attendance.aggregate([
+            {'$match': match},
+            {'$unwind': '$subjectAttendance'},
+            {'$group': {
+                '_id': {'userId': '$userId', 'subject': '$subjectAttendance.subject', 'weekday': weekday, 'recent': recent},
+                'total': {'$sum': 1},
+                'attended': {'$sum': {'$cond': [{'$eq': ['$subjectAttendance.status', 'attended']}, 1, 0]}}
+            }}
+        ], allowDiskUse=True, batchSize=10000)
+        counts = pd.DataFrame(
+            [(r['_id']['userId'], r['_id']['subject'], r['_id']['weekday'], r['_id']['recent'], r['total'], r['attended'])
+             for r in counts],
+            columns=COUNT_COLUMNS
+        )
+
+        days = self.db.attendance.aggregate([
+            {'$match': match},
+            {'$group': {'_id': {'userId': '$userId', 'weekday': weekday}, 'days': {'$sum': 1}}}
+        ], allowDiskUse=True, batchSize=10000)
+        days = pd.DataFrame([(r['_id']['userId'], r['_id']['weekday'], r['days']) for r in days], columns=DAY_COLUMNS)
+
+        # $dayOfWeek is 1 = Sunday ... 7 = Saturday; use 0 = Monday like WEEKDAYS
+        counts['weekday'] = (counts['weekday'] + 5) % 7
+        days['weekday'] = (days['weekday'] + 5) % 7
+
+        # With ATTENDANCE_STORAGE=compact, records live in attendance_months too. A date
+        # stored in both while scripts/compact-attendance.js runs counts once, from the
+        # month document, like the API's reads.
+        compact_entries, compact_days, compact_dates = self.load_compact(user_ids)
+        if compact_dates:
+            overlap_entries, overlap_days = self.load_overlap(compact_dates)
+            added_counts, added_days = group_entries(compact_entries, compact_days, recent_from)
+            removed_counts, removed_days = group_entries(overlap_entries, overlap_days, recent_from)
+            counts = adjust(counts, added_counts, removed_counts, COUNT_COLUMNS[:4])
+            days = adjust(days, added_days, removed_days, DAY_COLUMNS[:2])
+        return counts, days
+
+    def load_compact(self, user_ids):
+        """Non-holiday classes and class days of the compact month documents, plus every date
+        they hold per user, holidays included"""
+        query = {'days': {'$ne': {}}}
+        if self.semester:
+            query['userId'] = {'$in': list(user_ids)}
+        projection = {'_id': 0, 'userId': 1, 'month': 1, 'subjects': 1, 'days': 1}
+        entries, class_days, dates = [], [], {}
+        for doc in self.db.attendance_months.find(query, projection, batch_size=1000):
+            subjects = doc.get('subjects') or []
+            for day, stored in doc['days'].items():
+                date = f"{doc['month']}-{day}"
+                dates.setdefault(doc['userId'], []).append(date)
+                if stored.get('h'):
+                    continue
+                class_days.append((doc['userId'], date))
+                for code in stored.get('c', []):
+                    entries.append((doc['userId'], date, subjects[code // 2 // PERIOD_SLOTS], code % 2 == 1))
+        return (pd.DataFrame(entries, columns=ENTRY_COLUMNS),
+                pd.DataFrame(class_days, columns=['userId', 'date']),
+                dates)
+
+    def load_overlap(self, compact_dates):
+        """Non-holiday classes and class days of the attendance documents on dates that also
+        have a compact record"""
+        entries, class_days = [], []
+        users = list(compact_dates.items())
+        for start in range(0, len(users), OVERLAP_BATCH_USERS):
+            query = {
+                '$or': [{'userId': user_id, 'date': {'$in': dates}}
+                        for user_id, dates in users[start:start + OVERLAP_BATCH_USERS]],
+                'isHoliday': {'$ne': True}
+            }
+            for doc in self.db.attendance.find(query, {'_id': 0, 'userId': 1, 'date': 1, 'subjectAttendance': 1}):
+                class_days.append((doc['userId'], doc['date']))
+                for sa in doc.get('subjectAttendance') or []:
+                    entries.append((doc['userId'], doc['date'], sa.get('subject'), sa.get('status') == 'attended'))
+        return pd.DataFrame(entries, columns=ENTRY_COLUMNS), pd.DataFrame(class_days, columns=['userId', 'date'])
+
+    def close(self):
+        self.client.close()
+
+class NdjsonSource:
+    """Reads a /api/attendance/export or /api/admin/export NDJSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = self.read_records(path)
+
+    @staticmethod
+    def read_records(path):
+        """One row per (record, subject): userId, name, email, date, subject, attended"""
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            import pyarrow.json as pj
+        except ImportError:
+            return NdjsonSource.read_records_pandas(path)
+
+        table = pj.read_json(path)
+        table = table.filter(pc.invert(pc.fill_null(table['isHoliday'], False)))
+        entries = table['subjectAttendance']
+        parents = pc.list_parent_indices(entries)
+        flat = pc.list_flatten(entries)
+        columns = {
+            'date': table['date'].take(parents),
+            'subject': pc.struct_field(flat, 'subject'),
+            'attended': pc.equal(pc.struct_field(flat, 'status'), 'attended')
+        }
+        for column in ('userId', 'name', 'email'):
+            if column in table.column_names:
+                columns[column] = table[column].take(parents)
+        # Repeated strings become categoricals instead of millions of Python str objects
+        return pa.table(columns).to_pandas(strings_to_categorical=True)
+
+    @staticmethod
+    def read_records_pandas(path):
+        table = pd.read_json(path, lines=True, dtype=False)
+        table = table[~table['isHoliday'].fillna(False).astype(bool)]
+        exploded = table.explode('subjectAttendance', ignore_index=True).dropna(subset=['subjectAttendance'])
+        entries = pd.json_normalize(exploded['subjectAttendance'].tolist())
+        records = exploded.drop(columns=['subjectAttendance', 'isHoliday'])
+        records['subject'] = entries['subject'].to_numpy()
+        records['attended'] = (entries['status'] == 'attended').to_numpy()
+        return records
+
+    def load_users(self):
+        records = self.records
+        if 'userId' not in records:
+            # A personal export has no user columns
+            records['userId'] = 'me'
+        columns = [c for c in ('userId', 'name', 'email') if c in records]
+        users = records[columns].drop_duplicates('userId').reset_index(drop=True)
+        users['endDate'] = pd.NaT
+        return users
+
+    def load_counts(self, user_ids, recent_from):
+        records = self.records
+        dates = records['date'].astype('category')
+        # Parse each distinct date once
+        weekdays = pd.to_datetime(dates.cat.categories, format='%Y-%m-%d').weekday
+        records['weekday'] = weekdays.to_numpy()[dates.cat.codes.to_numpy()]
+        records['recent'] = (dates.cat.categories >= recent_from)[dates.cat.codes.to_numpy()]
+        counts = (records.groupby(['userId', 'subject', 'weekday', 'recent'], observed=True)['attended']
+                  .agg(total='size', attended='sum')
+                  .reset_index())
+        days = (records.drop_duplicates(['userId', 'date'])
+                .groupby(['userId', 'weekday']).size()
+                .rename('days').reset_index())
+        return counts[COUNT_COLUMNS], days[DAY_COLUMNS]
+
+    def close(self):
+        pass
+
+class AttendanceAnalytics:
+    """Vectorized attendance matrices, threshold report and end-of-term projection"""
+
+    def __init__(self, users, counts, days, threshold, as_of, term_end=None):
+        # Classes to reach the threshold divide by (100 - threshold); 100% can't be reached again after a miss
+        if not 0 <= threshold < 100:
+            raise ValueError(f"threshold must be at least 0 and below 100, got {threshold:g}")
+        self.users = users.set_index('userId')
+        self.threshold = threshold
+        self.as_of = as_of
+        self.term_end = term_end
+
+        # Like the API, only count subjects still in each student's subject list
+        if 'subjects' in users and users['subjects'].notna().any():
+            enrolled = users[['userId', 'subjects']].explode('subjects').rename(columns={'subjects': 'subject'})
+            counts = counts.merge(enrolled.dropna(), on=['userId', 'subject'])
+        self.counts = counts[counts['userId'].isin(self.users.index)]
+        self.days = days[days['userId'].isin(self.users.index)]
+
+    def matrix(self, index, columns):
+        """Percentage matrix over two count dimensions"""
+        grouped = self.counts.groupby([index, columns], observed=True)[['attended', 'total']].sum()
+        result = pd.Series(percentage(grouped['attended'], grouped['total']), index=grouped.index).unstack(columns)
+        if columns == 'weekday':
+            result = result.rename(columns=dict(enumerate(WEEKDAYS)))
+        return result
+
+    def remaining_class_days(self, term_end):
+        """Days per weekday left between as_of (exclusive) and each student's term end (inclusive)"""
+        start = np.datetime64(self.as_of + timedelta(days=1), 'D')
+        end = (term_end.values.astype('datetime64[D]') + np.timedelta64(1, 'D'))
+        end = np.where(np.isnat(end), start, np.maximum(end, start))
+        remaining = np.empty((len(term_end), 7))
+        for weekday in range(7):
+            mask = [0] * 7
+            mask[weekday] = 1
+            remaining[:, weekday] = np.busday_count(start, end, weekmask=mask)
+        return remaining
+
+    def students(self):
+        """One row per student: totals, percentage, threshold gap and projection"""
+        totals = self.counts.groupby('userId')[['total', 'attended']].sum()
+        recent = self.counts[self.counts['recent']].groupby('userId')[['total', 'attended']].sum()
+        students = self.users.drop(columns=['subjects', 'semester'], errors='ignore').join(totals).fillna(
+            {'total': 0, 'attended': 0})
+        students[['total', 'attended']] = students[['total', 'attended']].astype(int)
+        students['percentage'] = percentage(students['attended'], students['total'])
+
+        # Consecutive attended classes needed to reach the threshold
+        share = self.threshold / 100
+        needed = np.ceil((share * students['total'] - students['attended']) / (1 - share))
+        students['below_threshold'] = students['percentage'] < self.threshold
+        students['classes_to_threshold'] = np.where(students['below_threshold'], np.maximum(needed, 0), 0).astype(int)
+
+        # Project the term end from the recent attendance rate and the classes still to come
+        term_end = students['endDate']
+        if self.term_end is not None:
+            term_end = pd.Series(pd.Timestamp(self.term_end), index=students.index)
+        classes_per_day = (self.counts.groupby(['userId', 'weekday'])['total'].sum()
+                           .div(self.days.set_index(['userId', 'weekday'])['days'])
+                           .unstack('weekday').reindex(index=students.index, columns=range(7)).fillna(0))
+        remaining_classes = (self.remaining_class_days(term_end) * classes_per_day.to_numpy()).sum(axis=1)
+        recent = recent.reindex(students.index).fillna(0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            recent_rate = np.where(recent['total'] > 0, recent['attended'] / recent['total'],
+                                   np.where(students['total'] > 0, students['attended'] / students['total'], 0))
+        students['remaining_classes'] = round_half_up(remaining_classes).astype(int)
+        students['recent_percentage'] = round_half_up(recent_rate * 100)
+        students['projected_percentage'] = np.where(
+            term_end.notna(),
+            percentage(students['attended'] + recent_rate * remaining_classes, students['total'] + remaining_classes),
+            np.nan
+        )
+        return students.drop(columns=['endDate']).sort_values(['percentage', 'total'], ascending=[True, False])
+
+    def reports(self):
+        students = self.students()
+        return {
+            'students': students,
+            'below_threshold': students[students['below_threshold']],
+            'student_subject': self.matrix('userId', 'subject'),
+            'student_weekday': self.matrix('userId', 'weekday'),
+            'subject_weekday': self.matrix('subject', 'weekday')
+        }
+
+def write_reports(reports, output_dir, output_format):
+    """Write each report as output_dir/<name>.csv or .parquet"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, frame in reports.items():
+        path = os.path.join(output_dir, f"{name}.{output_format}")
+        # Parquet needs string column names (weekday and subject matrices)
+        frame = frame.rename(columns=str)
+        if output_format == 'parquet':
+            frame.to_parquet(path)
+        else:
+            frame.to_csv(path)
+        paths.append(path)
+    return paths
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Attendance matrices, threshold report and end-of-term projection")
+    parser.add_argument('--ndjson', help="read an NDJSON export instead of MongoDB (MONGO_URL, DB_NAME)")
+    parser.add_argument('--semester', help="only students of this semester (MongoDB source)")
+    parser.add_argument('--threshold', type=float, default=75, help="minimum attendance percentage, below 100")
+    parser.add_argument('--as-of', default=date.today().isoformat(), help="projection start date (YYYY-MM-DD)")
+    parser.add_argument('--term-end', help="term end date (YYYY-MM-DD); defaults to each student's endDate")
+    parser.add_argument('--recent-days', type=int, default=28, help="window of the attendance rate used for projections")
+    parser.add_argument('--output-dir', default='analytics', help="directory for the report files")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="report file format")
+    args = parser.parse_args()
+    if not 0 <= args.threshold < 100:
+        parser.error("--threshold must be at least 0 and below 100")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    started = time.perf_counter()
+
+    as_of = datetime.strptime(args.as_of, '%Y-%m-%d').date()
+    term_end = datetime.strptime(args.term_end, '%Y-%m-%d').date() if args.term_end else None
+    recent_from = (as_of - timedelta(days=args.recent_days - 1)).isoformat()
+
+    source = NdjsonSource(args.ndjson) if args.ndjson else MongoSource(args.semester)
+    try:
+        users = source.load_users()
+        counts, days = source.load_counts(users['userId'], recent_from)
+    finally:
+        source.close()
+    loaded = time.perf_counter()
+
+    if users.empty:
+        print("No students found")
+        sys.exit(1)
+
+    reports = AttendanceAnalytics(users, counts, days, args.threshold, as_of, term_end).reports()
+    paths = write_reports(reports, args.output_dir, args.format)
+
+    students = reports['students']
+    print(f"{len(students)} students, {int(students['total'].sum())} classes; "
+          f"median {students['percentage'].median():.0f}%, "
+          f"{len(reports['below_threshold'])} below {args.threshold:g}%")
+    if students['projected_percentage'].notna().any():
+        projected_below = (students['projected_percentage'] < args.threshold).sum()
+        print(f"Projected below {args.threshold:g}% at term end: {projected_below}")
+    print(f"Loaded in {loaded - started:.1f}s, analysed in {time.perf_counter() - loaded:.1f}s; "
+          f"wrote {len(paths)} files to {args.output_dir}")
+    sys.exit(0)
@@ -1,44 +1,111 @@
 #!/usr/bin/env python3
 
-import requests
+import asyncio
 import json
+import os
 import sys
-import time
 from datetime import datetime, timedelta
-import jwt
 
-# Configuration
-BASE_URL = "https://cf85198e-f07a-4af1-b7e1-9c9ff2fb1e3a.preview.emergentagent.com"
-API_BASE = f"{BASE_URL}/api"
+from api_test_support import AsyncApiTestRunner, FixtureError, make_mock_token
 
-class AttendanceTrackerAPITest:
+# Server-side latency budget per request, from the Server-Timing "total" metric.
+# LATENCY_BUDGET_MS sets the default; LATENCY_BUDGETS_MS overrides single endpoints.
+LATENCY_BUDGET_MS = float(os.environ.get('LATENCY_BUDGET_MS', '500'))
+LATENCY_BUDGETS_MS = {
+    'POST /api/attendance/bulk': 2000,
+    'POST /api/auth/session': 1000,
+    # The first request after a deploy may build the leaderboard snapshot
+    'GET /api/leaderboard': 1500
+}
+
+SETUP_DATA = {
+    'semester': 'Fall 2024',
+    'subjects': ['Mathematics', 'Physics', 'Chemistry', 'Computer Science', 'English'],
+    'startDate': '2024-01-15',
+    'endDate': '2024-05-15',
+    'timetable': {
+        'Monday': ['Mathematics', 'Physics', 'Chemistry'],
+        'Tuesday': ['Computer Science', 'English', 'Mathematics'],
+        'Wednesday': ['Physics', 'Chemistry', 'Computer Science'],
+        'Thursday': ['English', 'Mathematics', 'Physics'],
+        'Friday': ['Chemistry', 'Computer Science', 'English'],
+        'Saturday': ['Mathematics', 'Physics'],
+        'Sunday': []
+    }
+}
+
+# Setup as the setup page sends it: semester as a number, six periods Monday-Saturday
+FRONTEND_SETUP_DATA = {
+    'semester': 3,
+    'subjects': ['Mathematics', 'Physics', 'Chemistry'],
+    'startDate': '2024-01-15',
+    'endDate': '2024-05-15',
+    'timetable': {day: ['Mathematics', 'Physics', 'Mathematics', 'Chemistry', 'Physics', 'Chemistry']
+                  for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']}
+}
+
+def history_entries(days=5):
+    """Attendance for today and the days before it, with a holiday yesterday"""
+    entries = []
+    for offset in range(days):
+        date = (datetime.now() - timedelta(days=offset)).strftime('%Y-%m-%d')
+        if offset == 1:
+            entries.append({'date': date, 'isHoliday': True, 'subjectAttendance': []})
+            continue
+        entries.append({'date': date, 'isHoliday': False, 'subjectAttendance': [
+            {'subject': subject, 'status': 'missed' if (offset + i) % 3 == 0 else 'attended'}
+            for i, subject in enumerate(SETUP_DATA['subjects'][:3])
+        ]})
+    return entries
+
+def parse_server_timing(header):
+    """Parse a Server-Timing header into {metric: duration in ms}"""
+    timings = {}
+    for entry in (header or '').split(','):
+        name, *params = [part.strip() for part in entry.split(';')]
+        if not name:
+            continue
+        for param in params:
+            key, _, value = param.partition('=')
+            if key == 'dur':
+                timings[name] = float(value)
+    return timings
+
+class AttendanceTrackerAPITest(AsyncApiTestRunner):
     def __init__(self):
-        self.session = requests.Session()
-        self.user_token = None
-        self.user_id = None
-        self.test_results = []
-        
-    def log_test(self, test_name, success, message="", details=None):
-        """Log test results"""
-        status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status}: {test_name}")
-        if message:
-            print(f"   {message}")
-        if details:
-            print(f"   Details: {details}")
-        
-        self.test_results.append({
-            'test': test_name,
-            'success': success,
-            'message': message,
-            'details': details
-        })
-        print()
-    
-    def test_root_endpoint(self):
+        super().__init__()
+        self.server_timings = []
+
+    def event_hooks(self):
+        return {'response': [self.record_server_timing]}
+
+    async def record_server_timing(self, response):
+        """Keep the Server-Timing phases of every API response for the latency budget check"""
+        timings = parse_server_timing(response.headers.get('Server-Timing'))
+        if timings:
+            self.server_timings.append((f"{response.request.method} {response.request.url.path}", timings))
+
+    # FIXTURES
+
+    async def make_history_user(self):
+        """Set-up user with a few days of attendance; shared by the read-only tests"""
+        user = await self.sign_in('history', SETUP_DATA)
+        entries = history_entries()
+        response = await user.post('/attendance/bulk', json={'entries': entries})
+        if response.status_code != 200 or response.json()['summary']['created'] != len(entries):
+            raise FixtureError(f"Could not seed attendance history: {response.status_code} {response.text}")
+        user.user_id = (await user.get('/auth/user')).json()['user']['id']
+        return user
+
+    def history_user(self):
+        return self.fixture('history', self.make_history_user)
+
+    # TESTS
+
+    async def test_root_endpoint(self):
         """Test the root API endpoint"""
         try:
-            response = self.session.get(f"{API_BASE}/")
+            response = await self.client().get("/")
             if response.status_code == 200:
                 data = response.json()
                 if data.get('message') == "Attendance Tracker API":
@@ -53,34 +120,20 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Root Endpoint", False, f"Exception: {str(e)}")
             return False
-    
-    def test_auth_session_creation(self):
+
+    async def test_auth_session_creation(self):
         """Test session creation with authentication"""
         try:
             # Create a mock JWT token for testing
-            test_payload = {
-                'email': 'john.doe@university.edu',
-                'name': 'John Doe',
-                'iat': int(time.time()),
-                'exp': int(time.time()) + 3600
-            }
-            
-            # Create a simple token (the backend doesn't verify signature in test mode)
-            mock_token = jwt.encode(test_payload, 'test_secret', algorithm='HS256')
-            
-            response = self.session.post(
-                f"{API_BASE}/auth/session",
-                json={'token': mock_token},
-                headers={'Content-Type': 'application/json'}
-            )
-            
+            mock_token = make_mock_token(f'john.doe.{self.run_id}@university.edu', 'John Doe')
+
+            response = await self.client().post("/auth/session", json={'token': mock_token})
+
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
                     # Check if session cookie is set
-                    cookies = response.cookies
-                    if 'token' in cookies:
-                        self.user_token = cookies['token']
+                    if 'token' in response.cookies:
                         self.log_test("Auth Session Creation", True, f"Session created, isNewUser: {data.get('isNewUser')}")
                         return True
                     else:
@@ -95,17 +148,17 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Auth Session Creation", False, f"Exception: {str(e)}")
             return False
-    
-    def test_auth_user_retrieval(self):
+
+    async def test_auth_user_retrieval(self):
         """Test user retrieval with valid session"""
         try:
-            response = self.session.get(f"{API_BASE}/auth/user")
-            
+            session = await self.sign_in('user-retrieval')
+            response = await session.get("/auth/user")
+
             if response.status_code == 200:
                 data = response.json()
                 user = data.get('user')
-                if user and 'id' in user and 'email' in user:
-                    self.user_id = user['id']
+                if user and 'id' in user and user.get('email') == session.email:
                     self.log_test("Auth User Retrieval", True, f"User retrieved: {user['name']} ({user['email']})")
                     return True
                 else:
@@ -120,32 +173,13 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Auth User Retrieval", False, f"Exception: {str(e)}")
             return False
-    
-    def test_user_setup(self):
+
+    async def test_user_setup(self):
         """Test user setup workflow"""
         try:
-            setup_data = {
-                'semester': 'Fall 2024',
-                'subjects': ['Mathematics', 'Physics', 'Chemistry', 'Computer Science', 'English'],
-                'startDate': '2024-01-15',
-                'endDate': '2024-05-15',
-                'timetable': {
-                    'Monday': ['Mathematics', 'Physics', 'Chemistry'],
-                    'Tuesday': ['Computer Science', 'English', 'Mathematics'],
-                    'Wednesday': ['Physics', 'Chemistry', 'Computer Science'],
-                    'Thursday': ['English', 'Mathematics', 'Physics'],
-                    'Friday': ['Chemistry', 'Computer Science', 'English'],
-                    'Saturday': ['Mathematics', 'Physics'],
-                    'Sunday': []
-                }
-            }
-            
-            response = self.session.post(
-                f"{API_BASE}/user/setup",
-                json=setup_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
+            user = await self.sign_in('setup')
+            response = await user.post("/user/setup", json=SETUP_DATA)
+
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
@@ -166,16 +200,17 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("User Setup", False, f"Exception: {str(e)}")
             return False
-    
-    def test_attendance_status(self):
+
+    async def test_attendance_status(self):
         """Test attendance status retrieval"""
         try:
-            response = self.session.get(f"{API_BASE}/attendance/status")
-            
+            user = await self.history_user()
+            response = await user.get("/attendance/status")
+
             if response.status_code == 200:
                 data = response.json()
                 required_fields = ['todayAttendanceEntered', 'totalClasses', 'attendedClasses', 'overallPercentage', 'subjectStats']
-                
+
                 if all(field in data for field in required_fields):
                     self.log_test("Attendance Status", True, f"Status retrieved - Overall: {data['overallPercentage']}%")
                     return True
@@ -192,16 +227,59 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Attendance Status", False, f"Exception: {str(e)}")
             return False
-    
-    def test_today_schedule(self):
+
+    async def test_dashboard(self):
+        """Test the combined dashboard payload matches the separate endpoints"""
+        try:
+            user = await self.history_user()
+            response = await user.get("/dashboard")
+
+            if response.status_code == 200:
+                data = response.json()
+                required_fields = ['user', 'todaySchedule', 'status']
+                if not all(field in data for field in required_fields):
+                    missing = [f for f in required_fields if f not in data]
+                    self.log_test("Dashboard", False, f"Missing fields: {missing}")
+                    return False
+
+                user_response, schedule_response, status_response = await asyncio.gather(
+                    user.get("/auth/user"),
+                    user.get("/attendance/today-schedule"),
+                    user.get("/attendance/status")
+                )
+                separate = {
+                    'user': user_response.json()['user'],
+                    'todaySchedule': schedule_response.json(),
+                    'status': status_response.json()
+                }
+                mismatched = [key for key in required_fields if data[key] != separate[key]]
+                if mismatched:
+                    self.log_test("Dashboard", False, f"Payload differs from separate endpoints: {mismatched}",
+                                  {key: (data[key], separate[key]) for key in mismatched})
+                    return False
+
+                self.log_test("Dashboard", True, "Combined payload matches /auth/user, /attendance/today-schedule and /attendance/status")
+                return True
+            elif response.status_code == 401:
+                self.log_test("Dashboard", False, "Authentication required")
+                return False
+            else:
+                self.log_test("Dashboard", False, f"Status code: {response.status_code}")
+                return False
+        except Exception as e:
+            self.log_test("Dashboard", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_today_schedule(self):
         """Test today's schedule retrieval"""
         try:
-            response = self.session.get(f"{API_BASE}/attendance/today-schedule")
-            
+            user = await self.history_user()
+            response = await user.get("/attendance/today-schedule")
+
             if response.status_code == 200:
                 data = response.json()
                 required_fields = ['date', 'day', 'schedule', 'subjects']
-                
+
                 if all(field in data for field in required_fields):
                     self.log_test("Today's Schedule", True, f"Schedule for {data['day']}: {len(data['schedule'])} classes")
                     return True
@@ -218,10 +296,12 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Today's Schedule", False, f"Exception: {str(e)}")
             return False
-    
-    def test_attendance_entry(self):
+
+    async def test_attendance_entry(self):
         """Test attendance entry functionality"""
         try:
+            user = await self.sign_in('attendance-entry', SETUP_DATA)
+
             # Test regular attendance entry
             today = datetime.now().strftime('%Y-%m-%d')
             attendance_data = {
@@ -233,30 +313,22 @@ class AttendanceTrackerAPITest:
                     {'subject': 'Chemistry', 'status': 'missed'}
                 ]
             }
-            
-            response = self.session.post(
-                f"{API_BASE}/attendance/enter",
-                json=attendance_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
+
+            response = await user.post("/attendance/enter", json=attendance_data)
+
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
                     self.log_test("Attendance Entry", True, "Attendance recorded successfully")
-                    
+
                     # Test duplicate entry (should fail)
-                    response2 = self.session.post(
-                        f"{API_BASE}/attendance/enter",
-                        json=attendance_data,
-                        headers={'Content-Type': 'application/json'}
-                    )
-                    
+                    response2 = await user.post("/attendance/enter", json=attendance_data)
+
                     if response2.status_code == 400:
                         self.log_test("Duplicate Attendance Prevention", True, "Duplicate entry correctly prevented")
                     else:
                         self.log_test("Duplicate Attendance Prevention", False, "Duplicate entry not prevented")
-                    
+
                     return True
                 else:
                     self.log_test("Attendance Entry", False, f"Entry failed: {data}")
@@ -270,23 +342,61 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Attendance Entry", False, f"Exception: {str(e)}")
             return False
-    
-    def test_holiday_entry(self):
+
+    async def test_frontend_payloads(self):
+        """Test setup and attendance entry with the payloads the pages send"""
+        try:
+            user = await self.sign_in('frontend-payloads')
+            response = await user.post("/user/setup", json=FRONTEND_SETUP_DATA)
+            if response.status_code != 200:
+                self.log_test("Frontend Payloads", False, f"Setup: {response.status_code} {response.text}")
+                return False
+
+            # The attendance page sends one entry per timetable period
+            schedule = FRONTEND_SETUP_DATA['timetable']['Monday']
+            response = await user.post("/attendance/enter", json={
+                'date': datetime.now().strftime('%Y-%m-%d'),
+                'isHoliday': False,
+                'subjectAttendance': [
+                    {'subject': subject, 'period': index + 1, 'status': 'attended'}
+                    for index, subject in enumerate(schedule)
+                ]
+            })
+            if response.status_code != 200:
+                self.log_test("Frontend Payloads", False, f"Attendance entry: {response.status_code} {response.text}")
+                return False
+
+            # The subject page shows the period of each record
+            response = await user.get("/attendance/subject/Mathematics")
+            data = response.json() if response.status_code == 200 else {}
+            records = data.get('records', [])
+            if not records or records[0].get('attendance', {}).get('period') != 1:
+                self.log_test("Frontend Payloads", False, f"Period not stored: {records[:1]}")
+                return False
+            # Mathematics is in two periods, and both classes count
+            if data.get('stats', {}).get('total') != schedule.count('Mathematics'):
+                self.log_test("Frontend Payloads", False, f"Repeated subject miscounted: {data.get('stats')}")
+                return False
+
+            self.log_test("Frontend Payloads", True, "Numeric semester accepted, periods and repeated subjects stored")
+            return True
+        except Exception as e:
+            self.log_test("Frontend Payloads", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_holiday_entry(self):
         """Test holiday marking functionality"""
         try:
+            user = await self.sign_in('holiday-entry', SETUP_DATA)
             yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
             holiday_data = {
                 'date': yesterday,
                 'isHoliday': True,
                 'subjectAttendance': []
             }
-            
-            response = self.session.post(
-                f"{API_BASE}/attendance/enter",
-                json=holiday_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
+
+            response = await user.post("/attendance/enter", json=holiday_data)
+
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
@@ -304,25 +414,78 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Holiday Entry", False, f"Exception: {str(e)}")
             return False
-    
-    def test_attendance_records(self):
-        """Test attendance records retrieval"""
+
+    async def test_bulk_attendance(self):
+        """Test bulk attendance backfill with a partially conflicting batch"""
+        try:
+            user = await self.sign_in('bulk-attendance', SETUP_DATA)
+            today = datetime.now().strftime('%Y-%m-%d')
+            await user.post("/attendance/enter", json={'date': today, 'isHoliday': True, 'subjectAttendance': []})
+
+            new_dates = ['2024-02-05', '2024-02-06']
+            entries = [
+                {'date': new_dates[0], 'isHoliday': False, 'subjectAttendance': [
+                    {'subject': 'Mathematics', 'status': 'attended'},
+                    {'subject': 'Physics', 'status': 'missed'}
+                ]},
+                {'date': new_dates[1], 'isHoliday': True, 'subjectAttendance': []},
+                {'date': today, 'isHoliday': False, 'subjectAttendance': []},
+                {'date': new_dates[0], 'isHoliday': False, 'subjectAttendance': []},
+                {'date': '2024-02-31', 'isHoliday': False, 'subjectAttendance': []}
+            ]
+            expected = ['created', 'created', 'duplicate', 'duplicate', 'invalid']
+
+            response = await user.post("/attendance/bulk", json={'entries': entries})
+
+            if response.status_code != 200:
+                self.log_test("Bulk Attendance", False, f"Status code: {response.status_code}, Response: {response.text}")
+                return False
+
+            data = response.json()
+            statuses = [r['status'] for r in data.get('results', [])]
+            if statuses != expected:
+                self.log_test("Bulk Attendance", False, f"Expected {expected}, got {statuses}", data.get('results'))
+                return False
+
+            # Replaying the batch must create nothing
+            replay = (await user.post("/attendance/bulk", json={'entries': entries[:2]})).json()
+            replay_statuses = [r['status'] for r in replay.get('results', [])]
+            if replay_statuses != ['duplicate', 'duplicate']:
+                self.log_test("Bulk Attendance", False, f"Replay expected duplicates, got {replay_statuses}")
+                return False
+
+            self.log_test("Bulk Attendance", True, f"Partial-conflict batch handled: {data['summary']}")
+            return True
+        except Exception as e:
+            self.log_test("Bulk Attendance", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_attendance_records(self):
+        """Test paginated attendance records retrieval"""
         try:
-            response = self.session.get(f"{API_BASE}/attendance/records")
-            
+            user = await self.history_user()
+            response = await user.get("/attendance/records")
+
             if response.status_code == 200:
                 data = response.json()
-                required_fields = ['records', 'stats', 'missedDates', 'subjects']
-                
-                if all(field in data for field in required_fields):
-                    records_count = len(data['records'])
-                    missed_count = len(data['missedDates'])
-                    self.log_test("Attendance Records", True, f"Retrieved {records_count} records, {missed_count} missed dates")
-                    return True
-                else:
+                required_fields = ['records', 'nextCursor']
+
+                if not all(field in data for field in required_fields):
                     missing = [f for f in required_fields if f not in data]
                     self.log_test("Attendance Records", False, f"Missing fields: {missing}")
                     return False
+
+                records = data['records']
+                dates = [r['date'] for r in records]
+                if dates != sorted(dates, reverse=True):
+                    self.log_test("Attendance Records", False, f"Records not sorted newest first: {dates}")
+                    return False
+                if any('_id' in r or 'userId' in r for r in records):
+                    self.log_test("Attendance Records", False, "Records include unprojected fields")
+                    return False
+
+                self.log_test("Attendance Records", True, f"Retrieved {len(records)} records")
+                return await self.check_records_pagination(user, dates)
             elif response.status_code == 401:
                 self.log_test("Attendance Records", False, "Authentication required")
                 return False
@@ -332,17 +495,87 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Attendance Records", False, f"Exception: {str(e)}")
             return False
-    
-    def test_subject_attendance(self):
+
+    async def check_records_pagination(self, user, dates):
+        """Walk the records one per page and check the from/to range filter"""
+        try:
+            paged = []
+            cursor = None
+            for _ in range(len(dates) + 1):
+                params = {'limit': 1}
+                if cursor:
+                    params['cursor'] = cursor
+                data = (await user.get("/attendance/records", params=params)).json()
+                paged.extend(r['date'] for r in data['records'])
+                cursor = data['nextCursor']
+                if not cursor:
+                    break
+
+            if paged != dates:
+                self.log_test("Attendance Records Pagination", False, f"Expected {dates}, got {paged}")
+                return False
+
+            if dates:
+                data = (await user.get("/attendance/records", params={'from': dates[0], 'to': dates[0]})).json()
+                ranged = [r['date'] for r in data['records']]
+                if ranged != [dates[0]]:
+                    self.log_test("Attendance Records Pagination", False, f"Range {dates[0]}..{dates[0]} returned {ranged}")
+                    return False
+
+            response = await user.get("/attendance/records", params={'from': 'not-a-date'})
+            if response.status_code != 400:
+                self.log_test("Attendance Records Pagination", False, f"Invalid date: expected 400, got {response.status_code}")
+                return False
+
+            self.log_test("Attendance Records Pagination", True, f"{len(paged)} pages match, range filter and validation work")
+            return True
+        except Exception as e:
+            self.log_test("Attendance Records Pagination", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_attendance_summary(self):
+        """Test attendance summary (stats and missed dates) retrieval"""
+        try:
+            user = await self.history_user()
+            response = await user.get("/attendance/summary")
+
+            if response.status_code == 200:
+                data = response.json()
+                required_fields = ['stats', 'missedDates', 'missedRanges', 'missedCount', 'subjects']
+
+                if all(field in data for field in required_fields):
+                    missed_count = data['missedCount']
+                    ranged_count = sum(r['count'] for r in data['missedRanges'])
+                    if missed_count != len(data['missedDates']) or missed_count != ranged_count:
+                        self.log_test("Attendance Summary", False, f"Missed counts disagree: {missed_count}, {len(data['missedDates'])} dates, {ranged_count} in ranges")
+                        return False
+                    self.log_test("Attendance Summary", True, f"Overall {data['stats']['overallPercentage']}%, {missed_count} missed dates")
+                    return True
+                else:
+                    missing = [f for f in required_fields if f not in data]
+                    self.log_test("Attendance Summary", False, f"Missing fields: {missing}")
+                    return False
+            elif response.status_code == 401:
+                self.log_test("Attendance Summary", False, "Authentication required")
+                return False
+            else:
+                self.log_test("Attendance Summary", False, f"Status code: {response.status_code}")
+                return False
+        except Exception as e:
+            self.log_test("Attendance Summary", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_subject_attendance(self):
         """Test subject-specific attendance details"""
         try:
+            user = await self.history_user()
             subject_name = "Mathematics"
-            response = self.session.get(f"{API_BASE}/attendance/subject/{subject_name}")
-            
+            response = await user.get(f"/attendance/subject/{subject_name}")
+
             if response.status_code == 200:
                 data = response.json()
                 required_fields = ['subject', 'records', 'stats']
-                
+
                 if all(field in data for field in required_fields):
                     if data['subject'] == subject_name:
                         records_count = len(data['records'])
@@ -365,12 +598,98 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Subject Attendance", False, f"Exception: {str(e)}")
             return False
-    
-    def test_leaderboard(self):
+
+    async def test_attendance_projection(self):
+        """Test the classes-to-attend / classes-to-skip projection"""
+        try:
+            user = await self.history_user()
+            response = await user.get("/attendance/projection", params={'target': 75})
+
+            if response.status_code != 200:
+                self.log_test("Attendance Projection", False, f"Status code: {response.status_code}")
+                return False
+
+            data = response.json()
+            required_fields = ['target', 'from', 'to', 'overall', 'subjects']
+            missing = [f for f in required_fields if f not in data]
+            if missing:
+                self.log_test("Attendance Projection", False, f"Missing fields: {missing}")
+                return False
+
+            for name, plan in [('overall', data['overall'])] + list(data['subjects'].items()):
+                if plan['mustAttend'] + plan['canSkip'] > plan['remaining']:
+                    self.log_test("Attendance Projection", False, f"{name}: mustAttend + canSkip exceeds remaining")
+                    return False
+
+            # Same state and target: the cached projection answers with the same ETag
+            etag = response.headers.get('ETag')
+            repeat, invalid = await asyncio.gather(
+                user.get("/attendance/projection", params={'target': 75}, headers={'If-None-Match': etag}),
+                user.get("/attendance/projection", params={'target': 150})
+            )
+            if repeat.status_code != 304:
+                self.log_test("Attendance Projection", False, f"Expected 304 on repeat, got {repeat.status_code}")
+                return False
+            if invalid.status_code != 400:
+                self.log_test("Attendance Projection", False, f"Expected 400 for target=150, got {invalid.status_code}")
+                return False
+
+            overall = data['overall']
+            self.log_test("Attendance Projection", True, f"{overall['remaining']} classes left: attend {overall['mustAttend']}, skip {overall['canSkip']}")
+            return True
+        except Exception as e:
+            self.log_test("Attendance Projection", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_attendance_export(self):
+        """Test the streaming CSV and NDJSON exports against the records endpoint"""
+        try:
+            user = await self.history_user()
+            records_response, ndjson_response, csv_response, xml_response = await asyncio.gather(
+                user.get("/attendance/records", params={'limit': 200}),
+                user.get("/attendance/export", params={'format': 'ndjson'}),
+                user.get("/attendance/export", params={'format': 'csv'}),
+                user.get("/attendance/export", params={'format': 'xml'})
+            )
+
+            if records_response.status_code != 200:
+                self.log_test("Attendance Export", False, f"Records status code: {records_response.status_code}")
+                return False
+            records = records_response.json()['records']
+
+            response = ndjson_response
+            if response.status_code != 200 or 'attachment' not in response.headers.get('Content-Disposition', ''):
+                self.log_test("Attendance Export", False, f"NDJSON status {response.status_code}, headers {dict(response.headers)}")
+                return False
+            exported = [json.loads(line) for line in response.text.splitlines() if line]
+            dates = [record['date'] for record in exported]
+            if dates != sorted(dates) or (len(records) < 200 and sorted(dates) != sorted(r['date'] for r in records)):
+                self.log_test("Attendance Export", False, f"NDJSON export has {len(exported)} records, records endpoint {len(records)}")
+                return False
+
+            response = csv_response
+            lines = response.text.splitlines()
+            expected_rows = sum(max(len(r['subjectAttendance']), 1) for r in exported)
+            if response.status_code != 200 or lines[0] != 'date,isHoliday,subject,period,status' or len(lines) - 1 != expected_rows:
+                self.log_test("Attendance Export", False, f"CSV status {response.status_code}, {len(lines) - 1} rows, expected {expected_rows}")
+                return False
+
+            if xml_response.status_code != 400:
+                self.log_test("Attendance Export", False, f"Unknown format: expected 400, got {xml_response.status_code}")
+                return False
+
+            self.log_test("Attendance Export", True, f"Exported {len(exported)} records ({expected_rows} CSV rows)")
+            return True
+        except Exception as e:
+            self.log_test("Attendance Export", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_leaderboard(self):
         """Test leaderboard functionality"""
         try:
-            response = self.session.get(f"{API_BASE}/leaderboard")
-            
+            user = await self.history_user()
+            response = await user.get("/leaderboard")
+
             if response.status_code == 200:
                 data = response.json()
                 if 'leaderboard' in data:
@@ -382,13 +701,15 @@ class AttendanceTrackerAPITest:
                             first_entry = leaderboard[0]
                             if all(field in first_entry for field in required_fields):
                                 # Check if sorted by percentage (descending)
-                                is_sorted = all(leaderboard[i]['percentage'] >= leaderboard[i+1]['percentage'] 
+                                is_sorted = all(leaderboard[i]['percentage'] >= leaderboard[i+1]['percentage']
                                               for i in range(len(leaderboard)-1))
-                                if is_sorted:
-                                    self.log_test("Leaderboard", True, f"Retrieved {len(leaderboard)} users, properly sorted")
-                                else:
+                                if not is_sorted:
                                     self.log_test("Leaderboard", False, "Leaderboard not sorted by percentage")
-                                return is_sorted
+                                    return False
+                                self.log_test("Leaderboard", True, f"Retrieved {len(leaderboard)} users, properly sorted")
+                                return (self.check_leaderboard_snapshot(user, data)
+                                        and await self.check_leaderboard_matches_stats(user, data.get('me'))
+                                        and await self.check_leaderboard_pagination(user, leaderboard, data.get('nextCursor')))
                             else:
                                 missing = [f for f in required_fields if f not in first_entry]
                                 self.log_test("Leaderboard", False, f"Missing fields in entries: {missing}")
@@ -408,17 +729,293 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Leaderboard", False, f"Exception: {str(e)}")
             return False
-    
-    def test_auth_logout(self):
+
+    def check_leaderboard_snapshot(self, user, data):
+        """Check ranks, the caller's own entry and the snapshot age"""
+        try:
+            leaderboard = data['leaderboard']
+            ranks = [entry.get('rank') for entry in leaderboard]
+            # Equal percentages share a rank; the next one skips past them
+            expected = [1 + sum(other['percentage'] > entry['percentage'] for other in leaderboard) for entry in leaderboard]
+            if ranks != expected:
+                self.log_test("Leaderboard Snapshot", False, f"Expected ranks {expected[:10]}, got {ranks[:10]}")
+                return False
+
+            me = data.get('me')
+            if not me or me.get('userId') != user.user_id:
+                self.log_test("Leaderboard Snapshot", False, f"Missing caller entry: {me}")
+                return False
+            listed = next((e for e in leaderboard if e['userId'] == user.user_id), None)
+            if listed and listed != me:
+                self.log_test("Leaderboard Snapshot", False, f"Caller entry {me} differs from listed {listed}")
+                return False
+
+            snapshot = data.get('snapshot') or {}
+            if not isinstance(snapshot.get('ageSeconds'), int) or snapshot['ageSeconds'] < 0:
+                self.log_test("Leaderboard Snapshot", False, f"Invalid snapshot age: {snapshot}")
+                return False
+            # The age counts from the latest change, which is never older than the last full rebuild
+            if not snapshot.get('builtAt') or (snapshot.get('updatedAt') or '') < snapshot['builtAt']:
+                self.log_test("Leaderboard Snapshot", False, f"Snapshot missing its full rebuild time: {snapshot}")
+                return False
+
+            self.log_test("Leaderboard Snapshot", True, f"Caller ranked #{me['rank']}, snapshot {snapshot['ageSeconds']}s old")
+            return True
+        except Exception as e:
+            self.log_test("Leaderboard Snapshot", False, f"Exception: {str(e)}")
+            return False
+
+    async def check_leaderboard_matches_stats(self, user, entry):
+        """Check the caller's leaderboard entry against the per-user stats computation"""
+        try:
+            if entry is None:
+                self.log_test("Leaderboard Matches Stats", False, f"User {user.user_id} missing from leaderboard")
+                return False
+
+            response = await user.get("/attendance/status")
+            if response.status_code != 200:
+                self.log_test("Leaderboard Matches Stats", False, f"Status code: {response.status_code}")
+                return False
+
+            stats = response.json()
+            expected = {
+                'totalClasses': stats['totalClasses'],
+                'attendedClasses': stats['attendedClasses'],
+                'percentage': stats['overallPercentage']
+            }
+            actual = {key: entry[key] for key in expected}
+
+            if actual == expected:
+                self.log_test("Leaderboard Matches Stats", True, f"Leaderboard entry matches per-user stats: {actual}")
+                return True
+            else:
+                self.log_test("Leaderboard Matches Stats", False, f"Expected {expected}, got {actual}")
+                return False
+        except Exception as e:
+            self.log_test("Leaderboard Matches Stats", False, f"Exception: {str(e)}")
+            return False
+
+    async def check_leaderboard_pagination(self, user, leaderboard, next_cursor):
+        """Walk the leaderboard one entry per page and compare with the single-page result"""
+        try:
+            if next_cursor:
+                self.log_test("Leaderboard Pagination", True, "Leaderboard larger than one page, skipping page walk")
+                return True
+
+            paged = []
+            cursor = None
+            for _ in range(len(leaderboard) + 1):
+                params = {'limit': 1}
+                if cursor:
+                    params['cursor'] = cursor
+                response = await user.get("/leaderboard", params=params)
+                if response.status_code != 200:
+                    self.log_test("Leaderboard Pagination", False, f"Status code: {response.status_code}")
+                    return False
+                data = response.json()
+                paged.extend(data['leaderboard'])
+                cursor = data.get('nextCursor')
+                if not cursor:
+                    break
+
+            # Ranks of later pages are counted from their first entry and must agree with the single page
+            if [(e['userId'], e['rank']) for e in paged] == [(e['userId'], e['rank']) for e in leaderboard]:
+                self.log_test("Leaderboard Pagination", True, f"{len(paged)} pages match the full leaderboard")
+                return True
+            else:
+                self.log_test("Leaderboard Pagination", False, "Paged leaderboard differs from the full leaderboard")
+                return False
+        except Exception as e:
+            self.log_test("Leaderboard Pagination", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_conditional_get(self):
+        """Test ETag revalidation on read endpoints and invalidation after a write"""
+        try:
+            user = await self.sign_in('conditional-get', SETUP_DATA)
+            endpoints = ['/attendance/status', '/attendance/records', '/attendance/summary',
+                         '/attendance/subject/Mathematics', '/leaderboard']
+
+            async def check_endpoint(endpoint):
+                response = await user.get(endpoint)
+                etag = response.headers.get('ETag')
+                if response.status_code != 200 or not etag:
+                    return None, f"{endpoint}: status {response.status_code}, ETag {etag}"
+                if 'no-cache' not in response.headers.get('Cache-Control', ''):
+                    return None, f"{endpoint}: Cache-Control {response.headers.get('Cache-Control')}"
+
+                revalidated = await user.get(endpoint, headers={'If-None-Match': etag})
+                if revalidated.status_code != 304 or revalidated.content:
+                    return None, f"{endpoint}: expected empty 304, got {revalidated.status_code}"
+                return etag, None
+
+            checked = await asyncio.gather(*(check_endpoint(endpoint) for endpoint in endpoints))
+            problems = [problem for _, problem in checked if problem]
+            if problems:
+                self.log_test("Conditional GET", False, problems[0], problems[1:] or None)
+                return False
+            etags = {endpoint: etag for endpoint, (etag, _) in zip(endpoints, checked)}
+
+            # A new attendance entry must invalidate the caller's cached status
+            await user.post("/attendance/bulk", json={'entries': [{'date': '2024-02-05', 'isHoliday': False, 'subjectAttendance': [
+                {'subject': 'Mathematics', 'status': 'attended'}
+            ]}]})
+            response = await user.get("/attendance/status", headers={'If-None-Match': etags['/attendance/status']})
+            if response.status_code != 200:
+                self.log_test("Conditional GET", False, f"Status after write: expected 200, got {response.status_code}")
+                return False
+
+            self.log_test("Conditional GET", True, f"{len(endpoints)} endpoints answer 304 and invalidate on write")
+            return True
+        except Exception as e:
+            self.log_test("Conditional GET", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_cache_diagnostics(self):
+        """Test cache hit/miss counters exposed by the diagnostics endpoint"""
+        try:
+            user = await self.history_user()
+            # Back-to-back reads like the homepage should be served from the user cache
+            await user.get("/auth/user")
+            await user.get("/attendance/status")
+
+            response = await user.get("/diagnostics")
+            if response.status_code == 403:
+                self.log_test("Cache Diagnostics", True, "Diagnostics protected by DIAGNOSTICS_TOKEN, skipped")
+                return True
+            if response.status_code != 200:
+                self.log_test("Cache Diagnostics", False, f"Status code: {response.status_code}")
+                return False
+
+            caches = response.json().get('caches', {})
+            required_fields = ['size', 'hits', 'misses', 'hitRate']
+            missing = [f"{name}.{field}" for name in ('tokens', 'users') for field in required_fields
+                       if field not in caches.get(name, {})]
+            if missing:
+                self.log_test("Cache Diagnostics", False, f"Missing fields: {missing}")
+                return False
+
+            users = caches['users']
+            self.log_test("Cache Diagnostics", True, f"User cache: {users['hits']} hits, {users['misses']} misses")
+            return self.check_pool_diagnostics(response.json().get('mongoPool'))
+        except Exception as e:
+            self.log_test("Cache Diagnostics", False, f"Exception: {str(e)}")
+            return False
+
+    def check_pool_diagnostics(self, pool):
+        """Check the MongoDB connection pool metrics reported by the diagnostics endpoint"""
+        required_fields = ['maxPoolSize', 'minPoolSize', 'totalConnections', 'inUse', 'waiting', 'checkOuts', 'checkOutLatencyMs']
+        if not pool:
+            self.log_test("Pool Diagnostics", False, "Missing mongoPool metrics")
+            return False
+        missing = [field for field in required_fields if field not in pool]
+        if missing:
+            self.log_test("Pool Diagnostics", False, f"Missing fields: {missing}")
+            return False
+        if pool['checkOuts'] == 0 or pool['totalConnections'] > pool['maxPoolSize']:
+            self.log_test("Pool Diagnostics", False, f"Implausible pool metrics: {pool}")
+            return False
+
+        self.log_test("Pool Diagnostics", True,
+                      f"{pool['totalConnections']}/{pool['maxPoolSize']} connections, "
+                      f"checkout avg {pool['checkOutLatencyMs']['avg']}ms")
+        return True
+
+    async def test_metrics_endpoint(self):
+        """Test the Prometheus metrics endpoint"""
+        try:
+            response = await self.client().get("/metrics")
+            if response.status_code == 403:
+                self.log_test("Metrics Endpoint", True, "Metrics protected by DIAGNOSTICS_TOKEN, skipped")
+                return True
+            if response.status_code != 200 or not response.headers.get('Content-Type', '').startswith('text/plain'):
+                self.log_test("Metrics Endpoint", False, f"Status {response.status_code}, Content-Type {response.headers.get('Content-Type')}")
+                return False
+
+            expected = [
+                'api_request_duration_seconds_bucket{method="GET",route="/attendance/status",le="+Inf"}',
+                'api_request_phase_seconds_sum{method="GET",route="/attendance/summary",phase="stats"}',
+                'api_requests_total{method="GET",route="/attendance/subject/:subjectName",status="200"}'
+            ]
+            missing = [series for series in expected if series not in response.text]
+            if missing:
+                self.log_test("Metrics Endpoint", False, f"Missing series: {missing}")
+                return False
+
+            self.log_test("Metrics Endpoint", True, f"{len(response.text.splitlines())} lines of Prometheus metrics")
+            return True
+        except Exception as e:
+            self.log_test("Metrics Endpoint", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_latency_budget(self):
+        """Fail when any response's Server-Timing total exceeds its latency budget"""
+        if not self.server_timings:
+            self.log_test("Latency Budget", False, "No Server-Timing headers received")
+            return False
+
+        over_budget = []
+        for endpoint, timings in self.server_timings:
+            budget = LATENCY_BUDGETS_MS.get(endpoint, LATENCY_BUDGET_MS)
+            total = timings.get('total', 0)
+            if total > budget:
+                phases = ', '.join(f"{name}={dur:.1f}" for name, dur in timings.items() if name != 'total')
+                over_budget.append(f"{endpoint}: {total:.1f}ms > {budget:.0f}ms ({phases})")
+
+        if over_budget:
+            self.log_test("Latency Budget", False, f"{len(over_budget)} responses over budget", over_budget)
+            return False
+
+        slowest_endpoint, slowest = max(self.server_timings, key=lambda item: item[1].get('total', 0))
+        self.log_test("Latency Budget", True,
+                      f"{len(self.server_timings)} responses within budget, slowest {slowest_endpoint} at {slowest.get('total', 0):.1f}ms")
+        return True
+
+    async def test_payload_validation(self):
+        """Test request body schemas and size limits"""
+        try:
+            user = await self.sign_in('payload-validation')
+            checks = [
+                ("Impossible date", "/attendance/enter", {'date': '2024-02-30', 'subjectAttendance': []}, 400),
+                ("Unknown status", "/attendance/enter", {'date': '2024-03-01', 'subjectAttendance': [{'subject': 'Mathematics', 'status': 'late'}]}, 400),
+                ("Timetable subject not in subjects", "/user/setup", {
+                    'semester': 'Fall 2024',
+                    'subjects': ['Mathematics'],
+                    'startDate': '2024-08-01',
+                    'endDate': '2024-12-15',
+                    'timetable': {'Monday': ['Mathematics', 'Chemistry']}
+                }, 400),
+                ("Oversized body", "/user/setup", {'semester': 'x' * 100000}, 413),
+            ]
+
+            responses = await asyncio.gather(*(user.post(path, json=payload) for _, path, payload, _ in checks))
+            failures = [
+                f"{name}: expected {expected}, got {response.status_code}"
+                for (name, _, _, expected), response in zip(checks, responses)
+                if response.status_code != expected
+            ]
+
+            if failures:
+                self.log_test("Payload Validation", False, "; ".join(failures))
+                return False
+
+            self.log_test("Payload Validation", True, f"{len(checks)} invalid payloads rejected")
+            return True
+        except Exception as e:
+            self.log_test("Payload Validation", False, f"Exception: {str(e)}")
+            return False
+
+    async def test_auth_logout(self):
         """Test logout functionality"""
         try:
-            response = self.session.post(f"{API_BASE}/auth/logout")
-            
+            user = await self.sign_in('logout')
+            response = await user.post("/auth/logout")
+
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
                     # Test that subsequent authenticated requests fail
-                    auth_test = self.session.get(f"{API_BASE}/auth/user")
+                    auth_test = await user.get("/auth/user")
                     if auth_test.status_code == 401:
                         self.log_test("Auth Logout", True, "Logout successful, session invalidated")
                         return True
@@ -434,81 +1031,95 @@ class AttendanceTrackerAPITest:
         except Exception as e:
             self.log_test("Auth Logout", False, f"Exception: {str(e)}")
             return False
-    
-    def test_error_handling(self):
+
+    async def test_error_handling(self):
         """Test API error handling and validation"""
         try:
+            client = self.client()
+            invalid_route, unauthenticated, unsupported_method, malformed_json = await asyncio.gather(
+                client.get("/invalid/route"),
+                client.get("/attendance/status"),
+                client.delete("/attendance/status"),
+                client.post("/auth/session", content='{"token": ', headers={'Content-Type': 'application/json'})
+            )
+
             # Test invalid route
-            response = self.session.get(f"{API_BASE}/invalid/route")
-            if response.status_code == 404:
+            if invalid_route.status_code == 404:
                 self.log_test("Error Handling - Invalid Route", True, "404 returned for invalid route")
             else:
-                self.log_test("Error Handling - Invalid Route", False, f"Expected 404, got {response.status_code}")
-            
+                self.log_test("Error Handling - Invalid Route", False, f"Expected 404, got {invalid_route.status_code}")
+
             # Test unauthenticated access to protected route
-            new_session = requests.Session()
-            response = new_session.get(f"{API_BASE}/attendance/status")
-            if response.status_code == 401:
+            if unauthenticated.status_code == 401:
                 self.log_test("Error Handling - Unauthenticated Access", True, "401 returned for unauthenticated access")
             else:
-                self.log_test("Error Handling - Unauthenticated Access", False, f"Expected 401, got {response.status_code}")
-            
+                self.log_test("Error Handling - Unauthenticated Access", False, f"Expected 401, got {unauthenticated.status_code}")
+
+            # Test unsupported method on an existing path
+            if unsupported_method.status_code == 404:
+                self.log_test("Error Handling - Unsupported Method", True, "404 returned for DELETE /attendance/status")
+            else:
+                self.log_test("Error Handling - Unsupported Method", False, f"Expected 404, got {unsupported_method.status_code}")
+
+            # Test malformed JSON body
+            if malformed_json.status_code == 400:
+                self.log_test("Error Handling - Malformed JSON", True, "400 returned for malformed JSON body")
+            else:
+                self.log_test("Error Handling - Malformed JSON", False, f"Expected 400, got {malformed_json.status_code}")
+
             return True
         except Exception as e:
             self.log_test("Error Handling", False, f"Exception: {str(e)}")
             return False
-    
+
     def run_all_tests(self):
         """Run all backend API tests"""
-        print("=" * 60)
-        print("ATTENDANCE TRACKER BACKEND API TESTS")
-        print("=" * 60)
-        print()
-        
-        # Test sequence
-        tests = [
-            self.test_root_endpoint,
-            self.test_auth_session_creation,
-            self.test_auth_user_retrieval,
-            self.test_user_setup,
-            self.test_attendance_status,
-            self.test_today_schedule,
-            self.test_attendance_entry,
-            self.test_holiday_entry,
-            self.test_attendance_records,
-            self.test_subject_attendance,
-            self.test_leaderboard,
-            self.test_auth_logout,
-            self.test_error_handling
+        # Each test signs in its own user or shares the read-only history user, so a
+        # phase runs concurrently. Later phases need a quiet server: ETags and the
+        # leaderboard change with every write, metrics and latency need the earlier requests.
+        phases = [
+            [
+                self.test_root_endpoint,
+                self.test_auth_session_creation,
+                self.test_auth_user_retrieval,
+                self.test_user_setup,
+                self.test_attendance_status,
+                self.test_today_schedule,
+                self.test_attendance_entry,
+                self.test_frontend_payloads,
+                self.test_holiday_entry,
+                self.test_bulk_attendance,
+                self.test_dashboard,
+                self.test_attendance_records,
+                self.test_attendance_summary,
+                self.test_subject_attendance,
+                self.test_attendance_projection,
+                self.test_attendance_export,
+                self.test_cache_diagnostics,
+                self.test_payload_validation,
+                self.test_auth_logout,
+                self.test_error_handling
+            ],
+            [self.test_conditional_get, self.test_metrics_endpoint],
+            [self.test_leaderboard],
+            [self.test_latency_budget]
         ]
-        
-        passed = 0
-        total = len(tests)
-        
-        for test in tests:
-            try:
-                if test():
-                    passed += 1
-            except Exception as e:
-                print(f"❌ FAIL: {test.__name__} - Unexpected error: {str(e)}")
-        
-        print("=" * 60)
-        print(f"TEST SUMMARY: {passed}/{total} tests passed")
-        print("=" * 60)
-        
+
+        passed, total, results = self.run("ATTENDANCE TRACKER BACKEND API TESTS", "TEST SUMMARY", phases)
+
         # Print detailed results
         print("\nDETAILED RESULTS:")
-        for result in self.test_results:
+        for result in results:
             status = "✅ PASS" if result['success'] else "❌ FAIL"
             print(f"{status}: {result['test']}")
             if result['message']:
                 print(f"   {result['message']}")
-        
-        return passed, total, self.test_results
+
+        return passed, total, results
 
 if __name__ == "__main__":
     tester = AttendanceTrackerAPITest()
     passed, total, results = tester.run_all_tests()
-    
+
     # Exit with appropriate code
-    sys.exit(0 if passed == total else 1)
\ No newline at end of file
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Throughput check for calculateAttendanceStats and getMissedDates.
+
+Runs scripts/bench-hot-paths.js and compares each case's ops/sec with the
+baseline committed in scripts/bench-hot-paths.baseline.json. A case fails
+when it is slower than the baseline by more than the tolerance, on the first
+run and again when it is re-measured. Baselines depend on the machine:
+record them with --update-baseline on the machine that runs the check.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+# Configuration
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BENCH_SCRIPT = os.path.join(ROOT, 'scripts', 'bench-hot-paths.js')
+BASELINE_PATH = os.path.join(ROOT, 'scripts', 'bench-hot-paths.baseline.json')
+DEFAULT_TOLERANCE = float(os.environ.get('BENCH_TOLERANCE', '0.3'))
+
+def run_benchmarks(filter_text='', samples=None, sample_ms=None):
+    """Run the node benchmarks; returns the parsed JSON report"""
+    command = ['node', BENCH_SCRIPT, '--json', f'--filter={filter_text}']
+    if samples:
+        command.append(f'--samples={samples}')
+    if sample_ms:
+        command.append(f'--sample-ms={sample_ms}')
+    # stderr is left alone: node's module-type warning and any crash show up as-is
+    result = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(result.stdout)
+
+def load_baseline():
+    """Baseline report, or None when none has been recorded"""
+    if not os.path.exists(BASELINE_PATH):
+        return None
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+def save_baseline(report):
+    """Write report as the new baseline"""
+    baseline = {
+        'node': report['node'],
+        'platform': report['platform'],
+        'recordedAt': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'opsPerSec': {result['name']: result['opsPerSec'] for result in report['results']}
+    }
+    with open(BASELINE_PATH, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+def is_regression(ops, baseline_ops, tolerance):
+    return ops < baseline_ops * (1 - tolerance)
+
+def remeasure(names, args):
+    """Run the given cases again; returns {name: ops}"""
+    ops = {}
+    for name in names:
+        report = run_benchmarks(name, args.samples, args.sample_ms)
+        ops[name] = next(r['opsPerSec'] for r in report['results'] if r['name'] == name)
+    return ops
+
+def compare(report, baseline, args):
+    """Print current vs baseline throughput; returns the number of confirmed regressions"""
+    baseline_ops = baseline['opsPerSec']
+    current = {result['name']: result['opsPerSec'] for result in report['results']}
+
+    # Noise on a busy machine can fake a slowdown, so suspects are measured twice
+    suspects = [name for name, ops in current.items()
+                if name in baseline_ops and is_regression(ops, baseline_ops[name], args.tolerance)]
+    current.update(remeasure(suspects, args))
+    regressions = [name for name in suspects if is_regression(current[name], baseline_ops[name], args.tolerance)]
+
+    print(f"{'Case':<70} {'Baseline':>10} {'Current':>10} {'Change':>8}")
+    for name, ops in current.items():
+        if name not in baseline_ops:
+            print(f"{name:<70} {'-':>10} {ops:>10,} {'new':>8}")
+            continue
+        change = (ops - baseline_ops[name]) / baseline_ops[name] * 100
+        marker = '  ❌' if name in regressions else ''
+        print(f"{name:<70} {baseline_ops[name]:>10,} {ops:>10,} {change:>+7.1f}%{marker}")
+
+    if baseline['node'] != report['node'] or baseline['platform'] != report['platform']:
+        print(f"\n⚠️  Baseline was recorded on node {baseline['node']} ({baseline['platform']}), "
+              f"this run is node {report['node']} ({report['platform']})")
+    return len(regressions)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the attendance stats and calendar hot paths against the committed baseline")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this text")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown as a fraction of baseline ops/sec (default %(default)s)")
+    parser.add_argument('--samples', type=int, help="timed samples per case (node script default: 5)")
+    parser.add_argument('--sample-ms', type=int, help="duration of each sample in ms (node script default: 100)")
+    parser.add_argument('--update-baseline', action='store_true', help="record this run as the new baseline")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("=" * 60)
+    print("HOT PATH MICRO-BENCHMARKS")
+    print("=" * 60)
+    print()
+
+    try:
+        report = run_benchmarks(args.filter, args.samples, args.sample_ms)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(f"❌ FAIL: benchmark run failed: {e}")
+        sys.exit(1)
+
+    if args.update_baseline:
+        if args.filter:
+            print("❌ FAIL: --update-baseline records every case; run it without --filter")
+            sys.exit(1)
+        save_baseline(report)
+        print(f"Baseline of {len(report['results'])} cases written to {os.path.relpath(BASELINE_PATH, ROOT)}")
+        sys.exit(0)
+
+    baseline = load_baseline()
+    if baseline is None:
+        print("❌ FAIL: no baseline recorded; run with --update-baseline first")
+        sys.exit(1)
+
+    regressions = compare(report, baseline, args)
+    total = len(report['results'])
+
+    print()
+    print("=" * 60)
+    print(f"BENCHMARK SUMMARY: {total - regressions}/{total} cases within {args.tolerance:.0%} of baseline")
+    print("=" * 60)
+
+    sys.exit(1 if regressions else 0)
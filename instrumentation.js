@@ -0,0 +1,15 @@
+// Runs once when the Next.js server starts (experimental.instrumentationHook).
+// Opening the MongoDB pool here keeps the connect and index bootstrap off the
+// first API request.
+export async function register() {
+  if (process.env.NEXT_RUNTIME !== 'nodejs') return
+
+  const { warmUpMongo } = await import('./lib/mongo.js')
+  try {
+    const elapsedMs = await warmUpMongo()
+    console.log(`MongoDB pool ready in ${elapsedMs}ms`)
+  } catch (error) {
+    // Requests retry the connection; don't keep the server from starting
+    console.error('MongoDB warm-up failed:', error)
+  }
+}
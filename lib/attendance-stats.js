@@ -0,0 +1,128 @@
+// Attendance statistics shared by the API routes and maintenance scripts.
+//
+// Per-subject counters are stored in a map keyed by subjectKey(subject) with
+// values of the form { subject, total, attended }. The original subject name
+// is kept in the value because the key is escaped for use in update paths.
+
+// Helper function to turn a subject name into a safe MongoDB field name
+export function subjectKey(subject) {
+  return String(subject)
+    .replace(/%/g, '%25')
+    .replace(/\./g, '%2E')
+    .replace(/\$/g, '%24')
+}
+
+function percentage(attended, total) {
+  return total > 0 ? Math.round((attended / total) * 100) : 0
+}
+
+// Running per-subject totals for a fixed subject list.
+//
+// Subjects map to integer indexes once; records are then tallied into typed
+// arrays in a single pass without allocating. Subjects not in the list are
+// ignored, as statsFromCounters does. A tally built from stored counters can
+// take newly entered records with add() instead of being recomputed.
+export class AttendanceTally {
+  constructor(subjects) {
+    this.subjects = []
+    this.indexes = new Map()
+    for (const subject of subjects) {
+      if (this.indexes.has(subject)) continue
+      this.indexes.set(subject, this.subjects.length)
+      this.subjects.push(subject)
+    }
+    this.totals = new Uint32Array(this.subjects.length)
+    this.attended = new Uint32Array(this.subjects.length)
+  }
+
+  // Tally built from user_stats counters ({ [subjectKey]: { subject, total, attended } })
+  static fromCounters(counts, subjects) {
+    const tally = new AttendanceTally(subjects)
+    tally.subjects.forEach((subject, i) => {
+      const counter = counts?.[subjectKey(subject)]
+      tally.totals[i] = counter?.total || 0
+      tally.attended[i] = counter?.attended || 0
+    })
+    return tally
+  }
+
+  // Merge one attendance record into the totals
+  add(record) {
+    if (record.isHoliday) return this
+    const entries = record.subjectAttendance || []
+    for (let i = 0; i < entries.length; i++) {
+      const index = this.indexes.get(entries[i].subject)
+      if (index === undefined) continue
+      this.totals[index] += 1
+      if (entries[i].status === 'attended') this.attended[index] += 1
+    }
+    return this
+  }
+
+  addAll(records) {
+    for (let i = 0; i < records.length; i++) this.add(records[i])
+    return this
+  }
+
+  // Statistics for one subject; zeros for a subject outside the list
+  subject(subject) {
+    const index = this.indexes.get(subject)
+    if (index === undefined) return { total: 0, attended: 0, percentage: 0 }
+    const total = this.totals[index]
+    const attended = this.attended[index]
+    return { total, attended, percentage: percentage(attended, total) }
+  }
+
+  // Statistics for every subject plus the overall totals
+  stats() {
+    let totalClasses = 0
+    let attendedClasses = 0
+    const subjectStats = {}
+
+    for (let i = 0; i < this.subjects.length; i++) {
+      const total = this.totals[i]
+      const attended = this.attended[i]
+      subjectStats[this.subjects[i]] = { total, attended, percentage: percentage(attended, total) }
+      totalClasses += total
+      attendedClasses += attended
+    }
+
+    return {
+      totalClasses,
+      attendedClasses,
+      overallPercentage: percentage(attendedClasses, totalClasses),
+      subjectStats
+    }
+  }
+}
+
+// Helper function to build statistics for the user's subjects from counters
+export function statsFromCounters(counts, subjects) {
+  return AttendanceTally.fromCounters(counts, subjects).stats()
+}
+
+// Helper function to calculate attendance statistics from raw records
+export function calculateAttendanceStats(attendanceRecords, subjects) {
+  return new AttendanceTally(subjects).addAll(attendanceRecords).stats()
+}
+
+// Helper function to plan the rest of the term for one subject (or overall).
+// mustAttend is the fewest of the remaining classes that keep the final
+// percentage at or above target; canSkip is what is left over. When even
+// attending everything falls short, reachable is false and canSkip is 0.
+export function projectAttendance({ attended, total }, remaining, target) {
+  const finalTotal = total + remaining
+  // Integer form of ceil(target% * finalTotal - attended)
+  const needed = Math.max(0, Math.ceil((target * finalTotal - 100 * attended) / 100))
+  const reachable = needed <= remaining
+
+  return {
+    attended,
+    total,
+    remaining,
+    mustAttend: Math.min(needed, remaining),
+    canSkip: reachable ? remaining - needed : 0,
+    reachable,
+    maxPercentage: finalTotal > 0 ? Math.round(((attended + remaining) / finalTotal) * 100) : 0
+  }
+}
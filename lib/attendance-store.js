@@ -0,0 +1,413 @@
+// Attendance record storage.
+//
+// By default every record is its own `attendance` document:
+//   { attendanceId, userId, date, isHoliday, subjectAttendance: [{ subject, status }], createdAt }
+// With ATTENDANCE_STORAGE=compact, new records go to one document per user per month:
+//   { userId, month: 'YYYY-MM', subjects: [name, ...], days: { DD: { h, c: [code, ...] } }, updatedAt }
+// subjects is the month's append-only subject table. c holds one code per class,
+// in the order entered, packing the subject's table index, the period (0 when
+// none) and whether it was attended (see classCode). h marks a holiday, and
+// unset fields are left out. In compact mode reads merge both collections, so
+// records not yet moved by scripts/compact-attendance.js keep showing up.
+// Either way records are returned as { date, isHoliday, subjectAttendance }.
+
+export const ATTENDANCE_COLLECTION = 'attendance'
+export const ATTENDANCE_MONTHS_COLLECTION = 'attendance_months'
+
+// Periods a class code can hold: 1-15, and 0 for a class without one
+const PERIOD_SLOTS = 16
+
+const RECORD_FIELDS = { _id: 0, date: 1, isHoliday: 1, subjectAttendance: 1 }
+const MONTH_FIELDS = { _id: 0, month: 1, subjects: 1, days: 1 }
+// Documents fetched per cursor round trip when no limit is given
+const CURSOR_BATCH_SIZE = 500
+// Unique { userId, date } index of the attendance collection (see lib/indexes.js)
+const DATE_INDEX_NAME = 'userId_date_unique'
+// How long a missing date index is assumed to stay missing before looking again
+const INDEX_RECHECK_MS = 60000
+
+// Helper function to read where new records go; compact mode also reads the month documents
+export function isCompactStorage(env = process.env) {
+  return env.ATTENDANCE_STORAGE === 'compact'
+}
+
+const COMPACT = isCompactStorage()
+
+// Helper function to pack one class; null when it can't be stored
+function classCode(subjectIndex, { period = 0, status }) {
+  if (!Number.isInteger(period) || period < 0 || period >= PERIOD_SLOTS) return null
+  if (status !== 'attended' && status !== 'missed') return null
+  return (subjectIndex * PERIOD_SLOTS + period) * 2 + (status === 'attended' ? 1 : 0)
+}
+
+// Helper function to unpack a class code into { index, period, attended }
+function readClassCode(code) {
+  const slot = Math.floor(code / 2)
+  return { index: Math.floor(slot / PERIOD_SLOTS), period: slot % PERIOD_SLOTS, attended: code % 2 === 1 }
+}
+
+// Helper function to encode one record as a day of its month; null when a
+// subject is missing from the month's table or a class has an unknown status
+// or a period past PERIOD_SLOTS. A subject may appear in several periods.
+export function encodeDay(record, subjectIndexes) {
+  const day = {}
+  const classes = []
+  for (const sa of record.subjectAttendance || []) {
+    const index = subjectIndexes.get(sa.subject)
+    const code = index === undefined ? null : classCode(index, sa)
+    if (code === null) return null
+    classes.push(code)
+  }
+  if (record.isHoliday) day.h = true
+  if (classes.length > 0) day.c = classes
+  return day
+}
+
+// Helper function to decode one stored day
+function decodeDay(date, day, subjects) {
+  const subjectAttendance = (day.c || []).map(code => {
+    const { index, period, attended } = readClassCode(code)
+    const status = attended ? 'attended' : 'missed'
+    return period ? { subject: subjects[index], period, status } : { subject: subjects[index], status }
+  })
+  return { date, isHoliday: !!day.h, subjectAttendance }
+}
+
+// Helper function to expand a month document into its records, in date order
+export function decodeMonth(doc, { descending = false } = {}) {
+  const days = Object.keys(doc.days || {}).sort()
+  if (descending) days.reverse()
+  return days.map(day => decodeDay(`${doc.month}-${day}`, doc.days[day], doc.subjects || []))
+}
+
+// Helper function to merge two sorted async streams; equal items are combined into one
+export async function* mergeSorted(first, second, compare, combine) {
+  const a = first[Symbol.asyncIterator]()
+  const b = second[Symbol.asyncIterator]()
+  try {
+    let x = await a.next()
+    let y = await b.next()
+    while (!x.done || !y.done) {
+      const order = x.done ? 1 : y.done ? -1 : compare(x.value, y.value)
+      if (order < 0) {
+        yield x.value
+        x = await a.next()
+      } else if (order > 0) {
+        yield y.value
+        y = await b.next()
+      } else {
+        yield combine(x.value, y.value)
+        ;[x, y] = await Promise.all([a.next(), b.next()])
+      }
+    }
+  } finally {
+    await Promise.all([a.return?.(), b.return?.()])
+  }
+}
+
+function compareDates(descending) {
+  return (x, y) => (x.date === y.date ? 0 : (x.date < y.date) !== descending ? -1 : 1)
+}
+
+// Helper function to build a date condition: from and to are inclusive, before is exclusive
+function dateCondition({ from, to, before } = {}) {
+  const condition = {}
+  if (from) condition.$gte = from
+  if (to) condition.$lte = to
+  if (before) condition.$lt = before
+  return Object.keys(condition).length > 0 ? condition : null
+}
+
+// Helper function to widen a date condition to the months that can hold those dates
+function monthCondition({ from, to, before } = {}) {
+  const condition = {}
+  if (from) condition.$gte = from.slice(0, 7)
+  if (to) condition.$lte = to.slice(0, 7)
+  if (before && (!condition.$lte || before.slice(0, 7) < condition.$lte)) condition.$lte = before.slice(0, 7)
+  return Object.keys(condition).length > 0 ? condition : null
+}
+
+function inRange(date, { from, to, before } = {}) {
+  return (!from || date >= from) && (!to || date <= to) && (!before || date < before)
+}
+
+// Helper function to stream records from the one-document-per-day collection
+function documentRecords(db, userId, range, descending, limit) {
+  const query = { userId }
+  const dates = dateCondition(range)
+  if (dates) query.date = dates
+  const cursor = db.collection(ATTENDANCE_COLLECTION)
+    .find(query, { projection: RECORD_FIELDS, batchSize: limit || CURSOR_BATCH_SIZE })
+    .sort({ date: descending ? -1 : 1 })
+  return limit ? cursor.limit(limit) : cursor
+}
+
+// Helper function to stream records from the month documents
+async function* monthRecords(db, userId, range, descending, limit, extra = {}) {
+  // A month whose only write failed can be left with no days
+  const query = { userId, days: { $ne: {} }, ...extra }
+  const months = monthCondition(range)
+  if (months) query.month = months
+  let cursor = db.collection(ATTENDANCE_MONTHS_COLLECTION)
+    .find(query, { projection: MONTH_FIELDS })
+    .sort({ month: descending ? -1 : 1 })
+  // Every month holds a record; only the first can have all its days outside the range
+  if (limit) cursor = cursor.limit(limit + 1)
+
+  for await (const doc of cursor) {
+    for (const record of decodeMonth(doc, { descending })) {
+      if (inRange(record.date, range)) yield record
+    }
+  }
+}
+
+// Helper function to stream a user's records in date order, optionally within a range.
+// In compact mode a date found in both layouts (mid-migration) is returned once.
+export function findAttendanceRecords(db, userId, { from, to, before, descending = false, limit } = {}) {
+  const range = { from, to, before }
+  const documents = documentRecords(db, userId, range, descending, limit)
+  if (!COMPACT) return documents
+  return mergeSorted(
+    documents,
+    monthRecords(db, userId, range, descending, limit),
+    compareDates(descending),
+    (document, compact) => compact
+  )
+}
+
+// Helper function to read up to limit records into an array
+export async function listAttendanceRecords(db, userId, options) {
+  const records = []
+  for await (const record of findAttendanceRecords(db, userId, options)) {
+    records.push(record)
+    if (records.length === options.limit) break
+  }
+  return records
+}
+
+// Helper function to list every date the user has a record for, oldest first
+export async function findRecordedDates(db, userId) {
+  const documents = db.collection(ATTENDANCE_COLLECTION)
+    .find({ userId }, { projection: { _id: 0, date: 1 } })
+    .sort({ date: 1 })
+    .toArray()
+  if (!COMPACT) return (await documents).map(record => record.date)
+
+  const [rows, months] = await Promise.all([
+    documents,
+    db.collection(ATTENDANCE_MONTHS_COLLECTION).find({ userId }, { projection: { _id: 0, month: 1, days: 1 } }).toArray()
+  ])
+  const dates = new Set(rows.map(record => record.date))
+  months.forEach(doc => Object.keys(doc.days || {}).forEach(day => dates.add(`${doc.month}-${day}`)))
+  return [...dates].sort()
+}
+
+// Helper function to check whether the user has a record for date
+export async function hasAttendanceOn(db, userId, date) {
+  const document = db.collection(ATTENDANCE_COLLECTION).findOne({ userId, date }, { projection: { _id: 1 } })
+  if (!COMPACT) return !!(await document)
+
+  const [found, month] = await Promise.all([
+    document,
+    db.collection(ATTENDANCE_MONTHS_COLLECTION).findOne(
+      { userId, month: date.slice(0, 7), [`days.${date.slice(8, 10)}`]: { $exists: true } },
+      { projection: { _id: 1 } }
+    )
+  ])
+  return !!(found || month)
+}
+
+// Helper function to list one subject's non-holiday records, newest first,
+// as { date, attendance: { subject, status } }
+export async function findSubjectRecords(db, userId, subject) {
+  const documents = await db.collection(ATTENDANCE_COLLECTION).aggregate([
+    {
+      $match: {
+        userId,
+        subjectAttendance: { $elemMatch: { subject } },
+        isHoliday: { $ne: true }
+      }
+    },
+    { $sort: { date: -1 } },
+    {
+      $project: {
+        _id: 0,
+        date: 1,
+        attendance: {
+          $arrayElemAt: [
+            { $filter: { input: '$subjectAttendance', cond: { $eq: ['$$this.subject', { $literal: subject }] } } },
+            0
+          ]
+        }
+      }
+    }
+  ]).toArray()
+  if (!COMPACT) return documents
+
+  const compact = []
+  for await (const record of monthRecords(db, userId, {}, true, null, { subjects: subject })) {
+    const attendance = record.isHoliday ? null : record.subjectAttendance.find(sa => sa.subject === subject)
+    if (attendance) compact.push({ date: record.date, attendance })
+  }
+  const compactDates = new Set(compact.map(record => record.date))
+  return [...documents.filter(record => !compactDates.has(record.date)), ...compact]
+    .sort(compareDates(true))
+}
+
+const dateIndexChecks = new WeakMap()
+
+// Helper function to tell whether the unique date index exists. Older duplicate
+// records block it (scripts/dedupe-attendance.js removes them); until it
+// exists, inserts look for taken dates themselves.
+async function hasDateIndex(db) {
+  const check = dateIndexChecks.get(db)
+  if (check && (check.exists || Date.now() - check.checkedAt < INDEX_RECHECK_MS)) return check.exists
+
+  const exists = await db.collection(ATTENDANCE_COLLECTION).indexExists(DATE_INDEX_NAME)
+  if (!exists) console.warn(`Index ${DATE_INDEX_NAME} is missing; checking for duplicate dates before each insert`)
+  dateIndexChecks.set(db, { exists, checkedAt: Date.now() })
+  return exists
+}
+
+// Helper function to mark records whose date already has an attendance
+// document, or repeats an earlier record of the batch, as 'duplicate'
+async function markTakenDates(db, userId, records, statuses) {
+  const taken = await db.collection(ATTENDANCE_COLLECTION)
+    .find({ userId, date: { $in: records.map(record => record.date) } }, { projection: { _id: 0, date: 1 } })
+    .toArray()
+  const takenDates = new Set(taken.map(record => record.date))
+  records.forEach((record, i) => {
+    if (takenDates.has(record.date)) statuses[i] = 'duplicate'
+    takenDates.add(record.date)
+  })
+}
+
+// Helper function to save new records; returns a status per record:
+// 'created', 'duplicate' (the date already has a record) or 'error'
+export async function insertAttendanceRecords(db, userId, records) {
+  if (COMPACT) return writeCompactRecords(db, userId, records)
+
+  const statuses = records.map(() => 'created')
+  // Racy, like any read-then-write check, but only needed until the index exists
+  if (!(await hasDateIndex(db))) await markTakenDates(db, userId, records, statuses)
+  const pending = records.flatMap((record, i) => statuses[i] === 'created' ? [i] : [])
+  if (pending.length === 0) return statuses
+
+  // Unordered so one existing date doesn't stop the rest; the unique index reports conflicts
+  try {
+    await db.collection(ATTENDANCE_COLLECTION).bulkWrite(
+      pending.map(i => ({ insertOne: { document: records[i] } })),
+      { ordered: false }
+    )
+  } catch (error) {
+    if (!error.writeErrors) throw error
+    const writeErrors = Array.isArray(error.writeErrors) ? error.writeErrors : [error.writeErrors]
+    writeErrors.forEach(writeError => {
+      // 11000: duplicate key on the unique { userId, date } index
+      statuses[pending[writeError.index]] = writeError.code === 11000 ? 'duplicate' : 'error'
+    })
+  }
+  return statuses
+}
+
+// Helper function to write records into the user's month documents; returns
+// statuses like insertAttendanceRecords. Dates still in the attendance
+// collection count as taken unless skipDocuments is set (the migration, which
+// is moving exactly those records).
+export async function writeCompactRecords(db, userId, records, { skipDocuments = false } = {}) {
+  const statuses = records.map(() => 'created')
+
+  if (!skipDocuments) await markTakenDates(db, userId, records, statuses)
+
+  const months = new Map()
+  records.forEach((record, i) => {
+    if (statuses[i] !== 'created') return
+    const month = record.date.slice(0, 7)
+    if (!months.has(month)) months.set(month, [])
+    months.get(month).push(i)
+  })
+
+  await Promise.all([...months].map(([month, indexes]) => writeMonth(db, userId, month, records, indexes, statuses)))
+  return statuses
+}
+
+// Helper function to write the given records of one month, updating their statuses
+async function writeMonth(db, userId, month, records, indexes, statuses) {
+  const collection = db.collection(ATTENDANCE_MONTHS_COLLECTION)
+  const names = [...new Set(indexes.flatMap(i => (records[i].subjectAttendance || []).map(sa => sa.subject)))]
+
+  // $addToSet appends, so indexes already in use never move. Two first writes
+  // racing on the upsert are retried by the server on the unique index.
+  const doc = await collection.findOneAndUpdate(
+    { userId, month },
+    { $addToSet: { subjects: { $each: names } }, $setOnInsert: { days: {} } },
+    { upsert: true, returnDocument: 'after', projection: { _id: 0, subjects: 1, days: 1 } }
+  )
+  const subjectIndexes = new Map((doc.subjects || []).map((subject, index) => [subject, index]))
+
+  const days = {}
+  const written = []
+  for (const i of indexes) {
+    const day = records[i].date.slice(8, 10)
+    if (doc.days?.[day] || days[day]) {
+      statuses[i] = 'duplicate'
+      continue
+    }
+    const encoded = encodeDay(records[i], subjectIndexes)
+    if (!encoded) {
+      statuses[i] = 'error'
+      continue
+    }
+    days[day] = encoded
+    written.push(i)
+  }
+  if (written.length === 0) return
+
+  // One update for the whole month, valid only while none of its days exist yet
+  const filter = { userId, month }
+  const update = { updatedAt: new Date() }
+  for (const [day, encoded] of Object.entries(days)) {
+    filter[`days.${day}`] = { $exists: false }
+    update[`days.${day}`] = encoded
+  }
+  const result = await collection.updateOne(filter, { $set: update })
+  if (result.matchedCount === 1) return
+
+  // A concurrent request wrote one of these days; settle them one by one
+  await Promise.all(written.map(async i => {
+    const day = records[i].date.slice(8, 10)
+    const single = await collection.updateOne(
+      { userId, month, [`days.${day}`]: { $exists: false } },
+      { $set: { [`days.${day}`]: days[day], updatedAt: new Date() } }
+    )
+    if (single.matchedCount === 0) statuses[i] = 'duplicate'
+  }))
+}
+
+// Helper function to stream the month documents' records of the matched
+// users, sorted by userId then date, as { userId, date, isHoliday, subjectAttendance }
+async function* userMonthRecords(db, match) {
+  const cursor = db.collection(ATTENDANCE_MONTHS_COLLECTION)
+    .find(match, { projection: { ...MONTH_FIELDS, userId: 1 }, batchSize: CURSOR_BATCH_SIZE })
+    .sort({ userId: 1, month: 1 })
+
+  for await (const doc of cursor) {
+    for (const record of decodeMonth(doc)) yield { userId: doc.userId, ...record }
+  }
+}
+
+function compareUserDates(x, y) {
+  if (x.userId !== y.userId) return x.userId < y.userId ? -1 : 1
+  return x.date === y.date ? 0 : x.date < y.date ? -1 : 1
+}
+
+// Helper function to stream the records of every matched user, sorted by userId
+// then date, with their userId. Like findAttendanceRecords, a date found in both
+// layouts (mid-migration) is returned once, from the month document.
+export function findUserRecords(db, match = {}) {
+  const documents = db.collection(ATTENDANCE_COLLECTION)
+    .find(match, { projection: { ...RECORD_FIELDS, userId: 1 }, batchSize: CURSOR_BATCH_SIZE })
+    .sort({ userId: 1, date: 1 })
+  if (!COMPACT) return documents
+  return mergeSorted(documents, userMonthRecords(db, match), compareUserDates, (document, compact) => compact)
+}
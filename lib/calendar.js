@@ -0,0 +1,222 @@
+// Calendar engine for class days and missed attendance dates.
+//
+// Dates are handled as UTC day numbers (days since 1970-01-01) so ranges can
+// be compared and counted with integer arithmetic; strings are only built for
+// the dates that are returned.
+
+const DAY_MS = 24 * 60 * 60 * 1000
+
+// Index order of Date.getUTCDay()
+export const WEEKDAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+const DEFAULT_WEEKLY_OFF = ['Sunday']
+
+// Helper function to convert YYYY-MM-DD into a day number (null when invalid)
+export function toDayNumber(dateStr) {
+  if (typeof dateStr !== 'string') return null
+  const [year, month, day] = dateStr.split('-').map(Number)
+  const time = Date.UTC(year, month - 1, day)
+  return Number.isFinite(time) ? time / DAY_MS : null
+}
+
+// Helper function to convert a day number back into YYYY-MM-DD
+export function fromDayNumber(dayNumber) {
+  return new Date(dayNumber * DAY_MS).toISOString().slice(0, 10)
+}
+
+// Helper function to check for a real YYYY-MM-DD calendar date (rejects 2024-02-31)
+export function isCalendarDate(dateStr) {
+  if (typeof dateStr !== 'string' || !/^\d{4}-\d{2}-\d{2}$/.test(dateStr)) return false
+  const dayNumber = toDayNumber(dateStr)
+  return dayNumber !== null && fromDayNumber(dayNumber) === dateStr
+}
+
+// Helper function to normalize a client date to YYYY-MM-DD (null when invalid).
+// Accepts unpadded parts, "/" separators and a trailing time ("2024-3-5",
+// "2024/03/05", "2024-03-05T10:00:00Z"); the time is dropped, not converted.
+export function normalizeDate(value) {
+  if (typeof value !== 'string') return null
+  const match = /^(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[T ].*)?$/.exec(value.trim())
+  if (!match) return null
+  const dateStr = `${match[1]}-${match[2].padStart(2, '0')}-${match[3].padStart(2, '0')}`
+  return isCalendarDate(dateStr) ? dateStr : null
+}
+
+// Helper function to get today's day number (UTC, like the stored dates)
+export function todayDayNumber(now = Date.now()) {
+  return Math.floor(now / DAY_MS)
+}
+
+// Helper function to get the weekday of a day number (0 = Sunday)
+export function weekdayOf(dayNumber) {
+  // 1970-01-01 was a Thursday
+  return (((dayNumber + 4) % 7) + 7) % 7
+}
+
+// Helper function to build a 7-bit mask of weekdays that have classes.
+// A weekday has classes when the timetable lists at least one subject for it
+// and it is not a weekly-off day; without a timetable every non-off day counts.
+export function classWeekdayMask(timetable, weeklyOff = DEFAULT_WEEKLY_OFF) {
+  const hasTimetable = timetable && Object.keys(timetable).length > 0
+  let mask = 0
+  WEEKDAY_NAMES.forEach((name, weekday) => {
+    if (weeklyOff.includes(name)) return
+    if (hasTimetable && !(timetable[name] || []).some(subject => subject && String(subject).trim() !== '')) return
+    mask |= 1 << weekday
+  })
+  return mask
+}
+
+// Helper function to count the weekdays of a mask in [from, to] without walking every day
+export function countClassDays(from, to, mask) {
+  if (to < from || mask === 0) return 0
+  const length = to - from + 1
+  const fullWeeks = Math.floor(length / 7)
+  let perWeek = 0
+  for (let weekday = 0; weekday < 7; weekday++) {
+    if (mask & (1 << weekday)) perWeek += 1
+  }
+  let count = fullWeeks * perWeek
+  const startWeekday = weekdayOf(from + fullWeeks * 7)
+  for (let i = 0; i < length % 7; i++) {
+    if (mask & (1 << ((startWeekday + i) % 7))) count += 1
+  }
+  return count
+}
+
+// Helper function to count each weekday in [from, to], skipping holidays.
+// Returns seven counts indexed like WEEKDAY_NAMES.
+export function countWeekdays(from, to, holidays = []) {
+  const counts = WEEKDAY_NAMES.map((name, weekday) => countClassDays(from, to, 1 << weekday))
+  for (const day of holidays) {
+    if (day >= from && day <= to) counts[weekdayOf(day)] -= 1
+  }
+  return counts
+}
+
+// Helper function to count the sessions per subject left in [fromDate, endDate].
+// A subject listed twice on a weekday has two sessions that day; weekly-off
+// days and holidays have none.
+export function countRemainingSessions({
+  timetable,
+  subjects,
+  fromDate,
+  endDate,
+  holidays = [],
+  weeklyOff = DEFAULT_WEEKLY_OFF
+}) {
+  const remaining = Object.fromEntries(subjects.map(subject => [subject, 0]))
+  const from = toDayNumber(fromDate)
+  const to = toDayNumber(endDate)
+  if (from === null || to === null || to < from) return remaining
+
+  const days = countWeekdays(from, to, holidays)
+  WEEKDAY_NAMES.forEach((name, weekday) => {
+    if (weeklyOff.includes(name) || days[weekday] === 0) return
+    for (const subject of timetable?.[name] || []) {
+      if (subject in remaining) remaining[subject] += days[weekday]
+    }
+  })
+  return remaining
+}
+
+// Helper function to parse holiday lists like "2024-01-26,2024-03-25..2024-03-29"
+// into a sorted array of day numbers
+export function parseHolidayList(value) {
+  if (!value) return []
+  const days = new Set()
+  value.split(',').map(part => part.trim()).filter(Boolean).forEach(part => {
+    const [from, to = from] = part.split('..').map(toDayNumber)
+    if (from === null || to === null) return
+    for (let day = from; day <= to; day++) days.add(day)
+  })
+  return [...days].sort((a, b) => a - b)
+}
+
+// Helper function to read the institution calendar from environment variables:
+// WEEKLY_OFF_DAYS (comma-separated weekday names, default Sunday) and
+// INSTITUTION_HOLIDAYS (comma-separated dates or from..to ranges)
+export function loadCalendarConfig(env = process.env) {
+  const weeklyOff = env.WEEKLY_OFF_DAYS === undefined
+    ? DEFAULT_WEEKLY_OFF
+    : env.WEEKLY_OFF_DAYS.split(',').map(day => day.trim()).filter(Boolean)
+  return {
+    weeklyOff,
+    holidays: parseHolidayList(env.INSTITUTION_HOLIDAYS)
+  }
+}
+
+// Helper function to compute missed dates as the class days in
+// [startDate, min(endDate, today)] that are neither recorded nor holidays.
+// Recorded dates split the period into gaps; every class day inside a gap is
+// missed, so each gap becomes one range whose size is counted in closed form.
+// Returns { count, ranges: [{ from, to, count }], dates }.
+export function getMissedDates({
+  startDate,
+  endDate,
+  timetable,
+  recordedDates,
+  holidays = [],
+  weeklyOff = DEFAULT_WEEKLY_OFF,
+  today = todayDayNumber()
+}) {
+  const result = { count: 0, ranges: [], dates: [] }
+  const start = toDayNumber(startDate)
+  const endLimit = toDayNumber(endDate)
+  if (start === null) return result
+  const end = endLimit === null ? today : Math.min(endLimit, today)
+
+  const mask = classWeekdayMask(timetable, weeklyOff)
+  if (end < start || mask === 0) return result
+
+  const isClassDay = day => (mask & (1 << weekdayOf(day))) !== 0
+  const holidaySet = new Set(holidays)
+  const isMissable = day => isClassDay(day) && !holidaySet.has(day)
+
+  // Sorted, de-duplicated recorded day numbers inside the period
+  const recorded = []
+  for (const date of recordedDates) {
+    const day = toDayNumber(date)
+    if (day !== null && day >= start && day <= end) recorded.push(day)
+  }
+  recorded.sort((a, b) => a - b)
+
+  // Holiday class days within [from, to], via binary search over the sorted list
+  const holidayClassDays = (from, to) => {
+    let lo = 0
+    let hi = holidays.length
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1
+      if (holidays[mid] < from) lo = mid + 1
+      else hi = mid
+    }
+    let count = 0
+    for (let i = lo; i < holidays.length && holidays[i] <= to; i++) {
+      if (isClassDay(holidays[i])) count += 1
+    }
+    return count
+  }
+
+  const addGap = (from, to) => {
+    // Trim to the first and last missable day; at most a week of off-days plus holidays
+    while (from <= to && !isMissable(from)) from += 1
+    while (to >= from && !isMissable(to)) to -= 1
+    if (from > to) return
+
+    const count = countClassDays(from, to, mask) - holidayClassDays(from, to)
+    result.count += count
+    result.ranges.push({ from: fromDayNumber(from), to: fromDayNumber(to), count })
+    for (let day = from; day <= to; day++) {
+      if (isMissable(day)) result.dates.push(fromDayNumber(day))
+    }
+  }
+
+  let previous = start - 1
+  for (const day of recorded) {
+    if (day > previous + 1) addGap(previous + 1, day - 1)
+    previous = Math.max(previous, day)
+  }
+  addGap(previous + 1, end)
+
+  return result
+}
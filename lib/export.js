@@ -0,0 +1,110 @@
+import { findAttendanceRecords } from './attendance-store.js'
+
+// Streaming CSV / NDJSON export of attendance records.
+//
+// Records are read from a MongoDB cursor and encoded into a pull-based
+// ReadableStream: the next batch is only fetched when the client has consumed
+// the previous one, so memory stays flat however long the history is.
+
+export const EXPORT_FORMATS = {
+  csv: { contentType: 'text/csv; charset=utf-8', extension: 'csv' },
+  ndjson: { contentType: 'application/x-ndjson; charset=utf-8', extension: 'ndjson' }
+}
+
+// Documents fetched per cursor round trip
+const CURSOR_BATCH_SIZE = 500
+// Encoded lines handed to the stream per pull
+const LINES_PER_CHUNK = 200
+
+const USER_FIELDS = ['userId', 'email', 'name']
+const CSV_RECORD_COLUMNS = ['date', 'isHoliday', 'subject', 'period', 'status']
+// Leading characters that make spreadsheet tools read a cell as a formula
+const CSV_FORMULA_START = /^[=+\-@\t\r]/
+
+// Helper function to quote a CSV field when needed (RFC 4180). Text that would
+// start a formula (subject and user names are user input) gets a leading '.
+function csvField(value) {
+  let text = value === undefined || value === null ? '' : String(value)
+  if (CSV_FORMULA_START.test(text)) text = `'${text}`
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text
+}
+
+function csvLine(fields) {
+  return `${fields.map(csvField).join(',')}\r\n`
+}
+
+// Helper function to encode one attendance record as lines; owner adds the user columns.
+// CSV has one row per class (holidays and empty days get a single row).
+function encodeRecord(record, format, owner) {
+  const ownerFields = owner ? USER_FIELDS.map(field => owner[field]) : []
+
+  if (format === 'ndjson') {
+    const line = owner ? { ...Object.fromEntries(USER_FIELDS.map(f => [f, owner[f]])), ...record } : record
+    return `${JSON.stringify(line)}\n`
+  }
+
+  const subjects = record.subjectAttendance?.length ? record.subjectAttendance : [{}]
+  return subjects
+    .map(sa => csvLine([...ownerFields, record.date, !!record.isHoliday, sa.subject, sa.period, sa.status]))
+    .join('')
+}
+
+// Lines of one user's export
+export async function* userExportLines(db, userId, format, range) {
+  if (format === 'csv') yield csvLine(CSV_RECORD_COLUMNS)
+  for await (const record of findAttendanceRecords(db, userId, range)) {
+    yield encodeRecord(record, format)
+  }
+}
+
+// Helper function to match a semester however it was stored: setup saves a
+// string, older accounts hold the number the setup page sent (e.g. 3)
+function semesterFilter(semester) {
+  const text = String(semester).trim()
+  return /^\d+$/.test(text) ? { $in: [text, Number(text)] } : text
+}
+
+// Lines of every user's export for one semester, user by user
+export async function* semesterExportLines(db, semester, format) {
+  if (format === 'csv') yield csvLine([...USER_FIELDS, ...CSV_RECORD_COLUMNS])
+  const users = db.collection('users')
+    .find({ semester: semesterFilter(semester) }, { projection: { _id: 0, userId: 1, email: 1, name: 1 }, batchSize: CURSOR_BATCH_SIZE })
+    .sort({ userId: 1 })
+  for await (const user of users) {
+    for await (const record of findAttendanceRecords(db, user.userId)) {
+      yield encodeRecord(record, format, user)
+    }
+  }
+}
+
+// Helper function to expose an async iterable of lines as a byte stream.
+// Cancelling the response (client disconnect) closes the underlying cursors.
+export function toByteStream(lines) {
+  const iterator = lines[Symbol.asyncIterator]()
+  const encoder = new TextEncoder()
+
+  return new ReadableStream({
+    async pull(controller) {
+      try {
+        let chunk = ''
+        for (let i = 0; i < LINES_PER_CHUNK; i++) {
+          const { value, done } = await iterator.next()
+          if (done) {
+            if (chunk) controller.enqueue(encoder.encode(chunk))
+            controller.close()
+            return
+          }
+          chunk += value
+        }
+        controller.enqueue(encoder.encode(chunk))
+      } catch (error) {
+        console.error('Export stream failed:', error)
+        controller.error(error)
+        await iterator.return?.()
+      }
+    },
+    async cancel() {
+      await iterator.return?.()
+    }
+  })
+}
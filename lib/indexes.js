@@ -0,0 +1,56 @@
+import { USER_STATS_COLLECTION } from './user-stats.js'
+import { LEADERBOARD_COLLECTION } from './leaderboard.js'
+
+// Indexes required by the API queries, keyed by collection.
+// scripts/ensure-indexes.js and connectToMongo both apply this list, and
+// query_plan_test.py checks that every endpoint query is covered by it.
+export const INDEXES = {
+  users: [
+    { key: { userId: 1 }, name: 'userId_unique', unique: true },
+    { key: { email: 1 }, name: 'email_unique', unique: true },
+    { key: { isSetupComplete: 1 }, name: 'isSetupComplete' },
+    // Admin semester export, streamed in userId order
+    { key: { semester: 1, userId: 1 }, name: 'semester_userId' }
+  ],
+  attendance: [
+    // Also serves .find({ userId }).sort({ date: -1 }) and guards against duplicate entries
+    { key: { userId: 1, date: 1 }, name: 'userId_date_unique', unique: true },
+    // Multikey: serves the per-subject record list without touching other subjects' days
+    { key: { userId: 1, 'subjectAttendance.subject': 1, date: -1 }, name: 'userId_subject_date' }
+  ],
+  // Compact month documents (ATTENDANCE_STORAGE=compact); also serves the per-user scans sorted by month
+  attendance_months: [
+    { key: { userId: 1, month: 1 }, name: 'userId_month_unique', unique: true }
+  ],
+  [USER_STATS_COLLECTION]: [
+    { key: { userId: 1 }, name: 'userId_unique', unique: true },
+    // Stale counters left behind by a full rebuild
+    { key: { updatedAt: -1 }, name: 'updatedAt' }
+  ],
+  [LEADERBOARD_COLLECTION]: [
+    { key: { userId: 1 }, name: 'userId_unique', unique: true },
+    // Page order, and the "ranked ahead" counts of ranks computed on read
+    { key: { percentage: -1, userId: 1 }, name: 'percentage_userId' },
+    // Snapshot ETag (latest change)
+    { key: { updatedAt: -1 }, name: 'updatedAt' }
+  ]
+}
+
+// Helper function to create any missing indexes (no-op when they already exist)
+export async function ensureIndexes(db) {
+  await Promise.all(
+    Object.entries(INDEXES).map(([collection, specs]) => db.collection(collection).createIndexes(specs))
+  )
+}
+
+// Helper function to explain why index creation failed, when the data is the cause
+export function describeIndexError(error) {
+  return isDuplicateKeyError(error)
+    ? 'Existing duplicate records block a unique index; run db:dedupe-attendance, then db:indexes and stats:rebuild'
+    : null
+}
+
+// Helper function to detect unique index violations
+export function isDuplicateKeyError(error) {
+  return error?.code === 11000
+}
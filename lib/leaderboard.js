@@ -0,0 +1,208 @@
+import { USER_STATS_COLLECTION, getUserStats } from './user-stats.js'
+
+// Precomputed leaderboard.
+//
+// One document per setup-complete user: { userId, name, email, totalClasses, attendedClasses, percentage, updatedAt }
+// read in (percentage desc, userId asc) order. Ranks are not stored: a user's
+// rank is 1 + the number of users with a higher percentage, counted on read,
+// so equal percentages share a rank. A full rebuild replaces the collection
+// from the user_stats counters; between rebuilds each attendance write upserts
+// only its own entry. A write lost to a concurrent rebuild is repaired by the
+// next one (see scripts/rebuild-leaderboard.js and LEADERBOARD_MAX_AGE_MS).
+// The time of the last full rebuild is kept in { _id: 'snapshot', builtAt } of
+// leaderboard_meta; the newest entry updatedAt is the time of the last change.
+
+export const LEADERBOARD_COLLECTION = 'leaderboard_snapshots'
+export const LEADERBOARD_META_COLLECTION = 'leaderboard_meta'
+const SNAPSHOT_META_ID = 'snapshot'
+
+const ENTRY_PROJECTION = {
+  _id: 0,
+  userId: 1,
+  name: 1,
+  email: 1,
+  totalClasses: 1,
+  attendedClasses: 1,
+  percentage: 1
+}
+
+let pendingRebuild = null
+
+// Helper function to build the leaderboard aggregation over users.
+// Totals come from the materialized user_stats counters, restricted to the
+// subjects in each user's current subject list like statsFromCounters.
+export function buildLeaderboardPipeline() {
+  return [
+    { $match: { isSetupComplete: true } },
+    {
+      $lookup: {
+        from: USER_STATS_COLLECTION,
+        localField: 'userId',
+        foreignField: 'userId',
+        as: 'stats'
+      }
+    },
+    { $unwind: { path: '$stats', preserveNullAndEmptyArrays: true } },
+    {
+      $project: {
+        _id: 0,
+        userId: 1,
+        name: 1,
+        email: 1,
+        counts: {
+          $filter: {
+            input: { $objectToArray: { $ifNull: ['$stats.counts', {}] } },
+            cond: { $in: ['$$this.v.subject', { $ifNull: ['$subjects', []] }] }
+          }
+        }
+      }
+    },
+    {
+      $project: {
+        userId: 1,
+        name: 1,
+        email: 1,
+        totalClasses: { $sum: '$counts.v.total' },
+        attendedClasses: { $sum: '$counts.v.attended' }
+      }
+    },
+    {
+      // Math.round semantics (round half up), which $round does not provide
+      $addFields: {
+        percentage: {
+          $cond: [
+            { $gt: ['$totalClasses', 0] },
+            { $floor: { $add: [{ $multiply: [{ $divide: ['$attendedClasses', '$totalClasses'] }, 100] }, 0.5] } },
+            0
+          ]
+        }
+      }
+    }
+  ]
+}
+
+// Helper function to recompute every entry and atomically replace the snapshot.
+// $out keeps the collection's indexes, so readers never see a partial snapshot.
+export async function rebuildLeaderboard(db) {
+  const builtAt = new Date()
+  await db.collection('users').aggregate([
+    ...buildLeaderboardPipeline(),
+    { $addFields: { updatedAt: { $literal: builtAt } } },
+    { $out: LEADERBOARD_COLLECTION }
+  ], { allowDiskUse: true }).toArray()
+  await db.collection(LEADERBOARD_META_COLLECTION).updateOne(
+    { _id: SNAPSHOT_META_ID },
+    { $set: { builtAt } },
+    { upsert: true }
+  )
+  return db.collection(LEADERBOARD_COLLECTION).countDocuments()
+}
+
+// Helper function to refresh one user's entry after their counters or profile changed
+export async function updateLeaderboardEntry(db, user) {
+  if (!user.isSetupComplete) return
+
+  const stats = await getUserStats(db, user)
+  await db.collection(LEADERBOARD_COLLECTION).updateOne(
+    { userId: user.userId },
+    {
+      $set: {
+        name: user.name,
+        email: user.email,
+        totalClasses: stats.totalClasses,
+        attendedClasses: stats.attendedClasses,
+        percentage: stats.overallPercentage,
+        updatedAt: new Date()
+      }
+    },
+    { upsert: true }
+  )
+}
+
+// Helper function to rank an entry: users with a higher percentage come first
+export async function getLeaderboardRank(db, percentage) {
+  return 1 + await db.collection(LEADERBOARD_COLLECTION).countDocuments({ percentage: { $gt: percentage } })
+}
+
+// Helper function to read when the snapshot last changed (null when it is empty)
+export async function getLeaderboardUpdatedAt(db) {
+  const latest = await db.collection(LEADERBOARD_COLLECTION).findOne(
+    {},
+    { sort: { updatedAt: -1 }, projection: { _id: 0, updatedAt: 1 } }
+  )
+  return latest?.updatedAt ?? null
+}
+
+// Helper function to read when the snapshot was last fully rebuilt (null before the first rebuild)
+export async function getLeaderboardBuiltAt(db) {
+  const meta = await db.collection(LEADERBOARD_META_COLLECTION).findOne(
+    { _id: SNAPSHOT_META_ID },
+    { projection: { _id: 0, builtAt: 1 } }
+  )
+  return meta?.builtAt ?? null
+}
+
+// Helper function to make sure a full snapshot exists and was rebuilt within maxAgeMs.
+// A missing snapshot is built before returning; a stale one keeps being served
+// while a single background rebuild refreshes it. Returns { builtAt, updatedAt }.
+export async function ensureLeaderboardSnapshot(db, maxAgeMs) {
+  let [builtAt, updatedAt] = await Promise.all([getLeaderboardBuiltAt(db), getLeaderboardUpdatedAt(db)])
+  const stale = !builtAt || Date.now() - builtAt.getTime() > maxAgeMs
+
+  if (stale && !pendingRebuild) {
+    pendingRebuild = rebuildLeaderboard(db)
+      .catch(error => console.error('Leaderboard rebuild failed:', error))
+      .finally(() => { pendingRebuild = null })
+  }
+  if (!builtAt && pendingRebuild) {
+    await pendingRebuild
+    ;[builtAt, updatedAt] = await Promise.all([getLeaderboardBuiltAt(db), getLeaderboardUpdatedAt(db)])
+  }
+  return { builtAt, updatedAt }
+}
+
+// Helper function to read one page of the snapshot after an optional
+// { percentage, userId } cursor, with ranks; keyset paging stays stable while
+// entries move
+export async function getLeaderboardPage(db, { cursor, limit }) {
+  const filter = cursor
+    ? {
+        $or: [
+          { percentage: { $lt: cursor.percentage } },
+          { percentage: cursor.percentage, userId: { $gt: cursor.userId } }
+        ]
+      }
+    : {}
+  const rows = await db.collection(LEADERBOARD_COLLECTION)
+    .find(filter, { projection: ENTRY_PROJECTION })
+    .sort({ percentage: -1, userId: 1 })
+    .limit(limit)
+    .toArray()
+  if (rows.length === 0) return rows
+
+  // Later rows either tie with the row before them or rank right after every
+  // entry ahead of them, so a page costs at most two counts
+  const [firstRank, ahead] = cursor
+    ? await Promise.all([
+        getLeaderboardRank(db, rows[0].percentage),
+        db.collection(LEADERBOARD_COLLECTION).countDocuments({
+          $or: [
+            { percentage: { $gt: cursor.percentage } },
+            { percentage: cursor.percentage, userId: { $lte: cursor.userId } }
+          ]
+        })
+      ])
+    : [1, 0]
+  rows.forEach((row, i) => {
+    if (i === 0) row.rank = firstRank
+    else row.rank = row.percentage === rows[i - 1].percentage ? rows[i - 1].rank : ahead + i + 1
+  })
+  return rows
+}
+
+// Helper function to look up one user's snapshot entry ("my rank")
+export async function getLeaderboardEntry(db, userId) {
+  const entry = await db.collection(LEADERBOARD_COLLECTION).findOne({ userId }, { projection: ENTRY_PROJECTION })
+  if (entry) entry.rank = await getLeaderboardRank(db, entry.percentage)
+  return entry
+}
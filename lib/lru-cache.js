@@ -0,0 +1,57 @@
+// Small in-process LRU cache with per-entry expiry.
+//
+// A Map keeps insertion order, so re-inserting on every hit leaves the least
+// recently used entry first and eviction is O(1). The cache is per server
+// process: keep TTLs short so other instances converge quickly.
+
+export class LruCache {
+  constructor({ max = 1000, ttlMs = 5000 } = {}) {
+    this.max = max
+    this.ttlMs = ttlMs
+    this.entries = new Map()
+    this.hits = 0
+    this.misses = 0
+  }
+
+  get(key) {
+    const entry = this.entries.get(key)
+    if (!entry || entry.expiresAt <= Date.now()) {
+      if (entry) this.entries.delete(key)
+      this.misses += 1
+      return undefined
+    }
+    this.entries.delete(key)
+    this.entries.set(key, entry)
+    this.hits += 1
+    return entry.value
+  }
+
+  set(key, value, ttlMs = this.ttlMs) {
+    if (ttlMs <= 0) return
+    this.entries.delete(key)
+    this.entries.set(key, { value, expiresAt: Date.now() + ttlMs })
+    while (this.entries.size > this.max) {
+      this.entries.delete(this.entries.keys().next().value)
+    }
+  }
+
+  delete(key) {
+    this.entries.delete(key)
+  }
+
+  clear() {
+    this.entries.clear()
+  }
+
+  stats() {
+    const lookups = this.hits + this.misses
+    return {
+      size: this.entries.size,
+      max: this.max,
+      ttlMs: this.ttlMs,
+      hits: this.hits,
+      misses: this.misses,
+      hitRate: lookups > 0 ? Math.round((this.hits / lookups) * 1000) / 1000 : 0
+    }
+  }
+}
@@ -0,0 +1,137 @@
+import { AsyncLocalStorage } from 'async_hooks'
+
+// Request timing and per-route latency metrics.
+//
+// withRequestTiming() opens a timing scope for one request; timed() and
+// timedSync() add the duration of a phase (auth, user, stats, serialize, ...)
+// to the current scope, so helpers can be timed without passing anything
+// around. Repeated phases add up. Finished requests feed cumulative
+// Prometheus histograms per route pattern; rate() over the scrape window
+// gives the rolling view.
+
+// Histogram bucket upper bounds in seconds
+export const LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+const timingStorage = new AsyncLocalStorage()
+
+// route key -> { method, route, buckets, sum, count, statuses: Map, phases: Map }
+const routeMetrics = new Map()
+
+// Helper function to add a phase duration to the current request, if any
+function addPhase(phase, durationMs) {
+  const phases = timingStorage.getStore()
+  if (phases) phases.set(phase, (phases.get(phase) || 0) + durationMs)
+}
+
+// Helper function to run a request with a fresh timing scope; fn receives the phase map
+export function withRequestTiming(fn) {
+  const phases = new Map()
+  return timingStorage.run(phases, () => fn(phases))
+}
+
+// Helper function to time an async phase of the current request
+export async function timed(phase, fn) {
+  const started = performance.now()
+  try {
+    return await fn()
+  } finally {
+    addPhase(phase, performance.now() - started)
+  }
+}
+
+// Helper function to time a synchronous phase of the current request
+export function timedSync(phase, fn) {
+  const started = performance.now()
+  try {
+    return fn()
+  } finally {
+    addPhase(phase, performance.now() - started)
+  }
+}
+
+// Helper function to format phases as a Server-Timing header value
+export function formatServerTiming(phases, totalMs) {
+  const entries = [...phases].map(([phase, durationMs]) => `${phase};dur=${durationMs.toFixed(1)}`)
+  entries.push(`total;dur=${totalMs.toFixed(1)}`)
+  return entries.join(', ')
+}
+
+// Helper function to record a finished request under its route pattern
+export function recordRequest({ method, route, status, durationMs, phases }) {
+  const key = `${method} ${route}`
+  let metrics = routeMetrics.get(key)
+  if (!metrics) {
+    metrics = {
+      method,
+      route,
+      buckets: new Array(LATENCY_BUCKETS.length).fill(0),
+      sum: 0,
+      count: 0,
+      statuses: new Map(),
+      phases: new Map()
+    }
+    routeMetrics.set(key, metrics)
+  }
+
+  const seconds = durationMs / 1000
+  const bucket = LATENCY_BUCKETS.findIndex(bound => seconds <= bound)
+  if (bucket !== -1) metrics.buckets[bucket] += 1
+  metrics.sum += seconds
+  metrics.count += 1
+  metrics.statuses.set(status, (metrics.statuses.get(status) || 0) + 1)
+
+  for (const [phase, phaseMs] of phases) {
+    const totals = metrics.phases.get(phase) || { sum: 0, count: 0 }
+    totals.sum += phaseMs / 1000
+    totals.count += 1
+    metrics.phases.set(phase, totals)
+  }
+}
+
+// Helper function to escape a Prometheus label value
+function label(value) {
+  return String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"')
+}
+
+// Helper function to render every route's metrics in the Prometheus text format
+export function renderPrometheus() {
+  const lines = [
+    '# HELP api_requests_total API requests by route pattern and status code.',
+    '# TYPE api_requests_total counter'
+  ]
+  for (const { method, route, statuses } of routeMetrics.values()) {
+    for (const [status, count] of statuses) {
+      lines.push(`api_requests_total{method="${method}",route="${label(route)}",status="${status}"} ${count}`)
+    }
+  }
+
+  lines.push(
+    '# HELP api_request_duration_seconds API request latency by route pattern.',
+    '# TYPE api_request_duration_seconds histogram'
+  )
+  for (const { method, route, buckets, sum, count } of routeMetrics.values()) {
+    const labels = `method="${method}",route="${label(route)}"`
+    let cumulative = 0
+    LATENCY_BUCKETS.forEach((bound, i) => {
+      cumulative += buckets[i]
+      lines.push(`api_request_duration_seconds_bucket{${labels},le="${bound}"} ${cumulative}`)
+    })
+    lines.push(`api_request_duration_seconds_bucket{${labels},le="+Inf"} ${count}`)
+    lines.push(`api_request_duration_seconds_sum{${labels}} ${sum}`)
+    lines.push(`api_request_duration_seconds_count{${labels}} ${count}`)
+  }
+
+  lines.push(
+    '# HELP api_request_phase_seconds Time spent in each phase of an API request.',
+    '# TYPE api_request_phase_seconds summary'
+  )
+  for (const { method, route, phases } of routeMetrics.values()) {
+    for (const [phase, { sum, count }] of phases) {
+      const labels = `method="${method}",route="${label(route)}",phase="${label(phase)}"`
+      lines.push(`api_request_phase_seconds_sum{${labels}} ${sum}`)
+      lines.push(`api_request_phase_seconds_count{${labels}} ${count}`)
+    }
+  }
+
+  return `${lines.join('\n')}\n`
+}
@@ -0,0 +1,122 @@
+import { MongoClient } from 'mongodb'
+import { describeIndexError, ensureIndexes } from './indexes.js'
+
+// Shared MongoDB client for the API routes.
+//
+// Every caller awaits one connect promise, so a burst of cold requests opens a
+// single client. The promise lives on globalThis because `next dev` re-evaluates
+// modules on every reload and would otherwise leak a client each time; a failed
+// connect clears it so the next request retries.
+//
+// Pool size is tuned with MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE and
+// MONGO_MAX_IDLE_TIME_MS. Connection pool events feed the metrics returned by
+// getPoolMetrics().
+
+const GLOBAL_KEY = Symbol.for('attendance-tracker.mongo')
+
+const state = globalThis[GLOBAL_KEY] || (globalThis[GLOBAL_KEY] = {
+  connecting: null,
+  metrics: null
+})
+
+// Helper function to read the pool options from environment variables
+export function loadPoolOptions(env = process.env) {
+  return {
+    maxPoolSize: parseInt(env.MONGO_MAX_POOL_SIZE || '20', 10),
+    minPoolSize: parseInt(env.MONGO_MIN_POOL_SIZE || '2', 10),
+    maxIdleTimeMS: parseInt(env.MONGO_MAX_IDLE_TIME_MS || '60000', 10)
+  }
+}
+
+// Helper function to count pool events; gauges are derived from the counters
+function trackPool(client, options) {
+  const metrics = {
+    options,
+    created: 0,
+    closed: 0,
+    checkOutsStarted: 0,
+    checkedOut: 0,
+    checkedIn: 0,
+    checkOutFailures: 0,
+    checkOutTotalMs: 0,
+    checkOutMaxMs: 0
+  }
+
+  client.on('connectionCreated', () => { metrics.created += 1 })
+  client.on('connectionClosed', () => { metrics.closed += 1 })
+  client.on('connectionCheckOutStarted', () => { metrics.checkOutsStarted += 1 })
+  client.on('connectionCheckOutFailed', () => { metrics.checkOutFailures += 1 })
+  client.on('connectionCheckedIn', () => { metrics.checkedIn += 1 })
+  client.on('connectionCheckedOut', event => {
+    metrics.checkedOut += 1
+    // durationMS: time from checkout start until a connection was handed over
+    const durationMs = event.durationMS ?? 0
+    metrics.checkOutTotalMs += durationMs
+    metrics.checkOutMaxMs = Math.max(metrics.checkOutMaxMs, durationMs)
+  })
+
+  return metrics
+}
+
+// Helper function to open the client and apply the indexes once
+async function connect() {
+  const options = loadPoolOptions()
+  const client = new MongoClient(process.env.MONGO_URL, options)
+  const metrics = trackPool(client, options)
+
+  await client.connect()
+  const db = client.db(process.env.DB_NAME)
+  try {
+    await ensureIndexes(db)
+  } catch (error) {
+    // Keep serving: inserts check for duplicate dates themselves while the
+    // unique index is missing (see insertAttendanceRecords)
+    console.error('Index bootstrap failed:', error)
+    const hint = describeIndexError(error)
+    if (hint) console.error(hint)
+  }
+
+  state.metrics = metrics
+  return { client, db }
+}
+
+// Helper function to get the shared database handle
+export async function connectToMongo() {
+  if (!state.connecting) {
+    state.connecting = connect().catch(error => {
+      state.connecting = null
+      throw error
+    })
+  }
+  const { db } = await state.connecting
+  return db
+}
+
+// Helper function to connect and round-trip once before the first request.
+// minPoolSize keeps that many connections open from here on.
+export async function warmUpMongo() {
+  const started = Date.now()
+  const db = await connectToMongo()
+  await db.command({ ping: 1 })
+  return Date.now() - started
+}
+
+// Helper function to report pool gauges and checkout latency (null before connecting)
+export function getPoolMetrics() {
+  const metrics = state.metrics
+  if (!metrics) return null
+
+  const waiting = metrics.checkOutsStarted - metrics.checkedOut - metrics.checkOutFailures
+  return {
+    ...metrics.options,
+    totalConnections: metrics.created - metrics.closed,
+    inUse: metrics.checkedOut - metrics.checkedIn,
+    waiting: Math.max(0, waiting),
+    checkOuts: metrics.checkedOut,
+    checkOutFailures: metrics.checkOutFailures,
+    checkOutLatencyMs: {
+      avg: metrics.checkedOut > 0 ? Math.round((metrics.checkOutTotalMs / metrics.checkedOut) * 100) / 100 : 0,
+      max: metrics.checkOutMaxMs
+    }
+  }
+}
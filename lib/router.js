@@ -0,0 +1,82 @@
+// Table-driven request router for the API catch-all route.
+//
+// Routes are compiled once at module load. Static paths live in a Map keyed
+// by "METHOD /path", so lookup cost does not grow with the number of routes.
+// Paths with parameters ("/attendance/subject/:name") are grouped by method
+// and segment count, so a request only tries patterns of its own shape.
+//
+// A route is { method, path, middleware: [fn], handler: fn }. Middleware and
+// handlers receive a shared context object; a middleware either adds to the
+// context or returns a response that ends the request.
+
+// Helper function to split a path into its non-empty segments
+function splitPath(path) {
+  return path.split('/').filter(Boolean)
+}
+
+// Helper function to compile a route table into a matcher
+export function createRouter(routes) {
+  const staticRoutes = new Map()
+  const paramRoutes = new Map()
+
+  for (const route of routes) {
+    const segments = splitPath(route.path)
+    const compiled = { ...route, middleware: route.middleware || [] }
+
+    if (!segments.some(segment => segment.startsWith(':'))) {
+      const key = `${route.method} /${segments.join('/')}`
+      if (staticRoutes.has(key)) throw new Error(`Duplicate route ${key}`)
+      staticRoutes.set(key, compiled)
+      continue
+    }
+
+    compiled.segments = segments.map(segment =>
+      segment.startsWith(':') ? { param: segment.slice(1) } : { literal: segment }
+    )
+    const key = `${route.method} ${segments.length}`
+    if (!paramRoutes.has(key)) paramRoutes.set(key, [])
+    paramRoutes.get(key).push(compiled)
+  }
+
+  // Returns { route, params } for the first matching route, or null
+  function match(method, segments) {
+    const exact = staticRoutes.get(`${method} /${segments.join('/')}`)
+    if (exact) return { route: exact, params: {} }
+
+    for (const route of paramRoutes.get(`${method} ${segments.length}`) || []) {
+      const params = matchSegments(route.segments, segments)
+      if (params) return { route, params }
+    }
+    return null
+  }
+
+  return { match }
+}
+
+// Helper function to match path segments against a compiled pattern.
+// Parameter values are URI-decoded; malformed escapes do not match.
+function matchSegments(pattern, segments) {
+  const params = {}
+  for (let i = 0; i < pattern.length; i++) {
+    const { literal, param } = pattern[i]
+    if (literal !== undefined) {
+      if (literal !== segments[i]) return null
+      continue
+    }
+    try {
+      params[param] = decodeURIComponent(segments[i])
+    } catch (error) {
+      return null
+    }
+  }
+  return params
+}
+
+// Helper function to run a matched route's middleware chain and handler
+export async function runRoute(route, context) {
+  for (const middleware of route.middleware) {
+    const response = await middleware(context)
+    if (response) return response
+  }
+  return route.handler(context)
+}
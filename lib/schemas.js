@@ -0,0 +1,62 @@
+import { WEEKDAY_NAMES } from './calendar.js'
+import { array, boolean, compileSchema, date, integer, object, oneOf, optional, record, string, stringOrInteger } from './validation.js'
+
+// Request body schemas of the API routes, compiled once at module load.
+// Each export validates a parsed body: validate(body) => { value } or { error }.
+
+export const MAX_SUBJECTS = 30
+export const MAX_SUBJECTS_PER_DAY = 12
+const SUBJECT_NAME_MAX = 100
+const SEMESTER_NAME_MAX = 100
+const TOKEN_MAX = 8192
+
+export const ATTENDANCE_STATUSES = ['attended', 'missed']
+
+const subjectName = string({ maxLength: SUBJECT_NAME_MAX })
+
+// Helper function to check the setup fields that depend on each other
+function checkSetup({ subjects, startDate, endDate, timetable }) {
+  if (endDate < startDate) return 'endDate must not be before startDate'
+  const known = new Set(subjects)
+  for (const [day, daySubjects] of Object.entries(timetable)) {
+    const unknown = daySubjects.find(subject => !known.has(subject))
+    if (unknown !== undefined) return `timetable.${day} lists "${unknown}", which is not in subjects`
+  }
+  return null
+}
+
+// POST /api/auth/session
+export const validateSession = compileSchema(object({
+  token: string({ maxLength: TOKEN_MAX })
+}))
+
+// POST /api/user/setup. The setup page sends the semester as a number (1-8),
+// API clients as a name; it is stored as a string either way.
+export const validateSetup = compileSchema(object({
+  semester: stringOrInteger({ maxLength: SEMESTER_NAME_MAX }),
+  subjects: array(subjectName, { minItems: 1, maxItems: MAX_SUBJECTS, unique: true }),
+  startDate: date(),
+  endDate: date(),
+  timetable: record(WEEKDAY_NAMES, array(subjectName, { maxItems: MAX_SUBJECTS_PER_DAY }))
+}, { check: checkSetup }))
+
+const attendanceEntry = object({
+  date: date(),
+  isHoliday: optional(boolean(), false),
+  subjectAttendance: optional(array(object({
+    subject: subjectName,
+    // Timetable slot of the class (1-based), sent by the attendance page
+    period: optional(integer({ min: 1, max: MAX_SUBJECTS_PER_DAY })),
+    status: oneOf(ATTENDANCE_STATUSES)
+  }), { maxItems: MAX_SUBJECTS_PER_DAY }), [])
+})
+
+// POST /api/attendance/enter, and each entry of /api/attendance/bulk
+export const validateAttendanceEntry = compileSchema(attendanceEntry)
+
+// POST /api/attendance/bulk. Entries pass through unchecked here and go through
+// validateAttendanceEntry one by one, so a bad entry gets its own result.
+export const BULK_MAX_ENTRIES = 366
+export const validateBulkAttendance = compileSchema(object({
+  entries: array(entry => entry, { minItems: 1, maxItems: BULK_MAX_ENTRIES })
+}))
@@ -0,0 +1,212 @@
+import { subjectKey, statsFromCounters, AttendanceTally } from './attendance-stats.js'
+import { ATTENDANCE_COLLECTION, findUserRecords, isCompactStorage } from './attendance-store.js'
+
+// Materialized per-user attendance counters.
+//
+// One document per user: { userId, counts: { [subjectKey]: { subject, total, attended } }, version, updatedAt }
+// Counters cover every subject seen in the user's records; statsFromCounters
+// restricts them to the user's current subject list on read. version changes
+// on every attendance write and is only compared for equality (ETags).
+
+export const USER_STATS_COLLECTION = 'user_stats'
+
+const REBUILD_BATCH_SIZE = 500
+// Attempts of a single-user rebuild that keeps losing to concurrent writes
+const USER_REBUILD_ATTEMPTS = 5
+
+// Helper function to build one counter update covering several attendance records
+export function buildStatsUpdate(records) {
+  const update = { $set: { updatedAt: new Date() } }
+  const inc = { version: 1 }
+
+  for (const record of records) {
+    if (record.isHoliday) continue
+    for (const sa of record.subjectAttendance || []) {
+      const path = `counts.${subjectKey(sa.subject)}`
+      update.$set[`${path}.subject`] = sa.subject
+      inc[`${path}.total`] = (inc[`${path}.total`] || 0) + 1
+      if (sa.status === 'attended') {
+        inc[`${path}.attended`] = (inc[`${path}.attended`] || 0) + 1
+      }
+    }
+  }
+  update.$inc = inc
+
+  return update
+}
+
+// Helper function to apply newly inserted attendance records to a user's counters.
+// When this write creates the counters, the user may have older records that
+// were never counted, so they are rebuilt from the stored records instead.
+export async function recordUserStats(db, userId, records) {
+  const result = await db.collection(USER_STATS_COLLECTION).updateOne(
+    { userId },
+    buildStatsUpdate(records),
+    { upsert: true }
+  )
+  if (result.upsertedCount > 0) {
+    await rebuildUserStats(db, { userId })
+  }
+}
+
+// Helper function to stream per-user counters of the attendance documents,
+// sorted by userId, as { userId, counts }
+async function* documentCounters(db, match) {
+  const rows = db.collection(ATTENDANCE_COLLECTION).aggregate([
+    { $match: { ...match, isHoliday: { $ne: true } } },
+    { $unwind: '$subjectAttendance' },
+    {
+      $group: {
+        _id: { userId: '$userId', subject: '$subjectAttendance.subject' },
+        total: { $sum: 1 },
+        attended: { $sum: { $cond: [{ $eq: ['$subjectAttendance.status', 'attended'] }, 1, 0] } }
+      }
+    },
+    { $sort: { '_id.userId': 1 } }
+  ], { allowDiskUse: true })
+
+  let current = null
+  for await (const row of rows) {
+    if (current && current.userId !== row._id.userId) {
+      yield current
+      current = null
+    }
+    current ||= { userId: row._id.userId, counts: {} }
+    current.counts[subjectKey(row._id.subject)] = {
+      subject: row._id.subject,
+      total: row.total,
+      attended: row.attended
+    }
+  }
+  if (current) yield current
+}
+
+// Helper function to stream per-user counters of records sorted by userId, as { userId, counts }
+async function* recordCounters(records) {
+  let current = null
+  for await (const record of records) {
+    if (record.isHoliday) continue
+    if (current && current.userId !== record.userId) {
+      yield current
+      current = null
+    }
+    current ||= { userId: record.userId, counts: {} }
+    for (const sa of record.subjectAttendance || []) {
+      const counter = current.counts[subjectKey(sa.subject)] ||= { subject: sa.subject, total: 0, attended: 0 }
+      counter.total += 1
+      if (sa.status === 'attended') counter.attended += 1
+    }
+  }
+  if (current) yield current
+}
+
+// Helper function to stream the counters of the stored attendance records.
+// In compact mode a date can be stored in both layouts while it is being
+// moved, so the records are merged by date first and each date counts once.
+function storedCounters(db, match) {
+  return isCompactStorage()
+    ? recordCounters(findUserRecords(db, match))
+    : documentCounters(db, match)
+}
+
+// Helper function to recompute one user's counters while writes go on.
+// The replacement only lands if no write bumped version since it was read;
+// otherwise the records are counted again. Records inserted before the read
+// but counted after the replacement are still counted twice, which the write
+// path keeps rare by rebuilding right after its own increment.
+async function rebuildUserCounters(db, userId) {
+  const statsCollection = db.collection(USER_STATS_COLLECTION)
+
+  for (let attempt = 0; attempt < USER_REBUILD_ATTEMPTS; attempt++) {
+    const current = await statsCollection.findOne({ userId }, { projection: { _id: 0, version: 1 } })
+    let counts = {}
+    for await (const user of storedCounters(db, { userId })) counts = user.counts
+
+    const rebuiltAt = new Date()
+    const replacement = { userId, counts, version: rebuiltAt.getTime(), updatedAt: rebuiltAt }
+    if (current) {
+      const result = await statsCollection.replaceOne({ userId, version: current.version }, replacement)
+      if (result.matchedCount > 0) return 1
+    } else {
+      try {
+        await statsCollection.insertOne(replacement)
+        return 1
+      } catch (error) {
+        // 11000: a concurrent write created the counters first
+        if (error?.code !== 11000) throw error
+      }
+    }
+  }
+
+  console.warn(`Counters of user ${userId} kept changing during rebuild; run stats:rebuild`)
+  return 0
+}
+
+// Helper function to recompute counters from the stored attendance records.
+// Pass a userId to rebuild a single user; returns the number of users rebuilt.
+// A full rebuild replaces counters wholesale, so run it while writes are quiet.
+export async function rebuildUserStats(db, { userId } = {}) {
+  if (userId) return rebuildUserCounters(db, userId)
+
+  const statsCollection = db.collection(USER_STATS_COLLECTION)
+  const rebuiltAt = new Date()
+  let operations = []
+  let rebuilt = 0
+
+  for await (const user of storedCounters(db, {})) {
+    operations.push({
+      replaceOne: {
+        filter: { userId: user.userId },
+        replacement: { userId: user.userId, counts: user.counts, version: rebuiltAt.getTime(), updatedAt: rebuiltAt },
+        upsert: true
+      }
+    })
+    rebuilt += 1
+    if (operations.length >= REBUILD_BATCH_SIZE) {
+      await statsCollection.bulkWrite(operations, { ordered: false })
+      operations = []
+    }
+  }
+
+  if (operations.length > 0) {
+    await statsCollection.bulkWrite(operations, { ordered: false })
+  }
+
+  // Users whose records were all deleted or holidays keep no stale counters
+  await statsCollection.deleteMany({ updatedAt: { $lt: rebuiltAt } })
+
+  return rebuilt
+}
+
+// Helper function to load a user's counters, optionally projected.
+// Users created before the counters existed are rebuilt on first read.
+export async function getUserCounters(db, userId, projection = { counts: 1 }) {
+  const collection = db.collection(USER_STATS_COLLECTION)
+  let doc = await collection.findOne({ userId }, { projection })
+  if (!doc) {
+    await rebuildUserStats(db, { userId })
+    doc = await collection.findOne({ userId }, { projection })
+  }
+  return doc?.counts
+}
+
+// Helper function to load a user's statistics from the counters
+export async function getUserStats(db, user) {
+  const counts = await getUserCounters(db, user.userId)
+  return statsFromCounters(counts, user.subjects || [])
+}
+
+// Helper function to load one subject's statistics, reading only that counter
+export async function getSubjectStats(db, user, subject) {
+  if (!(user.subjects || []).includes(subject)) {
+    return { total: 0, attended: 0, percentage: 0 }
+  }
+  const counts = await getUserCounters(db, user.userId, { [`counts.${subjectKey(subject)}`]: 1 })
+  return AttendanceTally.fromCounters(counts, [subject]).subject(subject)
+}
+
+// Helper function to read a user's data version without loading the counters
+export async function getStatsVersion(db, userId) {
+  const doc = await db.collection(USER_STATS_COLLECTION).findOne({ userId }, { projection: { _id: 0, version: 1 } })
+  return doc?.version ?? 0
+}
@@ -0,0 +1,198 @@
+import { normalizeDate } from './calendar.js'
+
+// Request body reading and schema validation.
+//
+// Schemas are built from the helpers below (object, array, string, ...) once,
+// at module load; each helper returns a plain validator function, so checking
+// a request only walks the body. Validators return the normalized value (dates
+// as YYYY-MM-DD, strings trimmed, unknown keys dropped) and stop at the first
+// problem, reported as "path: message".
+//
+// readJsonBody() counts bytes while the body streams in and stops reading past
+// the limit, so an oversized request is never buffered or parsed.
+
+class SchemaError extends Error {
+  constructor(path, message) {
+    super(path ? `${path}: ${message}` : message)
+  }
+}
+
+function fail(path, message) {
+  throw new SchemaError(path, message)
+}
+
+// Helper function to build the path of a nested value
+function childPath(path, key) {
+  if (typeof key === 'number') return `${path}[${key}]`
+  return path ? `${path}.${key}` : key
+}
+
+// Helper function to mark an object key as optional, with an optional default
+export function optional(validator, defaultValue) {
+  const wrapped = (value, path) => validator(value, path)
+  wrapped.optional = true
+  wrapped.defaultValue = defaultValue
+  return wrapped
+}
+
+// Non-empty (by default) string, trimmed
+export function string({ minLength = 1, maxLength = 200 } = {}) {
+  return (value, path) => {
+    if (typeof value !== 'string') fail(path, 'must be a string')
+    const text = value.trim()
+    if (text.length < minLength) fail(path, minLength === 1 ? 'must not be empty' : `must have at least ${minLength} characters`)
+    if (text.length > maxLength) fail(path, `must have at most ${maxLength} characters`)
+    return text
+  }
+}
+
+// String, or an integer sent as a number; both come back as the trimmed string
+export function stringOrInteger(options) {
+  const text = string(options)
+  return (value, path) => {
+    if (Number.isInteger(value)) return text(String(value), path)
+    if (typeof value !== 'string') fail(path, 'must be a string or an integer')
+    return text(value, path)
+  }
+}
+
+// Integer within [min, max]
+export function integer({ min = -Infinity, max = Infinity } = {}) {
+  return (value, path) => {
+    if (!Number.isInteger(value)) fail(path, 'must be an integer')
+    if (value < min) fail(path, `must be at least ${min}`)
+    if (value > max) fail(path, `must be at most ${max}`)
+    return value
+  }
+}
+
+export function boolean() {
+  return (value, path) => {
+    if (typeof value !== 'boolean') fail(path, 'must be true or false')
+    return value
+  }
+}
+
+// One of a fixed list of values
+export function oneOf(values) {
+  const allowed = new Set(values)
+  const message = `must be one of ${values.join(', ')}`
+  return (value, path) => {
+    if (!allowed.has(value)) fail(path, message)
+    return value
+  }
+}
+
+// Calendar date, normalized to YYYY-MM-DD (see normalizeDate)
+export function date() {
+  return (value, path) => {
+    const normalized = normalizeDate(value)
+    if (!normalized) fail(path, 'must be a date in the YYYY-MM-DD format')
+    return normalized
+  }
+}
+
+// Array of items; unique compares the normalized items
+export function array(item, { minItems = 0, maxItems = Infinity, unique = false } = {}) {
+  return (value, path) => {
+    if (!Array.isArray(value)) fail(path, 'must be an array')
+    if (value.length < minItems) fail(path, minItems === 1 ? 'must not be empty' : `must have at least ${minItems} items`)
+    if (value.length > maxItems) fail(path, `must have at most ${maxItems} items`)
+
+    const items = value.map((element, index) => item(element, childPath(path, index)))
+    if (unique) {
+      const seen = new Set()
+      items.forEach((element, index) => {
+        if (seen.has(element)) fail(childPath(path, index), `repeats ${JSON.stringify(element)}`)
+        seen.add(element)
+      })
+    }
+    return items
+  }
+}
+
+// Helper function to check for a plain JSON object
+function isPlainObject(value) {
+  return value !== null && typeof value === 'object' && !Array.isArray(value)
+}
+
+// Object with known keys; other keys are dropped. check(value) runs after the
+// keys are valid and returns an error message for cross-field problems.
+export function object(shape, { check } = {}) {
+  const keys = Object.entries(shape)
+  return (value, path) => {
+    if (!isPlainObject(value)) fail(path, 'must be an object')
+
+    const result = {}
+    for (const [key, validator] of keys) {
+      if (value[key] === undefined || value[key] === null) {
+        if (!validator.optional) fail(childPath(path, key), 'is required')
+        if (validator.defaultValue !== undefined) result[key] = validator.defaultValue
+        continue
+      }
+      result[key] = validator(value[key], childPath(path, key))
+    }
+
+    const problem = check?.(result)
+    if (problem) fail(path, problem)
+    return result
+  }
+}
+
+// Object whose keys all come from a fixed list and share one value validator
+export function record(allowedKeys, validator) {
+  const allowed = new Set(allowedKeys)
+  return (value, path) => {
+    if (!isPlainObject(value)) fail(path, 'must be an object')
+
+    const result = {}
+    for (const [key, element] of Object.entries(value)) {
+      if (!allowed.has(key)) fail(childPath(path, key), 'is not an allowed key')
+      result[key] = validator(element, childPath(path, key))
+    }
+    return result
+  }
+}
+
+// Helper function to turn a schema into validate(input) => { value } or { error }
+export function compileSchema(schema) {
+  return input => {
+    try {
+      return { value: schema(input, '') }
+    } catch (error) {
+      if (error instanceof SchemaError) return { error: error.message }
+      throw error
+    }
+  }
+}
+
+// Helper function to read a JSON request body of at most maxBytes.
+// Returns { value } or { status, error } (413 when too large, 400 when malformed).
+export async function readJsonBody(request, maxBytes) {
+  const tooLarge = { status: 413, error: `Request body must be at most ${maxBytes} bytes` }
+  const malformed = { status: 400, error: 'Request body must be valid JSON' }
+
+  const declared = Number(request.headers.get('content-length'))
+  if (declared > maxBytes) return tooLarge
+  if (!request.body) return malformed
+
+  const reader = request.body.getReader()
+  const chunks = []
+  let size = 0
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) break
+    size += value.byteLength
+    if (size > maxBytes) {
+      await reader.cancel()
+      return tooLarge
+    }
+    chunks.push(value)
+  }
+
+  try {
+    return { value: JSON.parse(Buffer.concat(chunks).toString('utf8')) }
+  } catch (error) {
+    return malformed
+  }
+}
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+
+from backend_test import SETUP_DATA, make_mock_token
+
+# Configuration
+DEFAULT_BASE_URL = os.environ.get('LOAD_TEST_BASE_URL', 'http://localhost:3000')
+PERCENTILES = (50, 95, 99)
+
+class VirtualStudent:
+    """One simulated student running the AttendanceTrackerAPITest flow"""
+
+    def __init__(self, index, run_id, client, recorder):
+        self.index = index
+        self.email = f'load.{run_id}.{index}@university.edu'
+        self.name = f'Load Student {index}'
+        self.client = client
+        self.recorder = recorder
+
+    async def call(self, method, path, **kwargs):
+        """Issue one request and record its latency under "METHOD /path" """
+        route = f"{method} {path.split('?')[0]}"
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, f"/api{path}", **kwargs)
+            self.recorder.record(route, time.perf_counter() - started, response.status_code < 400)
+            return response
+        except httpx.HTTPError:
+            self.recorder.record(route, time.perf_counter() - started, False)
+            return None
+
+    async def sign_in(self):
+        """Auth session and setup, as in test_auth_session_creation and test_user_setup"""
+        token = make_mock_token(self.email, self.name)
+        response = await self.call('POST', '/auth/session', json={'token': token})
+        if response is None or response.status_code != 200:
+            return False
+        response = await self.call('POST', '/user/setup', json=SETUP_DATA)
+        return response is not None and response.status_code == 200
+
+    async def run_day(self, day):
+        """Enter one day's attendance and read it back like the homepage and check pages do"""
+        date = (datetime.strptime(SETUP_DATA['startDate'], '%Y-%m-%d') + timedelta(days=day)).strftime('%Y-%m-%d')
+        subjects = SETUP_DATA['subjects']
+        await self.call('POST', '/attendance/enter', json={
+            'date': date,
+            'isHoliday': False,
+            'subjectAttendance': [
+                {'subject': subject, 'status': 'attended' if (self.index + day + i) % 4 else 'missed'}
+                for i, subject in enumerate(subjects)
+            ]
+        })
+        await self.call('GET', '/dashboard')
+        await self.call('GET', '/attendance/summary')
+        await self.call('GET', '/attendance/records')
+        await self.call('GET', '/leaderboard')
+
+class LatencyRecorder:
+    """Collects per-route latencies and error counts"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok):
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+    @staticmethod
+    def percentile(sorted_values, pct):
+        """Nearest-rank percentile of an already sorted list"""
+        rank = max(1, -(-pct * len(sorted_values) // 100))
+        return sorted_values[rank - 1]
+
+    def summary(self, wall_seconds):
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            routes[route] = {
+                'requests': len(values),
+                'errors': self.errors[route],
+                'rps': round(len(values) / wall_seconds, 2) if wall_seconds else 0,
+                **{f'p{pct}_ms': round(self.percentile(values, pct) * 1000, 2) for pct in PERCENTILES}
+            }
+        total = sum(r['requests'] for r in routes.values())
+        return {
+            'wall_seconds': round(wall_seconds, 3),
+            'total_requests': total,
+            'total_errors': sum(r['errors'] for r in routes.values()),
+            'rps': round(total / wall_seconds, 2) if wall_seconds else 0,
+            'routes': routes
+        }
+
+def print_table(summary):
+    """Print the per-route summary as a fixed-width table"""
+    header = f"{'ROUTE':<28} {'REQS':>7} {'ERRS':>5} {'RPS':>9} {'P50 ms':>9} {'P95 ms':>9} {'P99 ms':>9}"
+    print("=" * len(header))
+    print(header)
+    print("-" * len(header))
+    for route, r in summary['routes'].items():
+        print(f"{route:<28} {r['requests']:>7} {r['errors']:>5} {r['rps']:>9} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+    print("-" * len(header))
+    print(f"{'TOTAL':<28} {summary['total_requests']:>7} {summary['total_errors']:>5} {summary['rps']:>9}")
+    print("=" * len(header))
+
+async def run_load_test(base_url, students, days, timeout):
+    """Sign in every student, then run their daily flows concurrently"""
+    recorder = LatencyRecorder()
+    run_id = uuid.uuid4().hex[:8]
+
+    # One client per student, like one browser each: separate cookie jars and keep-alive connections
+    async with contextlib.AsyncExitStack() as stack:
+        roster = []
+        for i in range(students):
+            client = await stack.enter_async_context(httpx.AsyncClient(base_url=base_url, timeout=timeout))
+            roster.append(VirtualStudent(i, run_id, client, recorder))
+
+        started = time.perf_counter()
+        signed_in = await asyncio.gather(*(student.sign_in() for student in roster))
+        active = [student for student, ok in zip(roster, signed_in) if ok]
+
+        async def student_days(student):
+            for day in range(days):
+                await student.run_day(day)
+
+        await asyncio.gather(*(student_days(student) for student in active))
+        wall_seconds = time.perf_counter() - started
+
+    summary = recorder.summary(wall_seconds)
+    summary.update({'base_url': base_url, 'students': students, 'signed_in': len(active), 'days': days})
+    return summary
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the attendance tracker API")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL,
+                        help="server to target (default: %(default)s, or $LOAD_TEST_BASE_URL)")
+    parser.add_argument('--students', type=int, default=20, help="concurrent virtual students")
+    parser.add_argument('--days', type=int, default=5, help="attendance days each student enters")
+    parser.add_argument('--timeout', type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument('--json', dest='json_path', help="also write the summary JSON to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    summary = asyncio.run(run_load_test(args.base_url.rstrip('/'), args.students, args.days, args.timeout))
+
+    print_table(summary)
+    output = json.dumps(summary, indent=2)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    sys.exit(0 if summary['total_errors'] == 0 and summary['signed_in'] == args.students else 1)
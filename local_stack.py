@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from pymongo import MongoClient
+
+# Configuration
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STANDALONE_DIR = os.path.join(ROOT, '.next', 'standalone')
+STANDALONE_SERVER = os.path.join(STANDALONE_DIR, 'server.js')
+DB_NAME = 'attendance_tracker_local'
+STARTUP_TIMEOUT = 60
+
+def free_port():
+    """A TCP port that is free on the loopback interface right now"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def load_dotenv(path):
+    """KEY=VALUE pairs of a .env file (comments and blank lines skipped)"""
+    values = {}
+    if not os.path.exists(path):
+        return values
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, _, value = line.partition('=')
+            values[key.strip()] = value.strip().strip('"\'')
+    return values
+
+def tail(path, lines=20):
+    """Last lines of a log file, for startup errors"""
+    if not os.path.exists(path):
+        return ''
+    with open(path, errors='replace') as f:
+        return ''.join(f.readlines()[-lines:])
+
+def wait_until(ready, process, what, log_path):
+    """Poll ready() until it returns True; fail early when the process exits"""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{what} exited with code {process.returncode}:\n{tail(log_path)}")
+        try:
+            if ready():
+                return
+        except Exception:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{what} not ready after {STARTUP_TIMEOUT}s:\n{tail(log_path)}")
+
+def stop(process):
+    """Terminate a child process, killing it if it doesn't exit"""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+@contextlib.contextmanager
+def throwaway_mongod(workdir):
+    """Start mongod on a free port with its data in workdir; yields the connection URL"""
+    mongod = shutil.which('mongod')
+    if not mongod:
+        raise RuntimeError("mongod not found on PATH; install MongoDB or pass --mongo-url")
+
+    dbpath = os.path.join(workdir, 'db')
+    log_path = os.path.join(workdir, 'mongod.log')
+    os.makedirs(dbpath)
+    port = free_port()
+    url = f"mongodb://127.0.0.1:{port}"
+
+    process = subprocess.Popen(
+        [mongod, '--dbpath', dbpath, '--port', str(port), '--bind_ip', '127.0.0.1', '--logpath', log_path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.STDOUT
+    )
+    try:
+        client = MongoClient(url, serverSelectionTimeoutMS=500)
+        wait_until(lambda: client.admin.command('ping')['ok'] == 1, process, 'mongod', log_path)
+        client.close()
+        yield url
+    finally:
+        stop(process)
+
+@contextlib.contextmanager
+def local_database(mongo_url, workdir):
+    """A fresh DB_NAME on mongo_url, or on a throwaway mongod when mongo_url is None; dropped afterwards"""
+    with contextlib.ExitStack() as stack:
+        url = mongo_url or stack.enter_context(throwaway_mongod(workdir))
+        client = MongoClient(url)
+        client.drop_database(DB_NAME)
+        try:
+            yield url
+        finally:
+            client.drop_database(DB_NAME)
+            client.close()
+
+def build_standalone(force):
+    """Run next build unless a standalone build already exists"""
+    if os.path.exists(STANDALONE_SERVER) and not force:
+        return
+    command = ['yarn', 'build'] if shutil.which('yarn') else ['npx', 'next', 'build']
+    print(f"Building: {' '.join(command)}")
+    subprocess.run(command, cwd=ROOT, check=True)
+
+def seed(mongo_url, users):
+    """Load a synthetic semester so the leaderboard and exports have data"""
+    if users <= 0:
+        return
+    env = dict(os.environ, MONGO_URL=mongo_url, SEED_DB_NAME=DB_NAME)
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'seed_semester.py'), '--users', str(users), '--drop'],
+        cwd=ROOT, env=env, check=True
+    )
+
+@contextlib.contextmanager
+def standalone_server(mongo_url, workdir, storage):
+    """Run the standalone Next.js server on a free port; yields its base URL"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(workdir, 'server.log')
+    env = {
+        **os.environ,
+        **load_dotenv(os.path.join(ROOT, '.env')),
+        'MONGO_URL': mongo_url,
+        'DB_NAME': DB_NAME,
+        'ATTENDANCE_STORAGE': storage,
+        'PORT': str(port),
+        'HOSTNAME': '127.0.0.1',
+        'NODE_ENV': 'production',
+        # Plain HTTP: a Secure session cookie would never be sent back
+        'SESSION_COOKIE_SECURE': 'false',
+        'NEXT_TELEMETRY_DISABLED': '1'
+    }
+
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(['node', STANDALONE_SERVER], cwd=STANDALONE_DIR, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_until(lambda: httpx.get(f"{base_url}/api/", timeout=2).status_code == 200,
+                   process, 'Next.js server', log_path)
+        yield base_url
+    finally:
+        stop(process)
+
+def run_mode(mode, base_url, mongo_url, extra_args):
+    """Run the test suites or the benchmark flows against base_url; returns the exit code"""
+    env = dict(os.environ, API_TEST_BASE_URL=base_url, LOAD_TEST_BASE_URL=base_url,
+               MONGO_URL=mongo_url, DB_NAME=DB_NAME)
+
+    if mode == 'serve':
+        print(f"API at {base_url}/api, MongoDB at {mongo_url}/{DB_NAME}. Ctrl-C to stop.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return 0
+
+    if mode == 'bench':
+        commands = [['load_test.py', '--base-url', base_url, *extra_args]]
+    else:
+        commands = [['backend_test.py', *extra_args], ['additional_backend_tests.py', *extra_args]]
+
+    exit_code = 0
+    for script, *args in commands:
+        result = subprocess.run([sys.executable, os.path.join(ROOT, script), *args], cwd=ROOT, env=env)
+        exit_code = max(exit_code, result.returncode)
+    return exit_code
+
+def parse_args(argv=None):
+    """Options before "--" are ours; the rest go to the test or benchmark script"""
+    argv = sys.argv[1:] if argv is None else argv
+    extra_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, extra_args = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(
+        description="Run the API on this machine against a throwaway MongoDB and point the test suites or benchmarks at it",
+        usage="%(prog)s [test|bench|serve] [options] [-- script arguments]"
+    )
+    parser.add_argument('mode', nargs='?', choices=['test', 'bench', 'serve'], default='test',
+                        help="test: both backend suites; bench: load_test.py flows; serve: keep the stack up")
+    parser.add_argument('--mongo-url', help="use this MongoDB instead of starting mongod (the database is still dropped)")
+    parser.add_argument('--seed-users', type=int, default=200, help="synthetic students loaded before starting (0 to skip)")
+    parser.add_argument('--build', action='store_true', help="rebuild even when a standalone build exists")
+    parser.add_argument('--storage', choices=['documents', 'compact'], default='documents',
+                        help="ATTENDANCE_STORAGE of the server (compact: one document per user per month)")
+    args = parser.parse_args(argv)
+    args.extra_args = extra_args
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    try:
+        build_standalone(args.build)
+        with tempfile.TemporaryDirectory(prefix='attendance-local-') as workdir:
+            with local_database(args.mongo_url, workdir) as mongo_url:
+                seed(mongo_url, args.seed_users)
+                with standalone_server(mongo_url, workdir, args.storage) as base_url:
+                    exit_code = run_mode(args.mode, base_url, mongo_url, args.extra_args)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"Local stack failed: {e}", file=sys.stderr)
+        exit_code = 1
+
+    sys.exit(exit_code)
@@ -6,6 +6,8 @@ const nextConfig = {
   experimental: {
     // Remove if not using Server Components
     serverComponentsExternalPackages: ['mongodb'],
+    // Runs instrumentation.js at startup to warm up the MongoDB pool
+    instrumentationHook: true,
   },
   webpack(config, { dev }) {
     if (dev) {
@@ -25,7 +27,8 @@ const nextConfig = {
   async headers() {
     return [
       {
-        source: "/(.*)",
+        // API routes set their own CORS and Cache-Control headers (see handleCORS and withETag)
+        source: "/((?!api/).*)",
         headers: [
           { key: "X-Frame-Options", value: "ALLOWALL" },
           { key: "Content-Security-Policy", value: "frame-ancestors *;" },
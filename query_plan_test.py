@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pymongo import MongoClient
+
+# Configuration
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('QUERY_PLAN_DB_NAME', 'attendance_tracker_query_plans')
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SEED_USERS = 50
+SEED_DAYS = 60
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Computer Science', 'English']
+
+# $lookup join strategies that scan the foreign collection
+SCANNING_JOIN_STRATEGIES = {'NestedLoopJoin', 'HashJoin'}
+
+def counters_pipeline(match):
+    """Per-user, per-subject counters of the attendance documents, as documentCounters groups them"""
+    return [
+        {'$match': {**match, 'isHoliday': {'$ne': True}}},
+        {'$unwind': '$subjectAttendance'},
+        {'$group': {
+            '_id': {'userId': '$userId', 'subject': '$subjectAttendance.subject'},
+            'total': {'$sum': 1},
+            'attended': {'$sum': {'$cond': [{'$eq': ['$subjectAttendance.status', 'attended']}, 1, 0]}}
+        }},
+        {'$sort': {'_id.userId': 1}}
+    ]
+
+class QueryPlanTest:
+    def __init__(self):
+        self.client = MongoClient(MONGO_URL)
+        self.db = self.client[DB_NAME]
+        self.sample_user = None
+        self.test_results = []
+
+    def log_test(self, test_name, success, message="", details=None):
+        """Log test results"""
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status}: {test_name}")
+        if message:
+            print(f"   {message}")
+        if details:
+            print(f"   Details: {details}")
+
+        self.test_results.append({
+            'test': test_name,
+            'success': success,
+            'message': message,
+            'details': details
+        })
+        print()
+
+    def seed_database(self):
+        """Drop the scratch database and load a small semester of data"""
+        self.client.drop_database(DB_NAME)
+
+        start = datetime(2024, 1, 15)
+        users = []
+        attendance = []
+        user_stats = []
+        for i in range(SEED_USERS):
+            user_id = str(uuid.uuid4())
+            users.append({
+                'userId': user_id,
+                'email': f'student{i}@university.edu',
+                'name': f'Student {i}',
+                'semester': 'Fall 2024',
+                'subjects': SUBJECTS,
+                'startDate': start.strftime('%Y-%m-%d'),
+                'endDate': (start + timedelta(days=120)).strftime('%Y-%m-%d'),
+                'timetable': {},
+                'isSetupComplete': i % 5 != 0,
+                'createdAt': datetime.now(),
+                'updatedAt': datetime.now()
+            })
+            counts = {subject: {'subject': subject, 'total': 0, 'attended': 0} for subject in SUBJECTS}
+            for day in range(SEED_DAYS):
+                subject_attendance = []
+                for j, subject in enumerate(SUBJECTS):
+                    status = 'missed' if (i + day + j) % 4 == 0 else 'attended'
+                    subject_attendance.append({'subject': subject, 'status': status})
+                    counts[subject]['total'] += 1
+                    counts[subject]['attended'] += status == 'attended'
+                attendance.append({
+                    'attendanceId': str(uuid.uuid4()),
+                    'userId': user_id,
+                    'date': (start + timedelta(days=day)).strftime('%Y-%m-%d'),
+                    'isHoliday': False,
+                    'subjectAttendance': subject_attendance,
+                    'createdAt': datetime.now()
+                })
+            user_stats.append({'userId': user_id, 'counts': counts, 'version': SEED_DAYS, 'updatedAt': datetime.now()})
+
+        self.db.users.insert_many(users)
+        self.db.attendance.insert_many(attendance)
+        self.db.user_stats.insert_many(user_stats)
+        self.db.leaderboard_snapshots.insert_many([
+            {'userId': u['userId'], 'name': u['name'], 'email': u['email'],
+             'percentage': 75, 'updatedAt': datetime.now()}
+            for u in users if u['isSetupComplete']
+        ])
+        self.sample_user = users[1]
+
+    def ensure_indexes(self):
+        """Apply the API's index list through scripts/ensure-indexes.js"""
+        env = dict(os.environ, MONGO_URL=MONGO_URL, DB_NAME=DB_NAME)
+        result = subprocess.run(
+            ['node', os.path.join(REPO_ROOT, 'scripts', 'ensure-indexes.js')],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True
+        )
+        if result.returncode == 0:
+            self.log_test("Index Bootstrap", True, result.stdout.strip())
+            return True
+        else:
+            self.log_test("Index Bootstrap", False, "ensure-indexes.js failed", result.stderr.strip())
+            return False
+
+    def find_collection_scans(self, plan, path="plan"):
+        """Return the locations of every collection scan in an explain document"""
+        scans = []
+        if isinstance(plan, dict):
+            if plan.get('stage') == 'COLLSCAN':
+                scans.append(path)
+            if plan.get('stage') == 'EQ_LOOKUP' and plan.get('strategy') in SCANNING_JOIN_STRATEGIES:
+                scans.append(f"{path} ({plan['strategy']})")
+            if plan.get('collectionScans', 0) > 0:
+                scans.append(f"{path} ({plan['collectionScans']} collection scans)")
+            for key, value in plan.items():
+                scans.extend(self.find_collection_scans(value, f"{path}.{key}"))
+        elif isinstance(plan, list):
+            for i, value in enumerate(plan):
+                scans.extend(self.find_collection_scans(value, f"{path}[{i}]"))
+        return scans
+
+    def endpoint_queries(self):
+        """The queries each endpoint issues, as (name, explain callable) pairs"""
+        user = self.sample_user
+        today = user['startDate']
+        # Same pipelines as findSubjectRecords (lib/attendance-store.js) and documentCounters (lib/user-stats.js)
+        subject_pipeline = [
+            {'$match': {
+                'userId': user['userId'],
+                'subjectAttendance': {'$elemMatch': {'subject': SUBJECTS[0]}},
+                'isHoliday': {'$ne': True}
+            }},
+            {'$sort': {'date': -1}},
+            {'$project': {'_id': 0, 'date': 1, 'attendance': {'$arrayElemAt': [
+                {'$filter': {'input': '$subjectAttendance', 'cond': {'$eq': ['$$this.subject', {'$literal': SUBJECTS[0]}]}}},
+                0
+            ]}}}
+        ]
+        leaderboard_pipeline = [
+            {'$match': {'isSetupComplete': True}},
+            {'$lookup': {'from': 'user_stats', 'localField': 'userId', 'foreignField': 'userId', 'as': 'stats'}},
+            {'$unwind': {'path': '$stats', 'preserveNullAndEmptyArrays': True}}
+        ]
+
+        return [
+            ("POST /auth/session - user by email",
+             lambda: self.db.users.find({'email': user['email']}).explain()),
+            ("GET /auth/user - user by userId",
+             lambda: self.db.users.find({'userId': user['userId']}).explain()),
+            ("GET /attendance/status - today's record",
+             lambda: self.db.attendance.find({'userId': user['userId'], 'date': today}).explain()),
+            ("GET /attendance/status - user_stats by userId",
+             lambda: self.db.user_stats.find({'userId': user['userId']}).explain()),
+            ("GET /attendance/records - records sorted by date",
+             lambda: self.db.attendance.find({'userId': user['userId']}).sort('date', -1).explain()),
+            ("GET /attendance/subject/:name - one subject's records",
+             lambda: self.db.command('aggregate', 'attendance', pipeline=subject_pipeline, explain=True)),
+            ("Stats rebuild - one user's counters",
+             lambda: self.db.command('aggregate', 'attendance', pipeline=counters_pipeline({'userId': user['userId']}),
+                                     explain=True)),
+            ("GET /attendance/export - records oldest first",
+             lambda: self.db.attendance.find({'userId': user['userId']}).sort('date', 1).explain()),
+            ("GET /attendance/status - today's compact month",
+             lambda: self.db.attendance_months.find({
+                 'userId': user['userId'], 'month': today[:7], f'days.{today[8:]}': {'$exists': True}
+             }).explain()),
+            ("GET /attendance/records - compact months sorted by month",
+             lambda: self.db.attendance_months.find({'userId': user['userId'], 'days': {'$ne': {}}}).sort('month', -1).explain()),
+            ("Stats rebuild - one user's records by date (compact mode)",
+             lambda: self.db.attendance.find({'userId': user['userId']}).sort([('userId', 1), ('date', 1)]).explain()),
+            ("Stats rebuild - one user's compact months (compact mode)",
+             lambda: self.db.attendance_months.find({'userId': user['userId']}).sort([('userId', 1), ('month', 1)]).explain()),
+            ("Stats rebuild - records by user and date (compact mode)",
+             lambda: self.db.attendance.find({}).sort([('userId', 1), ('date', 1)]).explain()),
+            ("Stats rebuild - compact months by user and month (compact mode)",
+             lambda: self.db.attendance_months.find({}).sort([('userId', 1), ('month', 1)]).explain()),
+            ("GET /admin/export - semester's users",
+             lambda: self.db.users.find({'semester': {'$in': ['3', 3]}}).sort('userId', 1).explain()),
+            ("GET /leaderboard - snapshot ETag",
+             lambda: self.db.leaderboard_snapshots.find({}).sort('updatedAt', -1).limit(1).explain()),
+            ("GET /leaderboard - snapshot page after cursor",
+             lambda: self.db.leaderboard_snapshots.find({'$or': [
+                 {'percentage': {'$lt': 80}},
+                 {'percentage': 80, 'userId': {'$gt': user['userId']}}
+             ]}).sort([('percentage', -1), ('userId', 1)]).limit(101).explain()),
+            ("GET /leaderboard - caller's entry",
+             lambda: self.db.leaderboard_snapshots.find({'userId': user['userId']}).explain()),
+            ("GET /leaderboard - users with a higher percentage (rank)",
+             lambda: self.db.leaderboard_snapshots.find({'percentage': {'$gt': 80}}).explain()),
+            ("GET /leaderboard - entries before the cursor",
+             lambda: self.db.leaderboard_snapshots.find({'$or': [
+                 {'percentage': {'$gt': 80}},
+                 {'percentage': 80, 'userId': {'$lte': user['userId']}}
+             ]}).explain()),
+            ("Leaderboard rebuild - setup-complete users with counters",
+             lambda: self.db.command(
+                 'explain',
+                 {'aggregate': 'users', 'pipeline': leaderboard_pipeline, 'cursor': {}},
+                 verbosity='executionStats'
+             )),
+        ]
+
+    def batch_queries(self):
+        """Whole-collection jobs, as (name, collection, explain callable): one scan of the collection is expected"""
+        return [
+            ("Stats rebuild - all users' counters", 'attendance',
+             lambda: self.db.command('aggregate', 'attendance', pipeline=counters_pipeline({}), explain=True)),
+        ]
+
+    def test_query_plans(self):
+        """Fail any endpoint query whose plan contains a collection scan"""
+        all_passed = True
+        for name, explain in self.endpoint_queries():
+            try:
+                scans = self.find_collection_scans(explain())
+                if scans:
+                    self.log_test(f"Query Plan - {name}", False, "Collection scan in plan", scans)
+                    all_passed = False
+                else:
+                    self.log_test(f"Query Plan - {name}", True, "Index scan")
+            except Exception as e:
+                self.log_test(f"Query Plan - {name}", False, f"Exception: {str(e)}")
+                all_passed = False
+
+        for name, collection, explain in self.batch_queries():
+            try:
+                # A single pass over the source; any further scan would repeat per user
+                scans = self.find_collection_scans(explain())
+                if len(scans) > 1:
+                    self.log_test(f"Query Plan - {name}", False, f"Expected one scan of {collection}", scans)
+                    all_passed = False
+                else:
+                    self.log_test(f"Query Plan - {name}", True, f"Single pass over {collection}")
+            except Exception as e:
+                self.log_test(f"Query Plan - {name}", False, f"Exception: {str(e)}")
+                all_passed = False
+        return all_passed
+
+    def run_all_tests(self):
+        """Seed, index and explain every endpoint query"""
+        print("=" * 60)
+        print("ATTENDANCE TRACKER QUERY PLAN TESTS")
+        print("=" * 60)
+        print()
+
+        try:
+            self.seed_database()
+            passed = self.ensure_indexes() and self.test_query_plans()
+        finally:
+            self.client.drop_database(DB_NAME)
+            self.client.close()
+
+        failed = [r for r in self.test_results if not r['success']]
+        print("=" * 60)
+        print(f"QUERY PLAN SUMMARY: {len(self.test_results) - len(failed)}/{len(self.test_results)} checks passed")
+        print("=" * 60)
+
+        return passed, self.test_results
+
+if __name__ == "__main__":
+    tester = QueryPlanTest()
+    passed, results = tester.run_all_tests()
+
+    # Exit with appropriate code
+    sys.exit(0 if passed else 1)
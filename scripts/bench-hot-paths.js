@@ -0,0 +1,171 @@
+// Micro-benchmarks for the pure functions on the request path.
+//
+// Usage: node scripts/bench-hot-paths.js [--json] [--filter=text] [--samples=N] [--sample-ms=N]
+// Runs calculateAttendanceStats and getMissedDates over synthetic semesters of
+// 1-500 subjects, 30-1000 days and several holiday densities. Inputs come from
+// a seeded generator so every run measures the same work. Each case is warmed
+// up, then timed in several samples; the fastest sample is reported, as
+// interference from other processes only ever slows a sample down.
+// bench_hot_paths.py compares the results with the committed baseline.
+
+import { Worker, isMainThread, parentPort, workerData } from 'node:worker_threads'
+import { calculateAttendanceStats } from '../lib/attendance-stats.js'
+import { getMissedDates, toDayNumber, fromDayNumber, WEEKDAY_NAMES } from '../lib/calendar.js'
+
+const SUBJECT_COUNTS = [1, 10, 100, 500]
+const DAY_COUNTS = [30, 180, 1000]
+const HOLIDAY_DENSITIES = [0, 0.05, 0.25]
+const START_DATE = '2024-01-01'
+// Classes held on a day, as in a real timetable even when there are many subjects
+const MAX_CLASSES_PER_DAY = 8
+// Share of class days that have a record; the rest show up as missed dates
+const RECORDED_SHARE = 0.8
+const WARMUP_MS = 50
+const BATCH_TARGET_NS = 1000000n
+
+// Helper function to read --name=value options
+function option(name, fallback) {
+  const prefix = `--${name}=`
+  const arg = process.argv.find(value => value.startsWith(prefix))
+  return arg ? arg.slice(prefix.length) : fallback
+}
+
+// Seeded PRNG (mulberry32) so inputs are identical across runs
+function random(seed) {
+  let state = seed >>> 0
+  return () => {
+    state = (state + 0x6D2B79F5) >>> 0
+    let t = state
+    t = Math.imul(t ^ (t >>> 15), t | 1)
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61)
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296
+  }
+}
+
+// Helper function to build one synthetic semester
+function makeSemester(subjectCount, dayCount, holidayDensity) {
+  const next = random(subjectCount * 100003 + dayCount * 101 + Math.round(holidayDensity * 100))
+  const subjects = Array.from({ length: subjectCount }, (_, i) => `Subject ${i + 1}`)
+  const perDay = Math.min(subjectCount, MAX_CLASSES_PER_DAY)
+
+  // Subjects rotate through Monday-Friday so every subject has classes
+  const timetable = Object.fromEntries(WEEKDAY_NAMES.map(name => [name, []]))
+  WEEKDAY_NAMES.slice(1, 6).forEach((name, i) => {
+    for (let k = 0; k < perDay; k++) timetable[name].push(subjects[(i * perDay + k) % subjectCount])
+  })
+
+  const start = toDayNumber(START_DATE)
+  const end = start + dayCount - 1
+  const holidays = []
+  const attendanceRecords = []
+  for (let day = start; day <= end; day++) {
+    const isHoliday = next() < holidayDensity
+    if (isHoliday) holidays.push(day)
+    const classes = timetable[WEEKDAY_NAMES[new Date(day * 86400000).getUTCDay()]]
+    if (classes.length === 0 || next() >= RECORDED_SHARE) continue
+
+    attendanceRecords.push({
+      date: fromDayNumber(day),
+      isHoliday,
+      subjectAttendance: isHoliday ? [] : classes.map(subject => ({
+        subject,
+        status: next() < 0.75 ? 'attended' : 'missed'
+      }))
+    })
+  }
+
+  return {
+    subjects,
+    attendanceRecords,
+    missedDatesInput: {
+      startDate: START_DATE,
+      endDate: fromDayNumber(end),
+      timetable,
+      recordedDates: attendanceRecords.map(record => record.date),
+      holidays,
+      today: end
+    }
+  }
+}
+
+const BENCHMARKS = {
+  calculateAttendanceStats: semester => calculateAttendanceStats(semester.attendanceRecords, semester.subjects),
+  getMissedDates: semester => getMissedDates(semester.missedDatesInput)
+}
+
+// Helper function to time fn for about durationMs; returns ops/sec.
+// The last result is kept so the calls cannot be optimized away.
+let lastResult = null
+function measure(fn, durationMs) {
+  let ops = 0
+  let batch = 1
+  const started = process.hrtime.bigint()
+  const deadline = started + BigInt(Math.round(durationMs * 1e6))
+  let now = started
+  while (now < deadline) {
+    for (let i = 0; i < batch; i++) lastResult = fn()
+    ops += batch
+    const batchStarted = now
+    now = process.hrtime.bigint()
+    // Grow batches while they are short so the clock isn't read after every call
+    if (now - batchStarted < BATCH_TARGET_NS) batch *= 2
+  }
+  return ops / (Number(now - started) / 1e9)
+}
+
+// Helper function to benchmark one case in its own worker thread. A fresh
+// isolate keeps JIT state from earlier cases out of the measurement, so a case
+// run alone (--filter, or a re-check) measures the same as in a full run.
+function runCase(benchCase, samples, sampleMs) {
+  return new Promise((resolve, reject) => {
+    const worker = new Worker(new URL(import.meta.url), { workerData: { benchCase, samples, sampleMs } })
+    worker.once('message', resolve)
+    worker.once('error', reject)
+  })
+}
+
+function caseWorker({ benchCase, samples, sampleMs }) {
+  const semester = makeSemester(benchCase.subjects, benchCase.days, benchCase.holidayDensity)
+  const bench = BENCHMARKS[benchCase.fn]
+  const fn = () => bench(semester)
+  measure(fn, WARMUP_MS)
+  const opsPerSec = Math.max(...Array.from({ length: samples }, () => measure(fn, sampleMs)))
+  parentPort.postMessage(Math.round(opsPerSec))
+}
+
+async function main() {
+  const filter = option('filter', '')
+  const samples = Number(option('samples', 5))
+  const sampleMs = Number(option('sample-ms', 100))
+  const json = process.argv.includes('--json')
+  const results = []
+
+  for (const subjects of SUBJECT_COUNTS) {
+    for (const days of DAY_COUNTS) {
+      for (const holidayDensity of HOLIDAY_DENSITIES) {
+        for (const fn of Object.keys(BENCHMARKS)) {
+          const name = `${fn}/subjects=${subjects}/days=${days}/holidays=${holidayDensity}`
+          if (!name.includes(filter)) continue
+
+          const benchCase = { name, fn, subjects, days, holidayDensity }
+          const opsPerSec = await runCase(benchCase, samples, sampleMs)
+          results.push({ ...benchCase, opsPerSec })
+          if (!json) console.log(`${name.padEnd(70)} ${opsPerSec.toLocaleString('en-US').padStart(12)} ops/s`)
+        }
+      }
+    }
+  }
+
+  if (json) {
+    console.log(JSON.stringify({ node: process.version, platform: `${process.platform}-${process.arch}`, results }))
+  }
+}
+
+if (isMainThread) {
+  main().catch(error => {
+    console.error('Benchmark failed:', error)
+    process.exit(1)
+  })
+} else {
+  caseWorker(workerData)
+}
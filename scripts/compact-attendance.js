@@ -0,0 +1,131 @@
+// Move attendance documents into compact month documents.
+//
+// Usage: node --env-file=.env scripts/compact-attendance.js [--dry-run] [userId]
+// Start the API with ATTENDANCE_STORAGE=compact first: new records then go to
+// attendance_months and reads merge both collections, so the move can run
+// while serving traffic. Each month is written before its day documents are
+// deleted, so an interrupted run can simply be started again. A date that
+// already has a different compact record is reported and left alone, as are
+// non-canonical dates (run db:normalize-dates first). Counters count a date
+// present in both collections once, so stats:rebuild is safe mid-move as long
+// as it also runs with ATTENDANCE_STORAGE=compact.
+
+import { MongoClient } from 'mongodb'
+import {
+  ATTENDANCE_COLLECTION,
+  ATTENDANCE_MONTHS_COLLECTION,
+  decodeMonth,
+  isCompactStorage,
+  writeCompactRecords
+} from '../lib/attendance-store.js'
+import { USER_STATS_COLLECTION } from '../lib/user-stats.js'
+
+const CANONICAL_DATE = /^\d{4}-\d{2}-\d{2}$/
+
+// Helper function to compare records class by class, in order; a record is
+// only deleted when the stored day holds every one of its classes
+function sameRecord(a, b) {
+  const classes = record => (record.subjectAttendance || [])
+    .map(sa => JSON.stringify([sa.subject, sa.status, sa.period ?? null]))
+    .join('\n')
+  return !!a.isHoliday === !!b.isHoliday && classes(a) === classes(b)
+}
+
+// Helper function to move one user's records of one month; returns the ids safe to delete
+async function moveMonth(db, userId, month, records, summary) {
+  const statuses = await writeCompactRecords(db, userId, records, { skipDocuments: true })
+
+  // A duplicate is a leftover of an interrupted run when it matches the stored day
+  let stored = null
+  if (statuses.includes('duplicate')) {
+    const doc = await db.collection(ATTENDANCE_MONTHS_COLLECTION).findOne({ userId, month })
+    stored = new Map(decodeMonth(doc).map(record => [record.date, record]))
+  }
+
+  const moved = []
+  records.forEach((record, i) => {
+    if (statuses[i] === 'created' || (statuses[i] === 'duplicate' && stored.has(record.date) && sameRecord(record, stored.get(record.date)))) {
+      moved.push(record._id)
+    } else if (statuses[i] === 'duplicate') {
+      console.warn(`Record ${record._id} conflicts with the compact record of ${record.date} for user ${userId}`)
+      summary.conflicts += 1
+    } else {
+      console.warn(`Record ${record._id} could not be encoded (unknown status or period out of range)`)
+      summary.errors += 1
+    }
+  })
+  return moved
+}
+
+async function main() {
+  const dryRun = process.argv.includes('--dry-run')
+  const userId = process.argv.slice(2).find(arg => !arg.startsWith('--'))
+  if (!dryRun && !isCompactStorage()) {
+    // The API would stop seeing the moved records
+    console.error('Set ATTENDANCE_STORAGE=compact (for the API too) before moving records')
+    process.exit(1)
+  }
+  const client = new MongoClient(process.env.MONGO_URL)
+
+  try {
+    await client.connect()
+    const db = client.db(process.env.DB_NAME)
+    const attendance = db.collection(ATTENDANCE_COLLECTION)
+    const summary = { records: 0, months: 0, users: 0, conflicts: 0, errors: 0, invalid: 0 }
+    const started = Date.now()
+
+    // Served by the unique { userId, date } index, so each user's months arrive together
+    const records = attendance
+      .find(userId ? { userId } : {}, { projection: { _id: 1, userId: 1, date: 1, isHoliday: 1, subjectAttendance: 1 } })
+      .sort({ userId: 1, date: 1 })
+
+    let group = null
+    let movedUser = false
+    const flushGroup = async () => {
+      if (!group || group.records.length === 0) return
+      const moved = dryRun
+        ? group.records.map(record => record._id)
+        : await moveMonth(db, group.userId, group.month, group.records, summary)
+      if (moved.length === 0) return
+      if (!dryRun) await attendance.deleteMany({ _id: { $in: moved } })
+      summary.records += moved.length
+      summary.months += 1
+      movedUser = true
+    }
+    const finishUser = async previous => {
+      if (!movedUser) return
+      summary.users += 1
+      movedUser = false
+      // Records read back in a new order; a new version invalidates cached responses
+      if (!dryRun) await db.collection(USER_STATS_COLLECTION).updateOne({ userId: previous }, { $inc: { version: 1 } })
+    }
+
+    for await (const record of records) {
+      if (!CANONICAL_DATE.test(record.date)) {
+        console.warn(`Non-canonical date ${JSON.stringify(record.date)} on record ${record._id}`)
+        summary.invalid += 1
+        continue
+      }
+      const month = record.date.slice(0, 7)
+      if (group?.userId !== record.userId || group.month !== month) {
+        await flushGroup()
+        if (group && group.userId !== record.userId) await finishUser(group.userId)
+        group = { userId: record.userId, month, records: [] }
+      }
+      group.records.push(record)
+    }
+    await flushGroup()
+    if (group) await finishUser(group.userId)
+
+    const verb = dryRun ? 'Would move' : 'Moved'
+    console.log(`${verb} ${summary.records} record(s) into ${summary.months} month document(s) for ${summary.users} user(s) in ${Date.now() - started}ms`)
+    console.log(`Left in place: ${summary.conflicts} conflicting, ${summary.errors} unencodable, ${summary.invalid} non-canonical`)
+  } finally {
+    await client.close()
+  }
+}
+
+main().catch(error => {
+  console.error('Compaction failed:', error)
+  process.exit(1)
+})
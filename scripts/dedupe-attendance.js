@@ -0,0 +1,48 @@
+// Remove duplicate attendance records so the unique date index can be built.
+//
+// Usage: node --env-file=.env scripts/dedupe-attendance.js [--dry-run]
+// Before the unique { userId, date } index existed, two concurrent entries of
+// the same day could both be stored, and those duplicates make index creation
+// fail. For every date with more than one record this keeps the first one
+// written and deletes the rest. Then run db:indexes, and stats:rebuild since
+// the counters included the deleted records.
+
+import { MongoClient } from 'mongodb'
+import { ATTENDANCE_COLLECTION } from '../lib/attendance-store.js'
+
+async function main() {
+  const dryRun = process.argv.includes('--dry-run')
+  const client = new MongoClient(process.env.MONGO_URL)
+
+  try {
+    await client.connect()
+    const db = client.db(process.env.DB_NAME)
+    const attendance = db.collection(ATTENDANCE_COLLECTION)
+    const summary = { dates: 0, deleted: 0 }
+
+    const duplicates = attendance.aggregate([
+      { $sort: { createdAt: 1, _id: 1 } },
+      { $group: { _id: { userId: '$userId', date: '$date' }, ids: { $push: '$_id' }, count: { $sum: 1 } } },
+      { $match: { count: { $gt: 1 } } }
+    ], { allowDiskUse: true })
+
+    for await (const { _id: key, ids } of duplicates) {
+      const [kept, ...extra] = ids
+      console.warn(`${key.date} of user ${key.userId}: keeping ${kept}, removing ${extra.join(', ')}`)
+      if (!dryRun) await attendance.deleteMany({ _id: { $in: extra } })
+      summary.dates += 1
+      summary.deleted += extra.length
+    }
+
+    const verb = dryRun ? 'Would remove' : 'Removed'
+    console.log(`${verb} ${summary.deleted} duplicate record(s) of ${summary.dates} date(s)`)
+    if (summary.deleted > 0 && !dryRun) console.log('Next: yarn db:indexes && yarn stats:rebuild')
+  } finally {
+    await client.close()
+  }
+}
+
+main().catch(error => {
+  console.error('Dedupe failed:', error)
+  process.exit(1)
+})
@@ -0,0 +1,31 @@
+// Create the indexes the API relies on.
+//
+// Usage: node --env-file=.env scripts/ensure-indexes.js
+// The API also does this on first connect; run it ahead of a deploy so a
+// large collection is not indexed while serving traffic. Exits non-zero when
+// an index can't be built, e.g. over duplicates written before it existed.
+
+import { MongoClient } from 'mongodb'
+import { describeIndexError, ensureIndexes } from '../lib/indexes.js'
+
+async function main() {
+  const client = new MongoClient(process.env.MONGO_URL)
+
+  try {
+    await client.connect()
+    const db = client.db(process.env.DB_NAME)
+
+    const started = Date.now()
+    await ensureIndexes(db)
+    console.log(`Indexes ensured on ${process.env.DB_NAME} in ${Date.now() - started}ms`)
+  } finally {
+    await client.close()
+  }
+}
+
+main().catch(error => {
+  console.error('Index bootstrap failed:', error)
+  const hint = describeIndexError(error)
+  if (hint) console.error(hint)
+  process.exit(1)
+})
@@ -0,0 +1,92 @@
+// Rewrite stored attendance dates and semester dates to YYYY-MM-DD.
+//
+// Usage: node --env-file=.env scripts/normalize-dates.js [--dry-run]
+// The API normalizes dates on the way in; this repairs records written before
+// it did. Dates that cannot be parsed, or whose normalized date already has a
+// record, are reported and left alone. Run stats:rebuild afterwards when any
+// attendance date changed.
+
+import { MongoClient } from 'mongodb'
+import { normalizeDate } from '../lib/calendar.js'
+
+const CANONICAL_DATE = /^\d{4}-\d{2}-\d{2}$/
+
+// Helper function to fix the date of every non-canonical attendance record
+async function normalizeAttendance(db, dryRun) {
+  const attendance = db.collection('attendance')
+  const summary = { updated: 0, invalid: 0, conflicts: 0 }
+  const records = attendance.find(
+    { date: { $not: CANONICAL_DATE } },
+    { projection: { _id: 1, userId: 1, date: 1 } }
+  )
+
+  for await (const record of records) {
+    const date = normalizeDate(record.date)
+    if (!date) {
+      console.warn(`Unparseable date ${JSON.stringify(record.date)} on record ${record._id}`)
+      summary.invalid += 1
+      continue
+    }
+    if (await attendance.countDocuments({ userId: record.userId, date }, { limit: 1 })) {
+      console.warn(`Record ${record._id} duplicates ${date} for user ${record.userId}`)
+      summary.conflicts += 1
+      continue
+    }
+    if (!dryRun) await attendance.updateOne({ _id: record._id }, { $set: { date } })
+    summary.updated += 1
+  }
+  return summary
+}
+
+// Helper function to fix non-canonical semester start and end dates
+async function normalizeSemesters(db, dryRun) {
+  const users = db.collection('users')
+  const summary = { updated: 0, invalid: 0 }
+  const candidates = users.find(
+    {
+      $or: [
+        { startDate: { $exists: true, $not: CANONICAL_DATE } },
+        { endDate: { $exists: true, $not: CANONICAL_DATE } }
+      ]
+    },
+    { projection: { _id: 1, userId: 1, startDate: 1, endDate: 1 } }
+  )
+
+  for await (const user of candidates) {
+    const startDate = normalizeDate(user.startDate)
+    const endDate = normalizeDate(user.endDate)
+    if (!startDate || !endDate) {
+      console.warn(`Unparseable semester dates for user ${user.userId}`)
+      summary.invalid += 1
+      continue
+    }
+    if (!dryRun) {
+      await users.updateOne({ _id: user._id }, { $set: { startDate, endDate, updatedAt: new Date() } })
+    }
+    summary.updated += 1
+  }
+  return summary
+}
+
+async function main() {
+  const dryRun = process.argv.includes('--dry-run')
+  const client = new MongoClient(process.env.MONGO_URL)
+
+  try {
+    await client.connect()
+    const db = client.db(process.env.DB_NAME)
+
+    const attendance = await normalizeAttendance(db, dryRun)
+    const semesters = await normalizeSemesters(db, dryRun)
+    const verb = dryRun ? 'Would update' : 'Updated'
+    console.log(`${verb} ${attendance.updated} attendance record(s); ${attendance.invalid} unparseable, ${attendance.conflicts} conflicting`)
+    console.log(`${verb} ${semesters.updated} user(s); ${semesters.invalid} unparseable`)
+  } finally {
+    await client.close()
+  }
+}
+
+main().catch(error => {
+  console.error('Date normalization failed:', error)
+  process.exit(1)
+})
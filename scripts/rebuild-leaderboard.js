@@ -0,0 +1,28 @@
+// Recompute every leaderboard entry into the leaderboard_snapshots collection.
+//
+// Usage: node --env-file=.env scripts/rebuild-leaderboard.js
+// Schedule it (e.g. every 10 minutes from cron) to repair entries whose update
+// was lost, e.g. to a rebuild running at the same time.
+
+import { MongoClient } from 'mongodb'
+import { rebuildLeaderboard } from '../lib/leaderboard.js'
+
+async function main() {
+  const client = new MongoClient(process.env.MONGO_URL)
+
+  try {
+    await client.connect()
+    const db = client.db(process.env.DB_NAME)
+
+    const started = Date.now()
+    const entries = await rebuildLeaderboard(db)
+    console.log(`Rebuilt ${entries} entries in ${Date.now() - started}ms`)
+  } finally {
+    await client.close()
+  }
+}
+
+main().catch(error => {
+  console.error('Leaderboard rebuild failed:', error)
+  process.exit(1)
+})
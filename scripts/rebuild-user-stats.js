@@ -0,0 +1,28 @@
+// Recompute the user_stats counters from the raw attendance collection.
+//
+// Usage: node --env-file=.env scripts/rebuild-user-stats.js [userId]
+// Run after a migration, a manual data fix, or whenever counters drift.
+
+import { MongoClient } from 'mongodb'
+import { rebuildUserStats } from '../lib/user-stats.js'
+
+async function main() {
+  const userId = process.argv[2]
+  const client = new MongoClient(process.env.MONGO_URL)
+
+  try {
+    await client.connect()
+    const db = client.db(process.env.DB_NAME)
+
+    const started = Date.now()
+    const rebuilt = await rebuildUserStats(db, userId ? { userId } : {})
+    console.log(`Rebuilt counters for ${rebuilt} user(s) in ${Date.now() - started}ms`)
+  } finally {
+    await client.close()
+  }
+}
+
+main().catch(error => {
+  console.error('Rebuild failed:', error)
+  process.exit(1)
+})
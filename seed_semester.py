@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+# Configuration
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('SEED_DB_NAME', 'attendance_tracker_bench')
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SUBJECT_NAMES = [
+    'Mathematics', 'Physics', 'Chemistry', 'Computer Science', 'English', 'Biology',
+    'Economics', 'History', 'Statistics', 'Electronics', 'Mechanics', 'Philosophy'
+]
+
+def subject_key(subject):
+    """Same escaping as subjectKey in lib/attendance-stats.js"""
+    return subject.replace('%', '%25').replace('.', '%2E').replace('$', '%24')
+
+def deterministic_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+class SemesterCalendar:
+    """Subjects, timetable and holidays shared by every generated student"""
+
+    def __init__(self, seed, subject_count, days, start_date, weekly_off, holiday_rate):
+        rng = random.Random(f"{seed}:calendar")
+
+        self.subjects = [
+            SUBJECT_NAMES[i] if i < len(SUBJECT_NAMES) else f"{SUBJECT_NAMES[i % len(SUBJECT_NAMES)]} {i // len(SUBJECT_NAMES) + 1}"
+            for i in range(subject_count)
+        ]
+        self.timetable = {
+            day: [] if day in weekly_off else rng.sample(self.subjects, min(len(self.subjects), rng.randint(2, 5)))
+            for day in WEEKDAYS
+        }
+
+        self.start_date = start_date
+        self.end_date = start_date + timedelta(days=days - 1)
+
+        # Class days as (date string, created-at, weekday schedule); weekly-off days have no record
+        self.class_days = []
+        for offset in range(days):
+            date = start_date + timedelta(days=offset)
+            weekday = WEEKDAYS[date.weekday()]
+            if weekday in weekly_off:
+                continue
+            self.class_days.append((date.strftime('%Y-%m-%d'), date.replace(hour=18), self.timetable[weekday]))
+
+        # Institution holidays: mostly isolated days plus the odd multi-day break
+        self.holidays = set()
+        # Capped so a rate of 1 or more can't ask for more holidays than there are days
+        target = min(int(len(self.class_days) * holiday_rate), len(self.class_days))
+        while len(self.holidays) < target:
+            first = rng.randrange(len(self.class_days))
+            length = 1 if rng.random() < 0.8 else rng.randint(2, 5)
+            self.holidays.update(range(first, min(first + length, len(self.class_days))))
+
+class StudentGenerator:
+    """Builds user, attendance and user_stats documents for one student index"""
+
+    def __init__(self, seed, calendar, semester, entry_rate, email_domain):
+        self.seed = seed
+        self.calendar = calendar
+        self.semester = semester
+        self.entry_rate = entry_rate
+        self.email_domain = email_domain
+
+    def generate(self, index):
+        rng = random.Random(f"{self.seed}:student:{index}")
+        calendar = self.calendar
+        user_id = deterministic_uuid(rng)
+
+        # Most students attend 70-95% of classes, with a tail of low attenders and per-subject variation
+        base_rate = rng.betavariate(8, 2)
+        subject_rates = {s: min(1.0, max(0.0, base_rate + rng.gauss(0, 0.08))) for s in calendar.subjects}
+        counts = {subject_key(s): {'subject': s, 'total': 0, 'attended': 0} for s in calendar.subjects}
+
+        user = {
+            'userId': user_id,
+            'email': f'student{index:06d}@{self.email_domain}',
+            'name': f'Student {index}',
+            'createdAt': calendar.start_date,
+            'isSetupComplete': True,
+            'semester': self.semester,
+            'subjects': calendar.subjects,
+            'startDate': calendar.start_date.strftime('%Y-%m-%d'),
+            'endDate': calendar.end_date.strftime('%Y-%m-%d'),
+            'timetable': calendar.timetable,
+            'updatedAt': calendar.start_date
+        }
+
+        records = []
+        random_value = rng.random
+        for day_index, (date, created_at, schedule) in enumerate(calendar.class_days):
+            # Students forget to log some days; those show up as missed dates
+            if random_value() > self.entry_rate:
+                continue
+
+            is_holiday = day_index in calendar.holidays
+            subject_attendance = []
+            if not is_holiday:
+                for subject in schedule:
+                    attended = random_value() < subject_rates[subject]
+                    subject_attendance.append({'subject': subject, 'status': 'attended' if attended else 'missed'})
+                    counter = counts[subject_key(subject)]
+                    counter['total'] += 1
+                    counter['attended'] += attended
+
+            records.append({
+                'attendanceId': deterministic_uuid(rng),
+                'userId': user_id,
+                'date': date,
+                'isHoliday': is_holiday,
+                'subjectAttendance': subject_attendance,
+                'createdAt': created_at
+            })
+
+        stats = {
+            'userId': user_id,
+            'counts': {k: v for k, v in counts.items() if v['total'] > 0},
+            'version': len(records),
+            'updatedAt': calendar.end_date
+        }
+        return user, records, stats
+
+def insert_range(args):
+    """Generate and insert students [start, stop) in batches; runs inside a worker process"""
+    generator, start, stop, batch_size, dry_run = args
+    client = None if dry_run else MongoClient(MONGO_URL)
+    db = None if dry_run else client[DB_NAME]
+
+    users, records, stats = [], [], []
+    totals = {'users': 0, 'attendance': 0}
+
+    def flush():
+        if not dry_run:
+            if users:
+                db.users.insert_many(users, ordered=False)
+                db.user_stats.insert_many(stats, ordered=False)
+            if records:
+                db.attendance.insert_many(records, ordered=False)
+        totals['users'] += len(users)
+        totals['attendance'] += len(records)
+        users.clear()
+        records.clear()
+        stats.clear()
+
+    try:
+        for index in range(start, stop):
+            user, user_records, user_stats = generator.generate(index)
+            users.append(user)
+            stats.append(user_stats)
+            records.extend(user_records)
+            if len(records) >= batch_size:
+                flush()
+        flush()
+    finally:
+        if client:
+            client.close()
+    return totals
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic semester into MongoDB")
+    parser.add_argument('--users', type=int, default=1000, help="number of students")
+    parser.add_argument('--subjects', type=int, default=6, help="subjects per student")
+    parser.add_argument('--days', type=int, default=120, help="semester length in calendar days")
+    parser.add_argument('--start-date', default='2024-01-15', help="first day of the semester (YYYY-MM-DD)")
+    parser.add_argument('--weekly-off', default='Sunday', help="comma-separated weekdays without classes")
+    parser.add_argument('--holiday-rate', type=float, default=0.05, help="fraction of class days that are holidays (0-1)")
+    parser.add_argument('--entry-rate', type=float, default=0.95, help="fraction of days a student logs")
+    parser.add_argument('--seed', type=int, default=42, help="random seed; the same seed produces the same data")
+    parser.add_argument('--batch-size', type=int, default=10000, help="attendance documents per insert_many")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="parallel generator processes")
+    parser.add_argument('--email-domain', default='university.edu', help="domain for generated emails")
+    parser.add_argument('--drop', action='store_true', help="drop users, attendance, user_stats and the leaderboard snapshot first")
+    parser.add_argument('--dry-run', action='store_true', help="generate documents without inserting them")
+    args = parser.parse_args()
+    if not 0 <= args.holiday_rate <= 1:
+        parser.error("--holiday-rate must be between 0 and 1")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    started = time.perf_counter()
+
+    calendar = SemesterCalendar(
+        seed=args.seed,
+        subject_count=args.subjects,
+        days=args.days,
+        start_date=datetime.strptime(args.start_date, '%Y-%m-%d'),
+        weekly_off={day.strip() for day in args.weekly_off.split(',') if day.strip()},
+        holiday_rate=args.holiday_rate
+    )
+    generator = StudentGenerator(args.seed, calendar, f'Seeded {args.start_date}', args.entry_rate, args.email_domain)
+
+    if args.drop and not args.dry_run:
+        client = MongoClient(MONGO_URL)
+        # Without its snapshot the leaderboard is rebuilt from the new users on first read
+        for name in ('users', 'attendance', 'user_stats', 'leaderboard_snapshots', 'leaderboard_meta'):
+            client[DB_NAME][name].drop()
+        client.close()
+
+    workers = max(1, min(args.workers, args.users))
+    step = -(-args.users // workers)
+    chunks = [(generator, start, min(start + step, args.users), args.batch_size, args.dry_run)
+              for start in range(0, args.users, step)]
+
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.map(insert_range, chunks)
+
+    users = sum(r['users'] for r in results)
+    attendance = sum(r['attendance'] for r in results)
+    elapsed = time.perf_counter() - started
+    target = "generated (dry run)" if args.dry_run else f"into {DB_NAME}"
+    print(f"{users} users, {attendance} attendance records, {len(calendar.holidays)} holidays {target} "
+          f"in {elapsed:.1f}s (seed {args.seed})")
+    if not args.dry_run:
+        print("Run 'yarn db:indexes' against this database before benchmarking.")
+    sys.exit(0)